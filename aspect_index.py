@@ -0,0 +1,134 @@
+"""Aspect-ratio index over the image catalog.
+
+Portrait/Landscape alone can't tell a 32:9 ultrawide from a 4:3 panel, so
+images are also bucketed by log aspect ratio (about 0.1% per bucket). The
+non-empty bucket keys are kept sorted, so finding every image within a
+tolerance of a monitor's width/height is a bisect plus a walk over the
+buckets in range - never a pass over the whole library.
+
+Range queries are served as AspectRangePool objects that the selection
+engine draws from like any other pool.
+"""
+import math
+from array import array
+from bisect import bisect_left, bisect_right, insort
+
+
+ASPECT_RESOLUTION = 1000  # Buckets per unit of log aspect ratio
+NO_KEY = -2 ** 31  # Images without known dimensions aren't bucketed
+
+
+def aspect_key(width, height):
+    return round(math.log(width / height) * ASPECT_RESOLUTION)
+
+
+def key_range(aspect, tolerance):
+    """Bucket keys of aspect ratios within aspect * (1 + tolerance)^±1"""
+    center = math.log(aspect)
+    spread = math.log(1 + tolerance)
+    return (math.ceil((center - spread) * ASPECT_RESOLUTION),
+            math.floor((center + spread) * ASPECT_RESOLUTION))
+
+
+class AspectRangePool:
+    """Visible catalog ids whose aspect bucket lies in [low, high]"""
+
+    def __init__(self, index, low, high):
+        self.index = index
+        self.catalog = index.catalog
+        self.low = low
+        self.high = high
+        self.key = f"aspect:{low}:{high}"  # Selection engine pool key
+
+    def __contains__(self, image_id):
+        if not isinstance(image_id, int) or not self.catalog.is_visible(image_id):
+            return False
+        return self.low <= self.index.keys[image_id] <= self.high
+
+    def __len__(self):
+        return self.index.count(self.low, self.high)
+
+    def __iter__(self):
+        is_visible = self.catalog.is_visible
+        for bucket in self.index.buckets_in(self.low, self.high):
+            for image_id in bucket:
+                if is_visible(image_id):
+                    yield image_id
+
+    def snapshot(self):
+        return array('I', self)
+
+
+class AspectIndex:
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self.keys = array('i')  # Bucket key per catalog row
+        self.buckets = {}  # {key: array of ids}
+        self.counts = {}  # {key: visible ids in bucket}
+        self.deleted = {}  # {key: deleted ids still in bucket}
+        self.sorted_keys = []  # Keys of every bucket ever created, ascending
+        self.pools = {}  # {(low, high): AspectRangePool} handed out so far
+
+    def add(self, image_id, width, height):
+        """Bucket a new catalog row; must be called for every row in order"""
+        if not width or not height:
+            self.keys.append(NO_KEY)
+            return
+        key = aspect_key(width, height)
+        self.keys.append(key)
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = array('I')
+            self.counts[key] = 0
+            self.deleted[key] = 0
+            insort(self.sorted_keys, key)
+        bucket.append(image_id)
+        self.counts[key] += 1
+
+    def removed(self, image_id, visible):
+        """Account for a catalog row marked deleted"""
+        key = self.keys[image_id]
+        if key == NO_KEY:
+            return
+        if visible:
+            self.counts[key] -= 1
+        self.deleted[key] += 1
+        bucket = self.buckets[key]
+        if len(bucket) > 64 and self.deleted[key] * 2 > len(bucket):
+            self.buckets[key] = array(
+                'I', (i for i in bucket if self.catalog.is_live(i)))
+            self.deleted[key] = 0
+
+    def visibility_changed(self, image_id, delta):
+        """Account for a row hidden (-1) or shown (+1) as a near-duplicate"""
+        key = self.keys[image_id]
+        if key != NO_KEY:
+            self.counts[key] += delta
+
+    def _key_slice(self, low, high):
+        return self.sorted_keys[bisect_left(self.sorted_keys, low):
+                                bisect_right(self.sorted_keys, high)]
+
+    def buckets_in(self, low, high):
+        return [self.buckets[key] for key in self._key_slice(low, high)]
+
+    def count(self, low, high):
+        return sum(self.counts[key] for key in self._key_slice(low, high))
+
+    def pool(self, aspect, tolerance):
+        """Pool of images within tolerance of aspect, reused for equal ranges"""
+        low, high = key_range(aspect, tolerance)
+        pool = self.pools.get((low, high))
+        if pool is None:
+            # Called from the prefetch thread too; setdefault keeps one pool per range
+            pool = self.pools.setdefault((low, high), AspectRangePool(self, low, high))
+        return pool
+
+    def pools_containing(self, image_id):
+        """Range pools handed out so far that include image_id"""
+        key = self.keys[image_id]
+        if key == NO_KEY:
+            return []
+        # A snapshot - the prefetch thread may add pools while this runs
+        return [pool for (low, high), pool in list(self.pools.items())
+                if low <= key <= high]
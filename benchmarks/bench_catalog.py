@@ -0,0 +1,90 @@
+"""Measure memory used by the image catalog vs. plain path lists
+
+Usage: python benchmarks/bench_catalog.py [--sizes 100000,1000000] [--dirs N]
+
+Entries are synthetic paths spread over a library-like directory tree, so no
+image files are needed. The list baseline is the original layout: one list of
+path strings for all images plus one per orientation. The pools baseline adds
+the {path: position} dicts needed for O(1) removal without a catalog.
+"""
+import argparse
+import os
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from catalog import ImageCatalog
+
+
+def synthetic_entries(count, dir_count):
+    """Yield (path, width, height, orientation) for count fake images"""
+    root = os.path.join('D:\\' if os.name == 'nt' else '/', 'Pictures', 'Wallpapers')
+    for i in range(count):
+        directory = os.path.join(root, f"collection_{i % dir_count // 100:03d}",
+                                 f"album_{i % dir_count:05d}")
+        if i % 3:
+            yield os.path.join(directory, f"IMG_{i:08d}.jpg"), 3840, 2160, 'Landscape'
+        else:
+            yield os.path.join(directory, f"IMG_{i:08d}.jpg"), 2160, 3840, 'Portrait'
+
+
+def build_lists(count, dir_count):
+    all_images, portrait, landscape = [], [], []
+    for path, _, _, orientation in synthetic_entries(count, dir_count):
+        all_images.append(path)
+        (portrait if orientation == 'Portrait' else landscape).append(path)
+    return all_images, portrait, landscape
+
+
+def build_pools(count, dir_count):
+    pools = build_lists(count, dir_count)
+    positions = [{path: i for i, path in enumerate(pool)} for pool in pools]
+    return pools, positions
+
+
+def build_catalog(count, dir_count):
+    catalog = ImageCatalog()
+    for entry in synthetic_entries(count, dir_count):
+        catalog.add(*entry)
+    return catalog
+
+
+def measure(label, builder, count, dir_count):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = builder(count, dir_count)
+    elapsed = time.perf_counter() - start
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:>8}: {current / 2**20:8.1f} MiB retained "
+          f"({current / count:6.1f} B/image), peak {peak / 2**20:8.1f} MiB, "
+          f"built in {elapsed:.2f}s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100000,1000000')
+    parser.add_argument('--dirs', type=int, default=2000, help='Directories to spread images over')
+    args = parser.parse_args()
+
+    for count in (int(size) for size in args.sizes.split(',')):
+        print(f"{count} images in {args.dirs} directories")
+        measure('lists', build_lists, count, args.dirs)
+        measure('pools', build_pools, count, args.dirs)
+        catalog = measure('catalog', build_catalog, count, args.dirs)
+
+        # Lookups are needed for watcher events and prefetch validation
+        paths = [catalog.path(i) for i in range(0, count, max(1, count // 10000))]
+        start = time.perf_counter()
+        for path in paths:
+            catalog.find(path)
+        elapsed = time.perf_counter() - start
+        print(f"{'find':>8}: {elapsed / len(paths) * 1e6:.2f} us/lookup")
+        del catalog
+
+
+if __name__ == '__main__':
+    main()
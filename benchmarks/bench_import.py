@@ -0,0 +1,144 @@
+"""Measure import time of the application's entry modules, per imported module
+
+Usage: python benchmarks/bench_import.py [MODULE ...] [--repeat N] [--top N]
+                                         [--budget-ms MS] [--json FILE]
+
+Each module is imported in a fresh interpreter under `python -X importtime`
+and the fastest of --repeat runs is reported, broken down by the modules it
+pulled in. The exit status is 1 when an import fails, a module loads one of
+the packages that must stay deferred until first use (PIL, pystray, COM, and
+Tk outside the window), or a total exceeds --budget-ms, so CI can run it
+as-is.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+DEFAULT_MODULES = ['wpchanger', 'cli', 'wallpaper_rotator']
+
+# Packages no entry module may import eagerly
+DEFERRED = ['PIL', 'pystray', 'comtypes']
+# Only the window needs Tk
+HEADLESS_DEFERRED = DEFERRED + ['tkinter', '_tkinter']
+GUI_MODULES = {'wpchanger'}
+
+
+def run_import(module):
+    """Import module in a new interpreter, returning ([(name, depth, self_us, cumulative_us)], error)"""
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=ROOT, capture_output=True, text=True)
+    entries = []
+    other = []
+    for line in result.stderr.splitlines():
+        if not line.startswith('import time:'):
+            other.append(line)
+            continue
+        fields = line[len('import time:'):].split('|')
+        if len(fields) != 3 or not fields[0].strip().isdigit():
+            continue  # Column header
+        name = fields[2].rstrip()
+        depth = (len(name) - len(name.lstrip())) // 2
+        entries.append((name.strip(), depth, int(fields[0]), int(fields[1])))
+    error = None
+    if result.returncode != 0:
+        error = other[-1] if other else f"exit status {result.returncode}"
+    return entries, error
+
+
+def module_imports(entries, module):
+    """Entries imported on behalf of module, ending with module itself
+
+    -X importtime lists a module after everything it imported, so these are
+    the entries just before module's own line that are nested below it.
+    Interpreter startup (site, encodings) is left out.
+    """
+    for end in range(len(entries) - 1, -1, -1):
+        if entries[end][0] == module:
+            break
+    else:
+        return entries
+    depth = entries[end][1]
+    start = end
+    while start > 0 and entries[start - 1][1] > depth:
+        start -= 1
+    return entries[start:end + 1]
+
+
+def deferred_loaded(entries, module):
+    deferred = DEFERRED if module in GUI_MODULES else HEADLESS_DEFERRED
+    loaded = []
+    for name, _, _, _ in entries:
+        package = name.split('.')[0]
+        if package in deferred and package not in loaded:
+            loaded.append(package)
+    return loaded
+
+
+def measure(module, repeat):
+    best = None
+    for _ in range(repeat):
+        entries, error = run_import(module)
+        if error:
+            return {'module': module, 'error': error}
+        entries = module_imports(entries, module)
+        total = entries[-1][3]
+        if best is None or total < best[0]:
+            best = (total, entries)
+    total, entries = best
+    return {
+        'module': module,
+        'total_ms': total / 1000,
+        'deferred_loaded': deferred_loaded(entries, module),
+        'imports': [{'name': name, 'self_ms': self_us / 1000,
+                     'cumulative_ms': cumulative / 1000}
+                    for name, _, self_us, cumulative in entries],
+    }
+
+
+def report(result, top):
+    if 'error' in result:
+        print(f"{result['module']}: import failed - {result['error']}")
+        return
+    print(f"{result['module']}: {result['total_ms']:.1f} ms")
+    imports = sorted(result['imports'], key=lambda entry: entry['self_ms'], reverse=True)
+    for entry in imports[:top]:
+        print(f"  {entry['self_ms']:8.2f} ms self {entry['cumulative_ms']:8.2f} ms cumulative"
+              f"  {entry['name']}")
+    if result['deferred_loaded']:
+        print(f"  loaded eagerly: {', '.join(result['deferred_loaded'])}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('modules', nargs='*', default=DEFAULT_MODULES)
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per module, fastest is kept')
+    parser.add_argument('--top', type=int, default=15, help='Slowest imports listed per module')
+    parser.add_argument('--budget-ms', type=float, help='Fail when a module takes longer')
+    parser.add_argument('--json', help='Also write the full results to this file')
+    args = parser.parse_args()
+
+    results = []
+    failed = False
+    for module in args.modules:
+        result = measure(module, max(1, args.repeat))
+        report(result, args.top)
+        results.append(result)
+        if 'error' in result or result['deferred_loaded']:
+            failed = True
+        elif args.budget_ms is not None and result['total_ms'] > args.budget_ms:
+            print(f"  over budget ({args.budget_ms:.0f} ms)")
+            failed = True
+
+    if args.json:
+        with open(args.json, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,80 @@
+"""Compare lossless JPEG rotation paths against the PIL decode/rotate/encode path
+
+Usage: python benchmarks/bench_lossless.py [--count N] [--size WxH] [--dir PATH]
+
+The default size is MCU-aligned for 4:2:0 JPEGs so jpegtran -perfect applies.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import generate_corpus
+from image_probe import probe_image
+from image_render import render_for_monitor
+from jpeg_lossless import (combined_operation, find_jpegtran, rotate_with_exif_tag,
+                           rotate_with_jpegtran)
+
+
+def pil_rotate(source, output, info):
+    img = render_for_monitor(source, info, 'left')
+    img.save(output, quality=95)
+    img.close()
+    return True
+
+
+def jpegtran_rotate(jpegtran):
+    def rotate(source, output, info):
+        operation = combined_operation(info[2], 'left')
+        return rotate_with_jpegtran(jpegtran, source, output, operation, info[:2])
+    return rotate
+
+
+def exif_rotate(source, output, info):
+    return rotate_with_exif_tag(source, output, info[2], 'left')
+
+
+def time_path(label, func, paths, infos, out_dir):
+    start = time.perf_counter()
+    done = 0
+    for i, path in enumerate(paths):
+        if func(path, os.path.join(out_dir, f"{label}_{i}.jpg"), infos[path]):
+            done += 1
+    elapsed = time.perf_counter() - start
+    if done:
+        print(f"{label:>9}: {elapsed / len(paths) * 1000:.1f} ms/image "
+              f"({done}/{len(paths)} handled)")
+    else:
+        print(f"{label:>9}: not applicable to this corpus")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=20)
+    parser.add_argument('--size', default='4096x3072')
+    parser.add_argument('--dir', help='Reuse an existing corpus directory')
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split('x'))
+    directory = args.dir or tempfile.mkdtemp(prefix='wpchanger_lossless_')
+    out_dir = tempfile.mkdtemp(prefix='wpchanger_lossless_out_')
+    print(f"Generating {args.count} JPEGs ({args.size}) in {directory}")
+    paths = generate_corpus(directory, args.count, size=(width, height),
+                            formats=('jpeg', 'progressive_jpeg'))
+    infos = {path: probe_image(path) for path in paths}
+
+    time_path('pil', pil_rotate, paths, infos, out_dir)
+    jpegtran = find_jpegtran()
+    if jpegtran:
+        time_path('jpegtran', jpegtran_rotate(jpegtran), paths, infos, out_dir)
+    else:
+        print(" jpegtran: not found on PATH, skipped")
+    time_path('exif', exif_rotate, paths, infos, out_dir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,75 @@
+"""Compare header-only dimension probing against a full PIL open + getexif
+
+Usage: python benchmarks/bench_probe.py [--count N] [--size WxH] [--dir PATH]
+
+With --dir, images a previous run generated there are reused.
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PIL import Image
+
+from corpus import corpus_images, generate_corpus
+from image_probe import probe_image
+from image_render import stored_size
+
+
+def pil_info(path):
+    """The original classification path: full PIL open plus EXIF parse"""
+    with Image.open(path) as img:
+        exif = img.getexif()
+        exif_orientation = exif.get(274) if exif else None
+        # Like the probe, report the size as stored (Pillow orients TIFFs itself)
+        width, height = stored_size(img, exif_orientation)
+        return width, height, exif_orientation
+
+
+def time_path(label, func, paths, repeat):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for path in paths:
+            func(path)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    per_image = best / len(paths) * 1e6
+    print(f"{label:>8}: {best:.3f}s total, {per_image:.1f} us/image")
+    return best
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=300)
+    parser.add_argument('--size', default='4000x3000')
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--dir', help='Corpus directory; reused as-is if it already has images')
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split('x'))
+    directory = args.dir or tempfile.mkdtemp(prefix='wpchanger_probe_')
+    paths = corpus_images(directory)
+    if paths:
+        print(f"Reusing {len(paths)} images in {directory}")
+    else:
+        print(f"Generating {args.count} images ({args.size}) in {directory}")
+        paths = generate_corpus(directory, args.count, size=(width, height))
+
+    probed = {p: probe_image(p) for p in paths}
+    fallbacks = [p for p in paths if probed[p] is None]
+    mismatches = [p for p in paths
+                  if probed[p] is not None and probed[p] != pil_info(p)]
+    print(f"Probe fell back to PIL for {len(fallbacks)} images, "
+          f"disagreed with PIL on {len(mismatches)}")
+
+    pil_time = time_path('PIL', pil_info, paths, args.repeat)
+    probe_time = time_path('probe', probe_image, paths, args.repeat)
+    print(f"Speedup: {pil_time / probe_time:.1f}x")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""Time full rotation cycles against an in-memory desktop (runs on any platform)
+
+Usage: python benchmarks/bench_rotate.py [--monitors N] [--count N] [--cycles N]
+                                         [--size WxH] [--latency-scale X] [--dir PATH]
+
+The rotator runs unchanged except for its backend: a RecordingBackend with N
+monitors, alternating landscape and portrait panels, that sleeps for
+simulated shell latencies. Every cycle is split into select, prepare
+(render) and apply (backend calls). The corpus mixes orientations and every
+monitor draws from all of them, rotating mismatched images left, so prepare
+includes real rendering; the run fails if nothing was rendered.
+
+With --dir, images a previous run generated there are reused. Renders, the
+index and the settings go to a temporary folder removed afterwards, so
+nothing is written to the corpus directory.
+"""
+import argparse
+import contextlib
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from corpus import corpus_images, generate_corpus
+from wallpaper_backend import RecordingBackend, side_by_side
+from wallpaper_rotator import WallpaperRotator
+
+
+def percentile(sorted_values, fraction):
+    return sorted_values[min(len(sorted_values) - 1, int(fraction * len(sorted_values)))]
+
+
+def report(label, seconds):
+    values = sorted(seconds)
+    print(f"{label:>8}: mean {sum(values) / len(values) * 1000:8.2f} ms, "
+          f"p50 {percentile(values, 0.5) * 1000:8.2f} ms, "
+          f"p95 {percentile(values, 0.95) * 1000:8.2f} ms, "
+          f"max {values[-1] * 1000:8.2f} ms")
+
+
+def build_rotator(work_dir, monitors, latency_scale):
+    """Rotator on an in-memory desktop that writes every file it keeps under work_dir"""
+    sizes = [(2560, 1440) if i % 2 == 0 else (1440, 2560) for i in range(monitors)]
+    backend = RecordingBackend(side_by_side(sizes), latency_scale=latency_scale)
+    # A config file that doesn't exist yet leaves every setting at its default
+    rotator = WallpaperRotator(
+        config_file=os.path.join(work_dir, 'bench_config.json'), backend=backend)
+    rotator.index_file = os.path.join(work_dir, 'bench_index.db')
+    # Keep renders out of the user's cache and the corpus directory
+    rotator.render_cache_dir = os.path.join(work_dir, 'cache')
+    rotator.render_cache.directory = rotator.cache_dir()
+    rotator.cache_manifest_file = os.path.join(work_dir, 'bench_cache.json')
+    rotator.janitor.manifest_path = rotator.cache_manifest_file
+    rotator.prefetch_seconds = 0
+    for monitor in rotator.monitors:
+        rotator.active_monitors[monitor['id']] = monitor['orientation']
+        rotator.monitor_rotation_direction[monitor['id']] = 'left'
+        # Matching pools would never need a rotation, so nothing would be rendered
+        rotator.monitor_allow_all_orientations[monitor['id']] = True
+    return rotator, backend
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--monitors', type=int, default=3)
+    parser.add_argument('--count', type=int, default=200, help='Images in the corpus')
+    parser.add_argument('--cycles', type=int, default=50)
+    parser.add_argument('--size', default='4000x3000')
+    parser.add_argument('--latency-scale', type=float, default=1.0,
+                        help='Multiplier for simulated backend latencies (0 = none)')
+    parser.add_argument('--dir', help='Corpus directory; reused as-is if it already has images')
+    args = parser.parse_args()
+
+    width, height = (int(v) for v in args.size.split('x'))
+    directory = args.dir or tempfile.mkdtemp(prefix='wpchanger_rotate_')
+    paths = corpus_images(directory)
+    if paths:
+        print(f"Reusing {len(paths)} images in {directory}")
+    else:
+        print(f"Generating {args.count} images ({args.size}) in {directory}")
+        generate_corpus(directory, args.count, size=(width, height))
+
+    # A fresh render cache every run, so prepare never turns into cache hits
+    work_dir = tempfile.mkdtemp(prefix='wpchanger_rotate_work_')
+    rotator, backend = build_rotator(work_dir, args.monitors, args.latency_scale)
+    rotator.wallpaper_dir = directory
+    start = time.perf_counter()
+    count = rotator.scan_images(directory)
+    print(f"Scanned {count} images in {time.perf_counter() - start:.2f}s")
+
+    phases = {'select': [], 'prepare': [], 'apply': [], 'cycle': []}
+    # The rotator reports every wallpaper it sets; keep that out of the timings' output
+    with open(os.devnull, 'w') as devnull, contextlib.redirect_stdout(devnull):
+        for _ in range(args.cycles):
+            t0 = time.perf_counter()
+            selection = rotator.select_images()
+            t1 = time.perf_counter()
+            prepared = rotator.prepare_wallpapers(selection)
+            t2 = time.perf_counter()
+            rotator.apply_wallpapers(prepared)
+            t3 = time.perf_counter()
+            phases['select'].append(t1 - t0)
+            phases['prepare'].append(t2 - t1)
+            phases['apply'].append(t3 - t2)
+            phases['cycle'].append(t3 - t0)
+
+    print(f"{args.cycles} cycles on {args.monitors} monitors "
+          f"(latency scale {args.latency_scale:g})")
+    for label, seconds in phases.items():
+        report(label, seconds)
+    rotator.wait_for_notifications()
+    counts = backend.call_counts()
+    print("Backend calls: " + ", ".join(f"{name} {counts[name]}" for name in sorted(counts)))
+    rotator.wait_for_cleanup()
+    rendered = rotator.metrics.snapshot().get('render', {}).get('count', 0)
+    print(f"Rendered {rendered} images")
+    if rotator.image_index is not None:
+        rotator.image_index.close()
+    shutil.rmtree(work_dir, ignore_errors=True)
+    if not rendered:
+        print("Error: no image was rotated, so prepare measured no rendering")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
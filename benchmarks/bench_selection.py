@@ -0,0 +1,74 @@
+"""Time shuffle-bag vs. weighted selection on large synthetic catalogs
+
+Usage: python benchmarks/bench_selection.py [--sizes 100000,1000000] [--draws N]
+                                            [--updates N] [--monitors N]
+
+No image files are needed: the catalog is filled with the synthetic library
+of bench_catalog.py. The weighted policy gives every tenth folder a higher
+weight, boosts recently added images and down-weights shown ones, so draws
+exercise the Fenwick tree search, rejection of recently shown images and
+single-weight updates (images added while rotating).
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_catalog import build_catalog
+from selection import SelectionEngine
+from selection_policy import SelectionPolicy
+
+
+def weighted_policy(catalog):
+    folder_weights = {directory: 5 for directory in catalog.dirs[::10]}
+    return SelectionPolicy(folder_weights=folder_weights, recent_boost=3,
+                           shown_half_life_hours=24)
+
+
+def time_draws(engine, catalog, draws, monitors):
+    requests = [(monitor, 'all', catalog.all) for monitor in range(monitors)]
+    start = time.perf_counter()
+    engine.select(requests)  # Builds the bag
+    build = time.perf_counter() - start
+    start = time.perf_counter()
+    for _ in range(draws):
+        engine.select(requests)
+    return build, (time.perf_counter() - start) / draws
+
+
+def time_updates(engine, catalog, updates):
+    start = time.perf_counter()
+    for i in range(updates):
+        image_id = catalog.add(f"/bench/added/{i}.jpg", 3840, 2160, 'Landscape', None, time.time())
+        engine.item_added('all', image_id)
+    return (time.perf_counter() - start) / updates
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sizes', default='100000,1000000')
+    parser.add_argument('--dirs', type=int, default=5000, help='Directories in the library')
+    parser.add_argument('--draws', type=int, default=2000, help='Selections per measurement')
+    parser.add_argument('--updates', type=int, default=2000, help='Images added per measurement')
+    parser.add_argument('--monitors', type=int, default=3)
+    args = parser.parse_args()
+
+    for size in (int(value) for value in args.sizes.split(',')):
+        catalog = build_catalog(size, args.dirs)
+        print(f"{size} images, {args.monitors} monitors")
+        engines = {
+            'shuffle': SelectionEngine(random.Random(0)),
+            'weighted': SelectionEngine(random.Random(0), weighted_policy(catalog)),
+        }
+        for label, engine in engines.items():
+            build, draw = time_draws(engine, catalog, args.draws, args.monitors)
+            update = time_updates(engine, catalog, args.updates)
+            print(f"  {label:>8}: build {build * 1000:9.1f} ms, "
+                  f"select {draw * 1e6:8.1f} us, add {update * 1e6:8.1f} us")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,312 @@
+"""End-to-end benchmarks of scanning, selection and rendering with a JSON report
+
+Usage: python benchmarks/bench_suite.py [--count N] [--size WxH] [--formats LIST]
+                                        [--aspects LIST] [--exif LIST]
+                                        [--monitors N] [--cycles N] [--renders N]
+                                        [--dir PATH] [--output FILE] [--compare FILE]
+
+A synthetic corpus is generated (or reused with --dir) and the rotator is run
+against it with an in-memory desktop, so the suite runs on any platform:
+
+- scan: a cold scan with an empty index, then a warm rescan (images/s)
+- select: select_images latency per rotation cycle
+- prepare: prepare_wallpapers latency per cycle; every monitor accepts any
+  orientation, so images get rotated and the renders are counted
+- render: render_for_monitor plus save of single images for a 2560x1440 panel
+- peak RSS of each phase
+
+Generating the corpus and every phase run in a process of their own, so a
+phase's peak RSS isn't inflated by the ones before it. The cycles phase
+rescans the warm index first; that scan is included in its peak RSS.
+The index, renders and settings live in a temporary folder removed at the
+end, so nothing is written to the corpus directory.
+
+The report written to --output can be passed as --compare on a later commit to
+print the change of every metric.
+"""
+import argparse
+import contextlib
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench_rotate import build_rotator, percentile
+from corpus import DEFAULT_EXIF_ORIENTATIONS, DEFAULT_FORMATS, generate_corpus
+from image_probe import probe_image
+from image_render import DWPOS_FILL, oriented_size, render_for_monitor, target_size
+from wallpaper_rotator import IMAGE_EXTENSIONS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+REPORT_VERSION = 1
+RENDER_MONITOR = (2560, 1440)
+
+
+def peak_rss_bytes():
+    """Peak resident set size of this process so far"""
+    try:
+        import resource
+    except ImportError:
+        resource = None
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == 'darwin' else peak * 1024  # macOS reports bytes
+
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [('cb', wintypes.DWORD),
+                    ('PageFaultCount', wintypes.DWORD),
+                    ('PeakWorkingSetSize', ctypes.c_size_t),
+                    ('WorkingSetSize', ctypes.c_size_t),
+                    ('QuotaPeakPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t),
+                    ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                    ('PagefileUsage', ctypes.c_size_t),
+                    ('PeakPagefileUsage', ctypes.c_size_t)]
+
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    kernel32 = ctypes.windll.kernel32
+    psapi = ctypes.windll.psapi
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    psapi.GetProcessMemoryInfo.argtypes = [
+        wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+    psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(), ctypes.byref(counters), counters.cb)
+    return counters.PeakWorkingSetSize
+
+
+def latency_summary(seconds):
+    """{mean, p50, p95, max} in milliseconds"""
+    values = sorted(seconds)
+    if not values:
+        return None
+    return {
+        'mean': sum(values) / len(values) * 1000,
+        'p50': percentile(values, 0.5) * 1000,
+        'p95': percentile(values, 0.95) * 1000,
+        'max': values[-1] * 1000,
+    }
+
+
+def git_commit():
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=ROOT,
+                                capture_output=True, text=True, timeout=10)
+    except Exception:
+        return None
+    return result.stdout.strip() or None
+
+
+def parse_aspect(value):
+    width, height = (float(v) for v in value.split(':'))
+    return width / height
+
+
+def parse_exif(value):
+    return None if value == 'none' else int(value)
+
+
+def corpus_images(directory):
+    return sorted(entry.path for entry in os.scandir(directory)
+                  if entry.is_file() and os.path.splitext(entry.name)[1].lower() in IMAGE_EXTENSIONS)
+
+
+def remove_index(index_file):
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(index_file + suffix):
+            os.remove(index_file + suffix)
+
+
+def bench_scan(directory, work_dir, monitors, cold):
+    rotator, _ = build_rotator(work_dir, monitors, 0)
+    if cold:
+        remove_index(rotator.index_file)
+    rotator.wallpaper_dir = directory
+    start = time.perf_counter()
+    count = rotator.scan_images(directory)
+    elapsed = time.perf_counter() - start
+    return rotator, {'images': count, 'seconds': elapsed,
+                     'images_per_s': count / elapsed if elapsed else None}
+
+
+def bench_cycles(directory, work_dir, monitors, cycles):
+    rotator, _ = bench_scan(directory, work_dir, monitors, cold=False)
+    select, prepare = [], []
+    for _ in range(cycles):
+        start = time.perf_counter()
+        selection = rotator.select_images()
+        selected = time.perf_counter()
+        prepared = rotator.prepare_wallpapers(selection)
+        select.append(selected - start)
+        prepare.append(time.perf_counter() - selected)
+        rotator.apply_wallpapers(prepared)
+    rotator.wait_for_cleanup()
+    rendered = rotator.metrics.snapshot().get('render', {}).get('count', 0)
+    if rotator.image_index is not None:
+        rotator.image_index.close()
+    return {'select_ms': latency_summary(select), 'prepare_ms': latency_summary(prepare),
+            'renders': rendered}
+
+
+def bench_render(paths, out_dir):
+    seconds = []
+    for i, path in enumerate(paths):
+        info = probe_image(path)
+        if info is None:
+            continue
+        start = time.perf_counter()
+        output_size = target_size(oriented_size(*info, 'left'), RENDER_MONITOR, DWPOS_FILL)
+        img = render_for_monitor(path, info, 'left', output_size)
+        img.convert('RGB').save(os.path.join(out_dir, f"render_{i}.jpg"), quality=95)
+        img.close()
+        seconds.append(time.perf_counter() - start)
+    return latency_summary(seconds)
+
+
+def run_phase(args, directory, out_dir):
+    """Run one phase in this process; returns its metrics"""
+    if args.phase == 'corpus':
+        width, height = (int(v) for v in args.size.split('x'))
+        paths = generate_corpus(
+            directory, args.count, size=(width, height), formats=tuple(args.formats.split(',')),
+            aspects=[parse_aspect(value) for value in args.aspects.split(',') if value],
+            exif_orientations=[parse_exif(value) for value in args.exif.split(',')])
+        return {'images': len(paths)}
+    if args.phase in ('scan_cold', 'scan_warm'):
+        rotator, metrics = bench_scan(directory, out_dir, args.monitors,
+                                      cold=args.phase == 'scan_cold')
+        if rotator.image_index is not None:
+            rotator.image_index.close()
+        return metrics
+    if args.phase == 'cycles':
+        return bench_cycles(directory, out_dir, args.monitors, args.cycles)
+    if args.phase == 'render':
+        return bench_render(corpus_images(directory)[:args.renders], out_dir)
+    raise ValueError(f"Unknown phase {args.phase!r}")
+
+
+def spawn_phase(phase, directory, out_dir):
+    """Run a phase in a fresh interpreter; returns (metrics, peak RSS in MB)"""
+    command = [sys.executable, os.path.abspath(__file__), *sys.argv[1:],
+               '--dir', directory, '--out-dir', out_dir, '--phase', phase]
+    result = subprocess.run(command, capture_output=True, text=True)
+    if result.returncode != 0:
+        print(result.stdout + result.stderr)
+        print(f"Error: phase {phase} failed with exit code {result.returncode}")
+        sys.exit(1)
+    # The result is the last line; everything before it is the rotator's log
+    phase_result = json.loads(result.stdout.strip().splitlines()[-1])
+    return phase_result['metrics'], phase_result['peak_rss_mb']
+
+
+def flatten(metrics, prefix=''):
+    flat = {}
+    for key, value in metrics.items():
+        if isinstance(value, dict):
+            flat.update(flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[f"{prefix}{key}"] = value
+    return flat
+
+
+def compare(previous, report):
+    print(f"Compared with {previous.get('commit') or 'previous report'} "
+          f"({previous.get('timestamp')}):")
+    old = flatten(previous.get('metrics', {}))
+    new = flatten(report['metrics'])
+    for key in sorted(new):
+        if key in old and old[key]:
+            change = (new[key] - old[key]) / old[key] * 100
+            print(f"  {key:<32} {old[key]:12.2f} -> {new[key]:12.2f}  {change:+6.1f}%")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--count', type=int, default=500, help='Images in the corpus')
+    parser.add_argument('--size', default='4000x3000', help='Pixel count of each image, as WxH')
+    parser.add_argument('--formats', default=','.join(DEFAULT_FORMATS))
+    parser.add_argument('--aspects', default='16:9,9:16,4:3,3:4,21:9,32:9',
+                        help="Width:height ratios to cycle through, or '' to alternate --size")
+    parser.add_argument('--exif', default=','.join(
+        'none' if value is None else str(value) for value in DEFAULT_EXIF_ORIENTATIONS),
+        help="EXIF orientations to pick from ('none' for no tag)")
+    parser.add_argument('--monitors', type=int, default=3)
+    parser.add_argument('--cycles', type=int, default=50)
+    parser.add_argument('--renders', type=int, default=20, help='Images rendered one by one')
+    parser.add_argument('--dir', help='Corpus directory; reused as-is if it already has images')
+    parser.add_argument('--output', default='benchmark_report.json')
+    parser.add_argument('--compare', help='Earlier report to compare against')
+    # Internal: run a single phase in this process and print its result as JSON
+    parser.add_argument('--phase', help=argparse.SUPPRESS)
+    parser.add_argument('--out-dir', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.phase:
+        # The rotator logs every step; keep that apart from the result line
+        with contextlib.redirect_stdout(sys.stderr):
+            metrics = run_phase(args, args.dir, args.out_dir)
+        print(json.dumps({'metrics': metrics, 'peak_rss_mb': peak_rss_bytes() / 2**20}))
+        return
+
+    formats = tuple(args.formats.split(','))
+    directory = args.dir or tempfile.mkdtemp(prefix='wpchanger_suite_')
+    out_dir = tempfile.mkdtemp(prefix='wpchanger_suite_out_')
+    paths = corpus_images(directory) if os.path.isdir(directory) else []
+    if paths:
+        print(f"Reusing {len(paths)} images in {directory}")
+    else:
+        print(f"Generating {args.count} images in {directory}")
+        spawn_phase('corpus', directory, out_dir)
+        paths = corpus_images(directory)
+
+    metrics = {'peak_rss_mb': {}}
+    for phase in ('scan_cold', 'scan_warm', 'cycles', 'render'):
+        print(f"Running {phase}")
+        result, metrics['peak_rss_mb'][phase] = spawn_phase(phase, directory, out_dir)
+        if phase == 'cycles':
+            metrics.update(result)
+        elif phase == 'render':
+            metrics['render_ms'] = result
+        else:
+            metrics[phase] = result
+    shutil.rmtree(out_dir, ignore_errors=True)
+    if not metrics['renders']:
+        print("Error: no image was rotated, so prepare measured no rendering")
+        sys.exit(1)
+
+    report = {
+        'version': REPORT_VERSION,
+        'commit': git_commit(),
+        'timestamp': datetime.now().isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'parameters': {
+            'count': len(paths), 'size': args.size, 'formats': list(formats),
+            'aspects': args.aspects, 'exif': args.exif,
+            'monitors': args.monitors, 'cycles': args.cycles, 'renders': args.renders,
+        },
+        'metrics': metrics,
+    }
+    for key, value in sorted(flatten(metrics).items()):
+        print(f"  {key:<32} {value:12.2f}")
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"Report written to {args.output}")
+
+    if args.compare:
+        with open(args.compare) as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,93 @@
+"""Synthetic image corpus generation for benchmarks"""
+import math
+import os
+import random
+
+from PIL import Image
+
+
+DEFAULT_FORMATS = ('jpeg', 'progressive_jpeg', 'png', 'bmp', 'gif', 'tiff')
+
+FORMAT_EXTENSIONS = {
+    'jpeg': '.jpg',
+    'progressive_jpeg': '.jpeg',
+    'png': '.png',
+    'bmp': '.bmp',
+    'gif': '.gif',
+    'tiff': '.tiff',
+}
+
+
+def save_image(img, path, fmt, exif_orientation=None):
+    """Save img in the given corpus format, optionally tagging EXIF orientation"""
+    kwargs = {}
+    if exif_orientation and fmt in ('jpeg', 'progressive_jpeg', 'png', 'tiff'):
+        exif = Image.Exif()
+        exif[274] = exif_orientation
+        kwargs['exif'] = exif
+
+    if fmt == 'jpeg':
+        img.save(path, 'JPEG', quality=90, **kwargs)
+    elif fmt == 'progressive_jpeg':
+        img.save(path, 'JPEG', quality=90, progressive=True, **kwargs)
+    elif fmt == 'png':
+        img.save(path, 'PNG', **kwargs)
+    elif fmt == 'bmp':
+        img.save(path, 'BMP')
+    elif fmt == 'gif':
+        img.convert('P').save(path, 'GIF')
+    elif fmt == 'tiff':
+        img.save(path, 'TIFF', **kwargs)
+
+
+DEFAULT_EXIF_ORIENTATIONS = (None, 1, 6, 8)
+
+
+def aspect_size(size, aspect):
+    """Dimensions with the pixel count of size and the given width/height ratio"""
+    area = size[0] * size[1]
+    width = max(1, round(math.sqrt(area * aspect)))
+    return width, max(1, round(width / aspect))
+
+
+def generate_corpus(directory, count, size=(1600, 1200), formats=DEFAULT_FORMATS, seed=0,
+                    aspects=None, exif_orientations=DEFAULT_EXIF_ORIENTATIONS):
+    """Write count synthetic images into directory and return their paths
+
+    Without aspects, sources alternate between size and its portrait
+    transpose. Otherwise each image cycles through the given width/height
+    ratios at the pixel count of size.
+    """
+    rng = random.Random(seed)
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for i in range(count):
+        fmt = formats[i % len(formats)]
+        if aspects:
+            width, height = aspect_size(size, aspects[i % len(aspects)])
+        else:
+            # Alternate between landscape and portrait sources
+            width, height = size if i % 2 == 0 else (size[1], size[0])
+        img = Image.new('RGB', (width, height), (rng.randrange(256),
+                                                 rng.randrange(256),
+                                                 rng.randrange(256)))
+        # A few random blocks so perceptual hashes differ between images
+        for _ in range(4):
+            x0, y0 = rng.randrange(width), rng.randrange(height)
+            box = (x0, y0, rng.randint(x0 + 1, width), rng.randint(y0 + 1, height))
+            img.paste((rng.randrange(256), rng.randrange(256), rng.randrange(256)), box)
+        exif_orientation = rng.choice(exif_orientations)
+        path = os.path.join(directory, f"img_{i:06d}{FORMAT_EXTENSIONS[fmt]}")
+        save_image(img, path, fmt, exif_orientation)
+        paths.append(path)
+    return paths
+
+
+def corpus_images(directory):
+    """Paths of the images generate_corpus left in directory, sorted"""
+    if not os.path.isdir(directory):
+        return []
+    extensions = set(FORMAT_EXTENSIONS.values())
+    return sorted(entry.path for entry in os.scandir(directory)
+                  if entry.is_file() and entry.name.startswith('img_')
+                  and os.path.splitext(entry.name)[1] in extensions)
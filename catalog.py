@@ -0,0 +1,288 @@
+"""Compact columnar catalog of every scanned image.
+
+Keeping hundreds of thousands of full path strings in several Python lists
+(plus dicts for O(1) removal) costs hundreds of bytes per image in a process
+that sits in the tray all day. The catalog stores each image once as a row of
+fixed-width array columns:
+
+- dir id: index into the interned directory list, so long library prefixes
+  are stored once per directory
+- name: UTF-8 bytes in one shared buffer, addressed by an offsets column
+- width, height, orientation, perceptual hash, time added and flags
+
+Orientation pools are arrays of row ids, an AspectIndex buckets rows by aspect
+ratio, a DuplicateIndex hides near-duplicate copies, and path lookups go
+through an open-addressing hash table held in an int array. Rows are never
+reused: removing an image only sets its deleted flag, so ids held elsewhere
+(e.g. by the selection engine) stay valid.
+"""
+import os
+from array import array
+
+from aspect_index import AspectIndex
+from dedup import DuplicateIndex
+
+
+ORIENTATION_UNKNOWN = 0
+ORIENTATION_PORTRAIT = 1
+ORIENTATION_LANDSCAPE = 2
+
+ORIENTATION_CODES = {
+    None: ORIENTATION_UNKNOWN,
+    'Portrait': ORIENTATION_PORTRAIT,
+    'Landscape': ORIENTATION_LANDSCAPE,
+}
+ORIENTATION_NAMES = {code: name for name, code in ORIENTATION_CODES.items()}
+
+FLAG_DELETED = 0x01
+FLAG_DUPLICATE = 0x02  # Hidden behind a better copy of the same picture
+FLAG_HASHED = 0x04  # dhash column holds a perceptual hash
+HIDDEN_FLAGS = FLAG_DELETED | FLAG_DUPLICATE
+
+EMPTY_SLOT = -1
+
+
+def _encode_name(name):
+    return name.encode('utf-8', 'surrogatepass')
+
+
+def added_time(st):
+    """When a file appeared in the library, from its stat result
+
+    Copying keeps a file's mtime, so the later of mtime and creation time is
+    used (inode change time where creation time isn't reported).
+    """
+    created = getattr(st, 'st_birthtime', None) or st.st_ctime
+    return max(st.st_mtime, created)
+
+
+class CatalogPool:
+    """Array of catalog row ids for one orientation (or all images)
+
+    Supports len(), iteration over visible ids, O(1) membership tests and
+    snapshot() for the selection engine. Removed rows are skipped lazily and
+    purged once they make up half of the array; hidden duplicates stay in the
+    array so they can reappear.
+    """
+
+    def __init__(self, catalog, orientation=None):
+        self.catalog = catalog
+        self.orientation = orientation  # Orientation code, or None for every image
+        self.ids = array('I')
+        self.live = 0  # Visible ids
+        self.deleted = 0  # Deleted ids still in the array
+
+    def __contains__(self, image_id):
+        catalog = self.catalog
+        if not isinstance(image_id, int) or not catalog.is_visible(image_id):
+            return False
+        return self.orientation is None or catalog.orientation[image_id] == self.orientation
+
+    def __len__(self):
+        return self.live
+
+    def __iter__(self):
+        flags = self.catalog.flags
+        return (image_id for image_id in self.ids
+                if not flags[image_id] & HIDDEN_FLAGS)
+
+    def snapshot(self):
+        """Copy of the live ids as a mutable array"""
+        return array('I', self)
+
+    def paths(self, limit=None):
+        """Paths of the first limit live images"""
+        result = []
+        for image_id in self:
+            if limit is not None and len(result) >= limit:
+                break
+            result.append(self.catalog.path(image_id))
+        return result
+
+    def _append(self, image_id):
+        self.ids.append(image_id)
+        self.live += 1
+
+    def _removed(self, visible):
+        if visible:
+            self.live -= 1
+        self.deleted += 1
+        if len(self.ids) > 64 and self.deleted * 2 > len(self.ids):
+            flags = self.catalog.flags
+            self.ids = array('I', (image_id for image_id in self.ids
+                                   if not flags[image_id] & FLAG_DELETED))
+            self.deleted = 0
+
+
+class ImageCatalog:
+    def __init__(self):
+        self.dirs = []  # {dir id: directory path}
+        self.dir_lookup = {}  # {directory path: dir id}
+
+        self.dir_id = array('I')
+        self.name_offset = array('Q', [0])  # Name i is names[name_offset[i]:name_offset[i + 1]]
+        self.names = bytearray()
+        self.width = array('I')
+        self.height = array('I')
+        self.orientation = array('B')
+        self.flags = array('B')
+        self.dhash = array('Q')  # Perceptual hash, valid where FLAG_HASHED is set
+        self.added = array('I')  # When the file appeared, in whole seconds since the epoch
+        self.path_hash = array('q')
+
+        self.table = array('i', [EMPTY_SLOT]) * 1024
+        self.table_used = 0  # Slots taken, including ones pointing at deleted rows
+
+        self.all = CatalogPool(self)
+        self.portrait = CatalogPool(self, ORIENTATION_PORTRAIT)
+        self.landscape = CatalogPool(self, ORIENTATION_LANDSCAPE)
+        self.aspects = AspectIndex(self)
+        self.duplicates = DuplicateIndex(self)
+        self.live = 0
+
+    def __len__(self):
+        return self.live
+
+    def _intern_dir(self, directory):
+        dir_id = self.dir_lookup.get(directory)
+        if dir_id is None:
+            dir_id = len(self.dirs)
+            self.dirs.append(directory)
+            self.dir_lookup[directory] = dir_id
+        return dir_id
+
+    def name(self, image_id):
+        start = self.name_offset[image_id]
+        end = self.name_offset[image_id + 1]
+        return self.names[start:end].decode('utf-8', 'surrogatepass')
+
+    def path(self, image_id):
+        return os.path.join(self.dirs[self.dir_id[image_id]], self.name(image_id))
+
+    def get_orientation(self, image_id):
+        return ORIENTATION_NAMES[self.orientation[image_id]]
+
+    def is_live(self, image_id):
+        return 0 <= image_id < len(self.flags) and not self.flags[image_id] & FLAG_DELETED
+
+    def is_visible(self, image_id):
+        """Live and not hidden as a near-duplicate"""
+        return 0 <= image_id < len(self.flags) and not self.flags[image_id] & HIDDEN_FLAGS
+
+    def _pools_for(self, image_id):
+        code = self.orientation[image_id]
+        if code == ORIENTATION_PORTRAIT:
+            return self.all, self.portrait
+        if code == ORIENTATION_LANDSCAPE:
+            return self.all, self.landscape
+        return (self.all,)
+
+    def add(self, path, width=0, height=0, orientation=None, dhash=None, added=0):
+        """Add an image row and return its id (the existing id if already present)
+
+        The new row may be hidden straight away as a near-duplicate; ids of
+        rows made visible by later changes are collected by the duplicate
+        index (see take_promoted).
+        """
+        existing = self.find(path)
+        if existing is not None:
+            return existing
+
+        directory, name = os.path.split(path)
+        image_id = len(self.flags)
+        self.dir_id.append(self._intern_dir(directory))
+        self.names += _encode_name(name)
+        self.name_offset.append(len(self.names))
+        self.width.append(width or 0)
+        self.height.append(height or 0)
+        code = ORIENTATION_CODES.get(orientation, ORIENTATION_UNKNOWN)
+        self.orientation.append(code)
+        self.flags.append(0 if dhash is None else FLAG_HASHED)
+        self.dhash.append(dhash or 0)
+        self.added.append(max(0, int(added or 0)))
+        self.path_hash.append(hash(path))
+        self._insert_slot(image_id)
+        self.aspects.add(image_id, width, height)
+        self.live += 1
+
+        for pool in self._pools_for(image_id):
+            pool._append(image_id)
+        if dhash is not None:
+            self.duplicates.add(image_id, dhash)
+        return image_id
+
+    def remove(self, image_id):
+        """Mark a row deleted; returns False if it already was"""
+        if not self.is_live(image_id):
+            return False
+        visible = self.is_visible(image_id)
+        self.flags[image_id] |= FLAG_DELETED
+        self.live -= 1
+        for pool in self._pools_for(image_id):
+            pool._removed(visible)
+        self.aspects.removed(image_id, visible)
+        self.duplicates.removed(image_id)
+        return True
+
+    def set_duplicate(self, image_id, hidden):
+        """Hide or show a live row as a near-duplicate; True if that changed anything"""
+        if not self.is_live(image_id):
+            return False
+        if bool(self.flags[image_id] & FLAG_DUPLICATE) == hidden:
+            return False
+        if hidden:
+            self.flags[image_id] |= FLAG_DUPLICATE
+        else:
+            self.flags[image_id] &= ~FLAG_DUPLICATE & 0xFF
+        delta = -1 if hidden else 1
+        for pool in self._pools_for(image_id):
+            pool.live += delta
+        self.aspects.visibility_changed(image_id, delta)
+        return True
+
+    def take_promoted(self):
+        """Ids of rows shown again (a better copy was removed) since the last call"""
+        return self.duplicates.take_promoted()
+
+    def find(self, path):
+        """Return the id of the live row for path, or None"""
+        path_hash = hash(path)
+        mask = len(self.table) - 1
+        slot = path_hash & mask
+        while True:
+            image_id = self.table[slot]
+            if image_id == EMPTY_SLOT:
+                return None
+            if (self.path_hash[image_id] == path_hash
+                    and not self.flags[image_id] & FLAG_DELETED
+                    and self.path(image_id) == path):
+                return image_id
+            slot = (slot + 1) & mask
+
+    def _insert_slot(self, image_id):
+        # Keep the table at most half full so probe chains stay short
+        if (self.table_used + 1) * 2 > len(self.table):
+            self._rebuild_table()
+        mask = len(self.table) - 1
+        slot = self.path_hash[image_id] & mask
+        while self.table[slot] != EMPTY_SLOT:
+            slot = (slot + 1) & mask
+        self.table[slot] = image_id
+        self.table_used += 1
+
+    def _rebuild_table(self):
+        """Grow the hash table, dropping slots of deleted rows"""
+        size = len(self.table)
+        while size < (self.live + 1) * 4:
+            size *= 2
+        self.table = array('i', [EMPTY_SLOT]) * size
+        self.table_used = 0
+        mask = size - 1
+        for image_id in range(len(self.flags)):
+            if self.flags[image_id] & FLAG_DELETED:
+                continue
+            slot = self.path_hash[image_id] & mask
+            while self.table[slot] != EMPTY_SLOT:
+                slot = (slot + 1) & mask
+            self.table[slot] = image_id
+            self.table_used += 1
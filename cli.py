@@ -0,0 +1,210 @@
+"""Headless command line for the wallpaper rotator.
+
+    python wpchanger.py --daemon       rotate on the saved schedule, no window
+    python wpchanger.py scan           scan the wallpaper directory and exit
+    python wpchanger.py rotate-once    change the wallpapers once and exit
+    python wpchanger.py stats          show monitors, settings and index stats
+
+All modes use the settings saved by the window (wallpaper_rotator_config.json)
+and never import tkinter or pystray, so they start fast on machines that never
+show the UI.
+"""
+import argparse
+import os
+import queue
+import signal
+import threading
+import time
+from datetime import datetime
+
+from wallpaper_rotator import WallpaperRotator
+
+
+def log(message):
+    print(f"{datetime.now().strftime('%H:%M:%S')} - {message}", flush=True)
+
+
+def scan(rotator):
+    """Scan the wallpaper directory, returning the image count"""
+    directory = rotator.wallpaper_dir
+    if not directory or not os.path.isdir(directory):
+        log(f"Wallpaper directory not found: {directory}")
+        return 0
+
+    def progress(current, total):
+        if current and current % 1000 == 0:
+            log(f"Processing images: {current}")
+
+    start = time.perf_counter()
+    count = rotator.scan_images(directory, progress)
+    log(f"Found {count} images in {directory} ({time.perf_counter() - start:.1f}s)")
+    if rotator.use_image_orientation:
+        log(f"  Portrait: {len(rotator.portrait_images)}, "
+            f"Landscape: {len(rotator.landscape_images)}")
+    duplicates = rotator.catalog.duplicates.hidden_count()
+    if duplicates:
+        log(f"  Hiding {duplicates} near-duplicate copies")
+    return count
+
+
+def check_ready(rotator):
+    if not rotator.active_monitors:
+        log("No active monitors - select monitors in the window first")
+        return False
+    # Listing monitors also loads COM here, on the thread that sets wallpapers
+    connected = {monitor['id'] for monitor in rotator.monitors}
+    if not connected.intersection(rotator.active_monitors):
+        log("None of the selected monitors is connected")
+        return False
+    if not rotator.image_files:
+        log("No images to show")
+        return False
+    return True
+
+
+def command_scan(rotator, args):
+    return 0 if scan(rotator) else 1
+
+
+def command_rotate_once(rotator, args):
+    rotator.reconcile_render_cache()
+    scan(rotator)
+    if not check_ready(rotator):
+        return 1
+    result = rotator.rotate_wallpaper()
+    # The change notification is sent on a worker thread; don't exit under it
+    rotator.wait_for_notifications(timeout=10)
+    rotator.wait_for_cleanup(timeout=30)
+    for line in rotator.metrics.format_lines():
+        log(line)
+    return 0 if result else 1
+
+
+def command_stats(rotator, args):
+    log(f"Config file: {os.path.abspath(rotator.config_file)}")
+    log(f"Wallpaper directory: {rotator.wallpaper_dir}")
+    log(f"Rotation interval: {rotator.rotation_interval} minutes")
+    for monitor in rotator.monitors:
+        orientation = rotator.active_monitors.get(monitor['id'])
+        state = f"active, {orientation}" if orientation else "inactive"
+        log(f"Monitor {monitor['index']}: {monitor['rect']} at "
+            f"({monitor['left']}, {monitor['top']}) - {state}")
+
+    directory = rotator.wallpaper_dir
+    # Only read an index a scan has written; opening it would create an empty one
+    image_index = None
+    if directory and os.path.exists(rotator.index_file):
+        image_index = rotator.open_image_index()
+    if image_index:
+        # Read what the last scan recorded instead of walking the library
+        entries = image_index.snapshot(directory).values()
+        portrait = sum(1 for entry in entries if entry[5] == 'Portrait')
+        hashed = sum(1 for entry in entries if entry[6] is not None)
+        unhashable = sum(1 for entry in entries if entry[7])
+        log(f"Indexed images: {len(entries)} (Portrait: {portrait}, "
+            f"Landscape: {len(entries) - portrait}, hashed: {hashed}, "
+            f"unhashable: {unhashable})")
+    elif directory:
+        log("Indexed images: none yet - run scan first")
+
+    # The manifest saved by the last run, without listing any directory
+    cache = rotator.render_cache
+    cache.load_manifest(rotator.cache_manifest_file)
+    log(f"Render cache: {len(cache.entries)} files in {len(cache.directories)} folders, "
+        f"{cache.total_bytes / 2**20:.1f} of {cache.max_bytes / 2**20:.0f} MB")
+    return 0
+
+
+def run_daemon(rotator, args):
+    """Rotate on the configured schedule until interrupted"""
+    rotator.reconcile_render_cache()
+    scan(rotator)
+    if not check_ready(rotator):
+        return 1
+
+    stop_event = threading.Event()
+
+    def request_stop(signum, frame):
+        stop_event.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+    if hasattr(signal, 'SIGBREAK'):
+        signal.signal(signal.SIGBREAK, request_stop)
+
+    # Watcher events are applied on this thread, like the window does on the Tk thread
+    watch_queue = queue.Queue()
+    if rotator.watch_directory and rotator.start_watching(watch_queue.put):
+        log("Watching directory for changes")
+
+    if rotator.start_metrics_server():
+        log(f"Serving timings on http://127.0.0.1:{rotator.metrics_http_port}/metrics")
+
+    rotator.start_rotation()
+    interval = rotator.rotation_interval * 60
+    lead = min(rotator.prefetch_seconds, interval / 2)
+    next_rotation = time.monotonic() + interval
+    prefetched = lead <= 0
+
+    try:
+        while not stop_event.is_set():
+            now = time.monotonic()
+            if not prefetched and now >= next_rotation - lead:
+                rotator.start_prefetch()
+                prefetched = True
+            if now >= next_rotation:
+                log("Rotating wallpaper")
+                rotator.rotate_wallpaper()
+                next_rotation = now + interval
+                prefetched = lead <= 0
+
+            try:
+                events = watch_queue.get(timeout=1.0)
+            except queue.Empty:
+                continue
+            added, removed = rotator.apply_fs_events(events)
+            if added or removed:
+                log(f"Directory changed: {added} added, {removed} removed "
+                    f"({len(rotator.image_files)} images)")
+    finally:
+        rotator.stop_watching()
+        rotator.stop_rotation()
+        rotator.wait_for_notifications(timeout=10)
+        rotator.wait_for_cleanup(timeout=30)
+        rotator.stop_metrics_server()
+        log("Stopped")
+    return 0
+
+
+COMMANDS = {
+    'scan': command_scan,
+    'rotate-once': command_rotate_once,
+    'stats': command_stats,
+}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        prog='wpchanger',
+        description="Multi-monitor wallpaper rotator (headless mode)")
+    parser.add_argument('--daemon', action='store_true',
+                        help="Rotate wallpapers on the saved schedule without a window")
+    parser.add_argument('--config', default='wallpaper_rotator_config.json',
+                        help="Settings file (default: %(default)s)")
+    parser.add_argument('--directory', help="Override the saved wallpaper directory")
+    parser.add_argument('command', nargs='?', choices=sorted(COMMANDS))
+    args = parser.parse_args(argv)
+    if args.daemon == bool(args.command):
+        parser.error("give either --daemon or one command")
+
+    rotator = WallpaperRotator(config_file=args.config)
+    if args.directory:
+        # Only for this run - the saved settings are left alone
+        rotator.wallpaper_dir = os.path.abspath(args.directory)
+    try:
+        if args.daemon:
+            return run_daemon(rotator, args)
+        return COMMANDS[args.command](rotator, args)
+    finally:
+        if rotator.image_index is not None:
+            rotator.image_index.close()
@@ -0,0 +1,128 @@
+"""Near-duplicate grouping over the image catalog.
+
+Images whose perceptual hashes differ in at most max_distance bits are put in
+one group, and only the group's largest image stays visible to the pools, so
+the selector treats every group as a single candidate.
+
+Matches are found with multi-index hashing: the 64-bit hash is split into
+max_distance + 1 chunks, and by the pigeonhole principle two hashes within
+max_distance bits agree exactly on at least one chunk. Each chunk value maps
+to the ids having it, so a lookup only compares against a handful of
+candidates instead of the whole library.
+"""
+from array import array
+
+
+# Max differing bits between near-duplicate hashes. Resized and re-encoded
+# copies typically differ in 0-2 bits; 3 gives four 16-bit chunks, which keeps
+# candidate buckets small even for a million images.
+DUPLICATE_DISTANCE = 3
+HASH_BITS = 64
+
+if hasattr(int, 'bit_count'):
+    popcount = int.bit_count
+else:
+    def popcount(value):
+        return bin(value).count('1')
+
+
+def hamming(a, b):
+    return popcount(a ^ b)
+
+
+def _chunk_spans(chunks):
+    """(shift, mask) of each chunk of a HASH_BITS-bit value"""
+    spans = []
+    start = 0
+    for i in range(chunks):
+        width = HASH_BITS // chunks + (1 if i < HASH_BITS % chunks else 0)
+        spans.append((start, (1 << width) - 1))
+        start += width
+    return spans
+
+
+class DuplicateIndex:
+    def __init__(self, catalog, max_distance=DUPLICATE_DISTANCE):
+        self.catalog = catalog
+        self.max_distance = max_distance
+        self.spans = _chunk_spans(max_distance + 1)
+        self.tables = [{} for _ in self.spans]  # Per chunk: {chunk value: array of ids}
+        self.group_of = {}  # {id: group id}, only for images with near-duplicates
+        self.groups = {}  # {group id: [ids]}
+        self.promoted = []  # Ids made visible again since take_promoted()
+
+    def hidden_count(self):
+        """Images currently hidden behind a better copy"""
+        return sum(len(members) - 1 for members in self.groups.values())
+
+    def add(self, image_id, dhash):
+        """Index a new image's hash and group it with its near-duplicates"""
+        catalog = self.catalog
+        hashes = catalog.dhash
+        max_distance = self.max_distance
+        matches = set()
+        for (shift, mask), table in zip(self.spans, self.tables):
+            key = (dhash >> shift) & mask
+            bucket = table.get(key)
+            if bucket is None:
+                bucket = table[key] = array('I')
+            for other in bucket:
+                if (popcount(dhash ^ hashes[other]) <= max_distance
+                        and other not in matches and catalog.is_live(other)):
+                    matches.add(other)
+            bucket.append(image_id)
+        if not matches:
+            return
+
+        # Merge every group the new image connects into one
+        members = [image_id]
+        for other in matches:
+            group_id = self.group_of.get(other)
+            if group_id is None:
+                members.append(other)
+            elif group_id in self.groups:
+                members.extend(self.groups.pop(group_id))
+        group_id = min(members)
+        members = sorted(set(members))
+        self.groups[group_id] = members
+        for member in members:
+            self.group_of[member] = group_id
+        self._elect(group_id)
+
+    def removed(self, image_id):
+        """Update the group of a catalog row marked deleted"""
+        group_id = self.group_of.pop(image_id, None)
+        if group_id is None:
+            return
+        members = self.groups.pop(group_id)
+        members.remove(image_id)
+        if len(members) == 1:
+            # The last copy left is no longer a duplicate of anything
+            del self.group_of[members[0]]
+            self._show(members[0])
+            return
+        new_group_id = min(members)
+        self.groups[new_group_id] = members
+        for member in members:
+            self.group_of[member] = new_group_id
+        self._elect(new_group_id)
+
+    def _elect(self, group_id):
+        """Keep only the largest image of a group visible"""
+        catalog = self.catalog
+        members = self.groups[group_id]
+        best = max(members, key=lambda i: (catalog.width[i] * catalog.height[i], -i))
+        for member in members:
+            if member == best:
+                self._show(member)
+            else:
+                catalog.set_duplicate(member, True)
+
+    def _show(self, image_id):
+        if self.catalog.set_duplicate(image_id, False):
+            self.promoted.append(image_id)
+
+    def take_promoted(self):
+        promoted = self.promoted
+        self.promoted = []
+        return promoted
@@ -0,0 +1,68 @@
+"""COM binding for the Windows IDesktopWallpaper interface.
+
+Importing comtypes initializes COM on the importing thread and loading its
+client machinery is one of the slower parts of startup, so this module is
+only imported when the rotator first talks to the desktop.
+"""
+import comtypes.client
+from comtypes import GUID, COMMETHOD
+from ctypes import c_wchar_p, c_uint, POINTER, c_int
+from ctypes.wintypes import UINT, RECT
+
+
+# IDesktopWallpaper interface definitions
+CLSID_DesktopWallpaper = GUID('{C2CF3110-460E-4fc1-B9D0-8A1C0C9CC4BD}')
+IID_IDesktopWallpaper = GUID('{B92B56A9-8B55-4E14-9A89-0199BBB6F93B}')
+
+
+class IDesktopWallpaper(comtypes.IUnknown):
+    _iid_ = IID_IDesktopWallpaper
+    _methods_ = [
+        COMMETHOD([], UINT, 'SetWallpaper',
+                  (['in'], c_wchar_p, 'monitorID'),
+                  (['in'], c_wchar_p, 'wallpaper')),
+        COMMETHOD([], UINT, 'GetWallpaper',
+                  (['in'], c_wchar_p, 'monitorID'),
+                  (['out'], POINTER(c_wchar_p), 'wallpaper')),
+        COMMETHOD([], UINT, 'GetMonitorDevicePathAt',
+                  (['in'], UINT, 'monitorIndex'),
+                  (['out'], POINTER(c_wchar_p), 'monitorID')),
+        COMMETHOD([], UINT, 'GetMonitorDevicePathCount',
+                  (['out'], POINTER(UINT), 'count')),
+        COMMETHOD([], UINT, 'GetMonitorRECT',
+                  (['in'], c_wchar_p, 'monitorID'),
+                  (['out'], POINTER(RECT), 'displayRect')),
+        COMMETHOD([], UINT, 'SetPosition',
+                  (['in'], c_int, 'position')),
+        COMMETHOD([], UINT, 'GetPosition',
+                  (['out'], POINTER(c_int), 'position')),
+        COMMETHOD([], UINT, 'SetBackgroundColor',
+                  (['in'], c_uint, 'color')),
+        COMMETHOD([], UINT, 'GetBackgroundColor',
+                  (['out'], POINTER(c_uint), 'color')),
+        COMMETHOD([], UINT, 'SetSlideshow',
+                  (['in'], POINTER(comtypes.IUnknown), 'items')),
+        COMMETHOD([], UINT, 'GetSlideshow',
+                  (['out'], POINTER(POINTER(comtypes.IUnknown)), 'items')),
+        COMMETHOD([], UINT, 'SetSlideshowOptions',
+                  (['in'], c_uint, 'options'),
+                  (['in'], c_uint, 'slideshowTick')),
+        COMMETHOD([], UINT, 'GetSlideshowOptions',
+                  (['out'], POINTER(c_uint), 'options'),
+                  (['out'], POINTER(c_uint), 'slideshowTick')),
+        COMMETHOD([], UINT, 'AdvanceSlideshow',
+                  (['in'], c_wchar_p, 'monitorID'),
+                  (['in'], c_int, 'direction')),
+        COMMETHOD([], UINT, 'GetStatus',
+                  (['out'], POINTER(c_int), 'state')),
+        COMMETHOD([], UINT, 'Enable',
+                  (['in'], c_int, 'enable')),
+    ]
+
+
+def create_desktop_wallpaper():
+    """Create the shell's IDesktopWallpaper object"""
+    return comtypes.client.CreateObject(
+        CLSID_DesktopWallpaper,
+        interface=IDesktopWallpaper
+    )
@@ -0,0 +1,124 @@
+"""Streaming walk of the wallpaper directory tree.
+
+os.walk() builds full name lists per directory and the scan used to wrap
+every file name in a Path just to read its suffix. walk_images() instead
+iterates os.scandir() directly and yields matching os.DirEntry objects one at
+a time, so classification can start on the first image while the rest of the
+tree is still being listed. DirEntry caches its stat data (on Windows it comes
+free with the directory listing), so it is not fetched twice.
+"""
+import os
+import stat
+
+
+# Our own render output is never part of the image pool
+EXCLUDED_DIR_NAMES = {'.wallpaper_temp'}
+
+HIDDEN_ATTRIBUTES = (getattr(stat, 'FILE_ATTRIBUTE_HIDDEN', 0x2) |
+                     getattr(stat, 'FILE_ATTRIBUTE_SYSTEM', 0x4))
+
+
+def is_excluded_dir(name):
+    return name in EXCLUDED_DIR_NAMES
+
+
+def has_extension(name, extensions):
+    """Suffix check without building a Path; extensions are lowercase with the dot"""
+    dot = name.rfind('.')
+    # A leading dot alone (".jpg") is a hidden file name, not an extension
+    return dot > 0 and name[dot:].lower() in extensions
+
+
+def is_hidden_entry(entry):
+    """Dot-names, and on Windows entries with the hidden or system attribute"""
+    if entry.name.startswith('.'):
+        return True
+    try:
+        attributes = entry.stat(follow_symlinks=False).st_file_attributes
+    except (AttributeError, OSError):
+        return False
+    return bool(attributes & HIDDEN_ATTRIBUTES)
+
+
+def _is_file(entry):
+    try:
+        return entry.is_file()
+    except OSError:
+        return False
+
+
+class WalkOptions:
+    """Which directories a scan (and the watcher after it) descends into
+
+    skip_hidden: skip hidden directories ($RECYCLE.BIN, .git, ...)
+    max_depth: levels below the root to descend, or None for no limit
+    follow_symlinks: descend into symlinked directories; each directory is
+    visited at most once, so links pointing back up the tree can't loop
+    """
+
+    def __init__(self, skip_hidden=True, max_depth=None, follow_symlinks=False):
+        self.skip_hidden = skip_hidden
+        self.max_depth = max_depth
+        self.follow_symlinks = follow_symlinks
+
+    def include_dir(self, entry, depth):
+        """Whether to descend into a subdirectory entry of a directory at depth"""
+        if is_excluded_dir(entry.name):
+            return False
+        if self.max_depth is not None and depth >= self.max_depth:
+            return False
+        try:
+            if not entry.is_dir(follow_symlinks=self.follow_symlinks):
+                return False
+        except OSError:
+            return False
+        return not (self.skip_hidden and is_hidden_entry(entry))
+
+
+def walk_images(root, extensions, options=None, on_directory=None, cancelled=None,
+                on_excluded=None):
+    """Yield os.DirEntry objects for image files below root
+
+    on_directory(dir_path, subdir_names, image_names, mtime_ns) is called for
+    every directory listed, so the watcher can be seeded without a second
+    walk. on_excluded(dir_path) is called for every excluded (render output)
+    directory passed over. cancelled is a callable checked between
+    directories.
+    """
+    options = options or WalkOptions()
+    visited = set()  # (st_dev, st_ino) of directories already listed
+    stack = [(root, 0)]
+    while stack:
+        if cancelled is not None and cancelled():
+            return
+        dir_path, depth = stack.pop()
+        try:
+            # Stat before listing so a change racing with the listing is seen by the watcher
+            st = os.stat(dir_path)
+            identity = (st.st_dev, st.st_ino)
+            if st.st_ino:
+                if identity in visited:
+                    continue
+                visited.add(identity)
+
+            subdirs = []
+            images = []
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    if has_extension(entry.name, extensions) and _is_file(entry):
+                        images.append(entry.name)
+                        yield entry
+                    elif is_excluded_dir(entry.name):
+                        if on_excluded is not None and entry.is_dir(follow_symlinks=False):
+                            on_excluded(entry.path)
+                    elif options.include_dir(entry, depth):
+                        subdirs.append(entry.name)
+        except OSError as e:
+            print(f"Error listing {dir_path}: {e}")
+            continue
+
+        if on_directory is not None:
+            on_directory(dir_path, subdirs, images, st.st_mtime_ns)
+        # Reversed so directories are descended in listing order
+        for name in reversed(subdirs):
+            stack.append((os.path.join(dir_path, name), depth + 1))
@@ -0,0 +1,301 @@
+"""Filesystem watching for the wallpaper directory.
+
+The watcher keeps the image pools in sync with files added, removed or renamed
+under the wallpaper directory without walking the tree again. It starts from
+the directory snapshot recorded by the last scan and only re-lists
+directories that are known to have changed - reported by inotify on Linux, or
+detected by polling each directory's modification time elsewhere (NTFS and
+most network filesystems update a directory's mtime when entries are added,
+removed or renamed).
+"""
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+
+from fs_walk import WalkOptions, has_extension
+
+
+class WatchedTree:
+    """Snapshot of the image files and subdirectories of each known directory"""
+
+    def __init__(self, extensions, root=None, options=None):
+        self.extensions = extensions
+        self.root = root
+        self.options = options or WalkOptions()  # Same directory rules as the scan
+        self.files = {}  # {dir_path: set(image file names)}
+        self.subdirs = {}  # {dir_path: set(subdirectory names)}
+        self.mtimes = {}  # {dir_path: mtime_ns when last listed}
+        self.added_dirs = []  # Directories discovered since the backend last looked
+
+    def is_image(self, name):
+        return has_extension(name, self.extensions)
+
+    def depth(self, dir_path):
+        """Levels below the scanned root"""
+        if self.root is None or dir_path == self.root:
+            return 0
+        return os.path.relpath(dir_path, self.root).count(os.sep) + 1
+
+    def add_directory(self, dir_path, subdirs, files, mtime_ns):
+        """Record a directory listing produced by the scan"""
+        self.files[dir_path] = {name for name in files if self.is_image(name)}
+        self.subdirs[dir_path] = set(subdirs)
+        self.mtimes[dir_path] = mtime_ns
+
+    def refresh(self, dir_path, events, visited=None):
+        """Re-list one directory, appending ('created'|'deleted', path) events"""
+        try:
+            # Stat before listing so a change racing with the listing is seen next time
+            st = os.stat(dir_path)
+            if visited is not None and st.st_ino:
+                # Symlinked directory leading back into a tree listed by this refresh
+                if (st.st_dev, st.st_ino) in visited:
+                    return
+                visited.add((st.st_dev, st.st_ino))
+            mtime_ns = st.st_mtime_ns
+            depth = self.depth(dir_path)
+            with os.scandir(dir_path) as entries:
+                files = set()
+                subdirs = set()
+                for entry in entries:
+                    if self.is_image(entry.name) and not entry.is_dir():
+                        files.add(entry.name)
+                    elif self.options.include_dir(entry, depth):
+                        subdirs.add(entry.name)
+        except OSError:
+            self.drop(dir_path, events)
+            return
+
+        new_directory = dir_path not in self.files
+        old_files = self.files.get(dir_path, set())
+        old_subdirs = self.subdirs.get(dir_path, set())
+        self.files[dir_path] = files
+        self.subdirs[dir_path] = subdirs
+        self.mtimes[dir_path] = mtime_ns
+        if new_directory:
+            self.added_dirs.append(dir_path)
+
+        for name in files - old_files:
+            events.append(('created', os.path.join(dir_path, name)))
+        for name in old_files - files:
+            events.append(('deleted', os.path.join(dir_path, name)))
+        for name in subdirs - old_subdirs:
+            # A brand new directory has to be listed once to find its contents
+            self.refresh(os.path.join(dir_path, name), events,
+                         visited if visited is not None else set())
+        for name in old_subdirs - subdirs:
+            self.drop(os.path.join(dir_path, name), events)
+
+    def drop(self, dir_path, events):
+        """Forget a removed directory and everything below it"""
+        files = self.files.pop(dir_path, None)
+        if files is None:
+            return
+        self.mtimes.pop(dir_path, None)
+        for name in files:
+            events.append(('deleted', os.path.join(dir_path, name)))
+        for name in self.subdirs.pop(dir_path, ()):
+            self.drop(os.path.join(dir_path, name), events)
+
+
+class PollingBackend:
+    """Detect changed directories by comparing their modification times"""
+
+    def __init__(self, tree, interval):
+        self.tree = tree
+        self.interval = interval
+
+    def wait_for_changes(self, stop_event):
+        """Block until a poll finds changes, returning (changed_dirs, move_hints)"""
+        while not stop_event.wait(self.interval):
+            changed = []
+            for dir_path, mtime_ns in list(self.tree.mtimes.items()):
+                try:
+                    if os.stat(dir_path).st_mtime_ns != mtime_ns:
+                        changed.append(dir_path)
+                except OSError:
+                    changed.append(dir_path)
+            if changed:
+                return changed, {}
+        return [], {}
+
+    def close(self):
+        pass
+
+
+class InotifyBackend:
+    """Detect changed directories from Linux inotify events"""
+
+    IN_CLOSE_WRITE = 0x00000008
+    IN_MOVED_FROM = 0x00000040
+    IN_MOVED_TO = 0x00000080
+    IN_CREATE = 0x00000100
+    IN_DELETE = 0x00000200
+    IN_DELETE_SELF = 0x00000400
+    IN_MOVE_SELF = 0x00000800
+    IN_Q_OVERFLOW = 0x00004000
+    IN_IGNORED = 0x00008000
+    IN_ONLYDIR = 0x01000000
+    WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+                  IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+    EVENT_HEADER = struct.Struct('iIII')
+    # Wait for a burst of events to go quiet before re-listing, so files that
+    # are still being copied in are not classified half-written
+    SETTLE_TIME = 1.0
+
+    def __init__(self, tree):
+        self.tree = tree
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self.fd = self.libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.watches = {}  # {watch descriptor: dir_path}
+        for dir_path in list(tree.files):
+            self.add_watch(dir_path)
+
+    def add_watch(self, dir_path):
+        wd = self.libc.inotify_add_watch(
+            self.fd, os.fsencode(dir_path), self.WATCH_MASK)
+        if wd >= 0:
+            self.watches[wd] = dir_path
+
+    def wait_for_changes(self, stop_event):
+        changed = set()
+        moved_from = {}  # {cookie: old path}
+        move_hints = {}  # {new path: old path}
+        while not stop_event.is_set():
+            # Poll in short slices so stop requests are noticed promptly
+            timeout = self.SETTLE_TIME if changed else 0.5
+            ready, _, _ = select.select([self.fd], [], [], timeout)
+            if not ready:
+                if changed:
+                    break
+                continue
+            try:
+                data = os.read(self.fd, 65536)
+            except BlockingIOError:
+                continue
+
+            offset = 0
+            while offset < len(data):
+                wd, mask, cookie, length = self.EVENT_HEADER.unpack_from(
+                    data, offset)
+                offset += self.EVENT_HEADER.size
+                name = os.fsdecode(
+                    data[offset:offset + length].rstrip(b'\0'))
+                offset += length
+
+                if mask & self.IN_Q_OVERFLOW:
+                    # Events were lost - fall back to re-listing everything we know
+                    changed.update(self.tree.files)
+                    continue
+                dir_path = self.watches.get(wd)
+                if dir_path is None:
+                    continue
+                if mask & self.IN_IGNORED:
+                    del self.watches[wd]
+                    continue
+                if mask & (self.IN_DELETE_SELF | self.IN_MOVE_SELF):
+                    # The parent directory reports the removal as well
+                    continue
+                changed.add(dir_path)
+                if mask & self.IN_MOVED_FROM:
+                    moved_from[cookie] = os.path.join(dir_path, name)
+                elif mask & self.IN_MOVED_TO and cookie in moved_from:
+                    move_hints[os.path.join(dir_path, name)
+                               ] = moved_from.pop(cookie)
+
+        return sorted(changed), move_hints
+
+    def sync_watches(self):
+        """Start watching directories the tree discovered while refreshing
+
+        Returns the new directories, which need listing once more to catch
+        files created before their watch was in place.
+        """
+        added = self.tree.added_dirs
+        self.tree.added_dirs = []
+        for dir_path in added:
+            self.add_watch(dir_path)
+        return added
+
+    def close(self):
+        os.close(self.fd)
+
+
+class FolderWatcher:
+    """Background thread feeding create/delete/move events to a callback
+
+    callback receives a list of ('created', path), ('deleted', path) and
+    ('moved', old_path, new_path) tuples and is called on the watcher thread.
+    """
+
+    def __init__(self, tree, callback, poll_interval=5.0):
+        self.tree = tree
+        self.callback = callback
+        self.stop_event = threading.Event()
+        self.backend = None
+        if sys.platform.startswith('linux'):
+            try:
+                self.backend = InotifyBackend(tree)
+            except (OSError, AttributeError, TypeError):
+                self.backend = None
+        if self.backend is None:
+            self.backend = PollingBackend(tree, poll_interval)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+
+    def _run(self):
+        try:
+            while not self.stop_event.is_set():
+                changed, move_hints = self.backend.wait_for_changes(
+                    self.stop_event)
+                events = []
+                for dir_path in changed:
+                    # Skip directories dropped earlier in this batch
+                    if dir_path in self.tree.files:
+                        self.tree.refresh(dir_path, events)
+                if isinstance(self.backend, InotifyBackend):
+                    added = self.backend.sync_watches()
+                    while added:
+                        for dir_path in added:
+                            if dir_path in self.tree.files:
+                                self.tree.refresh(dir_path, events)
+                        added = self.backend.sync_watches()
+                else:
+                    self.tree.added_dirs = []
+                if events:
+                    self.callback(pair_moves(events, move_hints))
+        except Exception as e:
+            print(f"Error watching wallpaper directory: {e}")
+        finally:
+            self.backend.close()
+
+
+def pair_moves(events, move_hints):
+    """Turn matching deleted/created events into ('moved', old, new) events"""
+    if not move_hints:
+        return events
+    deleted = {event[1] for event in events if event[0] == 'deleted'}
+    paired_old = set()
+    result = []
+    for event in events:
+        if event[0] == 'created':
+            old_path = move_hints.get(event[1])
+            if old_path in deleted:
+                paired_old.add(old_path)
+                result.append(('moved', old_path, event[1]))
+                continue
+        result.append(event)
+    return [event for event in result
+            if not (event[0] == 'deleted' and event[1] in paired_old)]
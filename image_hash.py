@@ -0,0 +1,37 @@
+"""Perceptual hashing for near-duplicate detection.
+
+dHash compares the brightness of neighbouring pixels in a 9x8 grayscale
+thumbnail, giving a 64-bit value that survives resizing, re-encoding and mild
+color changes. JPEGs are decoded at 1/8 scale straight from the DCT data, so
+hashing costs a fraction of a full decode.
+"""
+from image_render import EXIF_TRANSPOSES, pending_exif_orientation
+
+
+HASH_SIZE = 8  # 8x8 comparisons = 64-bit hash
+
+
+def dhash(image_path, exif_orientation=None):
+    """Return the 64-bit difference hash of an image as an int"""
+    from PIL import Image
+
+    with Image.open(image_path) as source:
+        # TIFFs load already oriented
+        exif_orientation = pending_exif_orientation(source, exif_orientation)
+        # Ask for the smallest JPEG draft scale that still leaves plenty of pixels
+        source.draft('L', ((HASH_SIZE + 1) * 8, HASH_SIZE * 8))
+        img = source.convert('L')
+    factor = min(img.width // ((HASH_SIZE + 1) * 4), img.height // (HASH_SIZE * 4))
+    if factor >= 2:
+        img = img.reduce(factor)
+    # Hash the image as displayed, so rotated copies of a photo still match
+    if exif_orientation in EXIF_TRANSPOSES:
+        img = img.transpose(EXIF_TRANSPOSES[exif_orientation])
+    pixels = img.resize((HASH_SIZE + 1, HASH_SIZE), Image.Resampling.BOX).tobytes()
+
+    value = 0
+    for row in range(HASH_SIZE):
+        offset = row * (HASH_SIZE + 1)
+        for col in range(HASH_SIZE):
+            value = (value << 1) | (pixels[offset + col] < pixels[offset + col + 1])
+    return value
@@ -0,0 +1,106 @@
+"""Persistent on-disk index of image dimensions and orientation.
+
+Classifying an image means opening it and reading its EXIF data, which is
+slow for large libraries on network shares. The index remembers what was read
+last time, keyed by path, file size and modification time, so a rescan only
+has to open files that are new or have changed. Perceptual hashes used for
+near-duplicate detection are cached the same way, and so is a failed hash, so
+an image that can't be decoded isn't decoded again on every scan.
+"""
+import os
+import sqlite3
+import threading
+
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS images (
+    path TEXT PRIMARY KEY,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    exif_orientation INTEGER,
+    orientation TEXT NOT NULL,
+    dhash INTEGER,
+    dhash_failed INTEGER NOT NULL DEFAULT 0
+)
+"""
+
+# Columns added after the first release, for indexes created by older versions
+MIGRATIONS = {
+    'dhash': 'ALTER TABLE images ADD COLUMN dhash INTEGER',
+    'dhash_failed': 'ALTER TABLE images ADD COLUMN dhash_failed INTEGER NOT NULL DEFAULT 0',
+}
+
+
+def _to_signed(value):
+    """SQLite integers are signed 64-bit; hashes are unsigned"""
+    if value is not None and value >= 1 << 63:
+        return value - (1 << 64)
+    return value
+
+
+def _to_unsigned(value):
+    if value is not None and value < 0:
+        return value + (1 << 64)
+    return value
+
+
+class ImageIndex:
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(db_path, check_same_thread=False)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.execute(SCHEMA)
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(images)')}
+        for column, statement in MIGRATIONS.items():
+            if column not in columns:
+                self.conn.execute(statement)
+        self.conn.commit()
+
+    @staticmethod
+    def _prefix_range(directory):
+        """Return the [low, high) key range covering all paths under directory"""
+        prefix = os.path.join(os.path.abspath(directory), '')
+        # The separator is the last character of the prefix; bumping it by one
+        # gives the first key that sorts after every path with this prefix
+        return prefix, prefix[:-1] + chr(ord(prefix[-1]) + 1)
+
+    def snapshot(self, directory):
+        """Load all entries under directory as {path: (size, mtime_ns, width, height, exif_orientation, orientation, dhash, dhash_failed)}"""
+        low, high = self._prefix_range(directory)
+        with self.lock:
+            rows = self.conn.execute(
+                'SELECT path, size, mtime_ns, width, height, exif_orientation, orientation, '
+                'dhash, dhash_failed FROM images WHERE path >= ? AND path < ?',
+                (low, high)
+            ).fetchall()
+        return {row[0]: row[1:7] + (_to_unsigned(row[7]), bool(row[8])) for row in rows}
+
+    def update(self, entries):
+        """Insert or replace entries given as (path, size, mtime_ns, width, height, exif_orientation, orientation, dhash, dhash_failed)"""
+        if not entries:
+            return
+        with self.lock:
+            self.conn.executemany(
+                'INSERT OR REPLACE INTO images VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+                [entry[:7] + (_to_signed(entry[7]), int(entry[8])) for entry in entries]
+            )
+            self.conn.commit()
+
+    def remove(self, paths):
+        """Drop entries for files that no longer exist"""
+        if not paths:
+            return
+        with self.lock:
+            self.conn.executemany(
+                'DELETE FROM images WHERE path = ?',
+                [(path,) for path in paths]
+            )
+            self.conn.commit()
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
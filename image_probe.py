@@ -0,0 +1,172 @@
+"""Header-only image dimension probing.
+
+Reading dimensions through PIL parses far more of a file than needed (full
+EXIF blocks, TIFF directories, progressive JPEG scans). probe_image reads only
+the few header bytes that hold the pixel size and EXIF orientation tag, and
+returns None for anything it doesn't understand so callers can fall back to
+PIL.
+"""
+import struct
+
+
+# Upper bound on bytes read for any single header structure
+MAX_SEGMENT_READ = 65536
+# Give up on JPEGs whose frame header isn't found within this many bytes
+MAX_JPEG_SCAN = 4 * 1024 * 1024
+
+EXIF_ORIENTATION_TAG = 274
+TIFF_WIDTH_TAG = 256
+TIFF_HEIGHT_TAG = 257
+
+# SOFn markers carrying frame dimensions (C4 = DHT, C8 = JPG, CC = DAC are not frames)
+JPEG_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7,
+                    0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# Markers without a length field
+JPEG_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3,
+                           0xD4, 0xD5, 0xD6, 0xD7, 0xD8}
+
+
+def probe_image(path):
+    """Return (width, height, exif_orientation) from file headers, or None if unsupported"""
+    try:
+        with open(path, 'rb') as f:
+            head = f.read(32)
+            if head.startswith(b'\xff\xd8'):
+                return _probe_jpeg(f)
+            if head.startswith(b'\x89PNG\r\n\x1a\n'):
+                return _probe_png(f, head)
+            if head[:6] in (b'GIF87a', b'GIF89a'):
+                width, height = struct.unpack('<HH', head[6:10])
+                return width, height, None
+            if head.startswith(b'BM'):
+                return _probe_bmp(head)
+            if head[:4] in (b'II*\x00', b'MM\x00*'):
+                return _probe_tiff(f)
+    except (OSError, struct.error, ValueError):
+        pass
+    return None
+
+
+def _read_exact(f, size):
+    data = f.read(size)
+    if len(data) != size:
+        raise ValueError('truncated image header')
+    return data
+
+
+def _parse_tiff_ifd0(data, tags):
+    """Read the given tags from IFD0 of a TIFF structure held in data"""
+    if data[:2] == b'II':
+        endian = '<'
+    elif data[:2] == b'MM':
+        endian = '>'
+    else:
+        return {}
+    ifd_offset = struct.unpack(endian + 'I', data[4:8])[0]
+    count = struct.unpack(endian + 'H', data[ifd_offset:ifd_offset + 2])[0]
+
+    values = {}
+    for i in range(count):
+        entry = ifd_offset + 2 + i * 12
+        tag, value_type = struct.unpack(endian + 'HH', data[entry:entry + 4])
+        if tag not in tags:
+            continue
+        if value_type == 3:  # SHORT
+            values[tag] = struct.unpack(
+                endian + 'H', data[entry + 8:entry + 10])[0]
+        elif value_type == 4:  # LONG
+            values[tag] = struct.unpack(
+                endian + 'I', data[entry + 8:entry + 12])[0]
+    return values
+
+
+def _probe_jpeg(f):
+    f.seek(2)
+    exif_orientation = None
+    while f.tell() < MAX_JPEG_SCAN:
+        byte = _read_exact(f, 1)
+        if byte != b'\xff':
+            return None
+        marker = _read_exact(f, 1)[0]
+        # Skip fill bytes between markers
+        while marker == 0xFF:
+            marker = _read_exact(f, 1)[0]
+        if marker in JPEG_STANDALONE_MARKERS:
+            continue
+        if marker in (0xD9, 0xDA):
+            # End of image or start of scan before any frame header
+            return None
+
+        length = struct.unpack('>H', _read_exact(f, 2))[0]
+        if length < 2:
+            return None
+
+        if marker in JPEG_SOF_MARKERS:
+            height, width = struct.unpack('>xHH', _read_exact(f, 5))
+            return width, height, exif_orientation
+
+        if marker == 0xE1 and exif_orientation is None:
+            segment = _read_exact(f, min(length - 2, MAX_SEGMENT_READ))
+            if segment.startswith(b'Exif\x00\x00'):
+                exif_orientation = _parse_tiff_ifd0(
+                    segment[6:], {EXIF_ORIENTATION_TAG}).get(EXIF_ORIENTATION_TAG)
+            f.seek(length - 2 - len(segment), 1)
+        else:
+            f.seek(length - 2, 1)
+    return None
+
+
+def _probe_png(f, head):
+    if head[12:16] != b'IHDR':
+        return None
+    width, height = struct.unpack('>II', head[16:24])
+
+    # Look for an eXIf chunk ahead of the image data
+    exif_orientation = None
+    f.seek(8)
+    while True:
+        header = f.read(8)
+        if len(header) != 8:
+            break
+        length, chunk_type = struct.unpack('>I4s', header)
+        if chunk_type in (b'IDAT', b'IEND'):
+            break
+        if chunk_type == b'eXIf' and length <= MAX_SEGMENT_READ:
+            exif_orientation = _parse_tiff_ifd0(
+                _read_exact(f, length), {EXIF_ORIENTATION_TAG}).get(EXIF_ORIENTATION_TAG)
+            break
+        # Skip chunk data and CRC
+        f.seek(length + 4, 1)
+    return width, height, exif_orientation
+
+
+def _probe_bmp(head):
+    header_size = struct.unpack('<I', head[14:18])[0]
+    if header_size == 12:  # BITMAPCOREHEADER
+        width, height = struct.unpack('<HH', head[18:22])
+    else:
+        width, height = struct.unpack('<ii', head[18:26])
+    # Negative height marks a top-down bitmap
+    return abs(width), abs(height), None
+
+
+def _probe_tiff(f):
+    f.seek(0)
+    head = _read_exact(f, 8)
+    endian = '<' if head[:2] == b'II' else '>'
+    ifd_offset = struct.unpack(endian + 'I', head[4:8])[0]
+
+    f.seek(ifd_offset)
+    count = struct.unpack(endian + 'H', _read_exact(f, 2))[0]
+    if count * 12 > MAX_SEGMENT_READ:
+        return None
+    entries = _read_exact(f, count * 12)
+
+    # Rebuild a minimal TIFF structure with IFD0 at offset 8 so it can be
+    # parsed the same way as an embedded EXIF block
+    data = head[:4] + struct.pack(endian + 'IH', 8, count) + entries
+    values = _parse_tiff_ifd0(
+        data, {TIFF_WIDTH_TAG, TIFF_HEIGHT_TAG, EXIF_ORIENTATION_TAG})
+    if TIFF_WIDTH_TAG not in values or TIFF_HEIGHT_TAG not in values:
+        return None
+    return values[TIFF_WIDTH_TAG], values[TIFF_HEIGHT_TAG], values.get(EXIF_ORIENTATION_TAG)
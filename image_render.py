@@ -0,0 +1,140 @@
+"""Rendering of wallpaper images for a specific monitor.
+
+Sources are scaled down to the monitor's resolution before they are rotated,
+so memory and CPU use depend on the monitor size rather than the source size.
+JPEGs are scaled while decoding (DCT-domain draft mode) and everything is
+shrunk further with integer reduce() before the final resample.
+
+PIL is imported when the first image is rendered rather than with this module,
+so the window can appear before the imaging stack has loaded.
+"""
+
+
+# Wallpaper position constants (mirrors IDesktopWallpaper DESKTOP_WALLPAPER_POSITION)
+DWPOS_CENTER = 0
+DWPOS_TILE = 1
+DWPOS_STRETCH = 2
+DWPOS_FIT = 3
+DWPOS_FILL = 4
+DWPOS_SPAN = 5
+
+# PIL's Image.Transpose values, spelled out so importing this module doesn't load PIL
+FLIP_LEFT_RIGHT = 0
+FLIP_TOP_BOTTOM = 1
+ROTATE_90 = 2
+ROTATE_180 = 3
+ROTATE_270 = 4
+TRANSPOSE = 5
+TRANSVERSE = 6
+
+# Transposes applied for each EXIF orientation value, as in ImageOps.exif_transpose
+EXIF_TRANSPOSES = {
+    2: FLIP_LEFT_RIGHT,
+    3: ROTATE_180,
+    4: FLIP_TOP_BOTTOM,
+    5: TRANSPOSE,
+    6: ROTATE_270,
+    7: TRANSVERSE,
+    8: ROTATE_90,
+}
+
+# Pillow applies the EXIF orientation of these formats itself while loading,
+# and reports their size already oriented
+ORIENTED_ON_LOAD_FORMATS = ('TIFF',)
+
+ROTATION_TRANSPOSES = {
+    'left': ROTATE_90,  # 90° counter-clockwise
+    'right': ROTATE_270,  # 90° clockwise
+}
+
+
+def oriented_size(width, height, exif_orientation, rotation_direction):
+    """Size of the image after EXIF orientation and rotation are applied"""
+    swaps = (exif_orientation in (5, 6, 7, 8)) + (rotation_direction in ROTATION_TRANSPOSES)
+    return (height, width) if swaps % 2 else (width, height)
+
+
+def pending_exif_orientation(img, exif_orientation):
+    """EXIF orientation still to be applied to an opened image, or None"""
+    if img.format in ORIENTED_ON_LOAD_FORMATS:
+        return None
+    return exif_orientation
+
+
+def stored_size(img, exif_orientation):
+    """Size of an opened image as stored in the file, before EXIF orientation"""
+    if img.format in ORIENTED_ON_LOAD_FORMATS:
+        return oriented_size(img.width, img.height, exif_orientation, None)
+    return img.size
+
+
+def target_size(image_size, monitor_size, position):
+    """Output size for an (already oriented) image shown with the given fit mode
+
+    Returns None when the image should be kept at full resolution: Center and
+    Tile show pixels 1:1, Span covers the whole desktop, and images are never
+    scaled up.
+    """
+    width, height = image_size
+    monitor_width, monitor_height = monitor_size
+    if position == DWPOS_FILL:
+        scale = max(monitor_width / width, monitor_height / height)
+    elif position == DWPOS_FIT:
+        scale = min(monitor_width / width, monitor_height / height)
+    elif position == DWPOS_STRETCH:
+        if monitor_width >= width and monitor_height >= height:
+            return None
+        return monitor_width, monitor_height
+    else:
+        return None
+
+    if scale >= 1:
+        return None
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+
+def render_for_monitor(image_path, info, rotation_direction, output_size=None):
+    """Load, downscale and rotate image_path, returning a new PIL image
+
+    info is the (width, height, exif_orientation) tuple of the source.
+    output_size is the final (oriented) size from target_size, or None to
+    keep full resolution.
+    """
+    from PIL import Image
+
+    with Image.open(image_path) as source:
+        img = source
+        # Work in the file's pixels as Pillow loads them
+        exif_orientation = pending_exif_orientation(source, info[2])
+        width, height = source.size
+        if output_size is not None:
+            # Work out the size wanted before any transposes are applied
+            if oriented_size(width, height, exif_orientation, rotation_direction) != (width, height):
+                wanted = (output_size[1], output_size[0])
+            else:
+                wanted = output_size
+
+            # JPEG: decode at 1/2, 1/4 or 1/8 scale straight from the DCT data
+            img.draft('RGB', wanted)
+            if img.mode in ('1', 'P'):
+                # Palette images can't be filtered; resample in full colour
+                img = img.convert(
+                    'RGBA' if 'transparency' in img.info else 'RGB')
+
+            # Cheap integer box reduction while staying at or above the wanted size
+            factor = min(img.width // wanted[0], img.height // wanted[1])
+            if factor >= 2:
+                img = img.reduce(factor)
+
+            if img.size != wanted:
+                img = img.resize(wanted, Image.Resampling.LANCZOS)
+
+        if exif_orientation in EXIF_TRANSPOSES:
+            img = img.transpose(EXIF_TRANSPOSES[exif_orientation])
+        if rotation_direction in ROTATION_TRANSPOSES:
+            img = img.transpose(ROTATION_TRANSPOSES[rotation_direction])
+
+        # The result must not depend on the source file once it is closed
+        if img is source:
+            img = source.copy()
+        return img
@@ -0,0 +1,201 @@
+"""Lossless orientation fixes for JPEG wallpapers.
+
+Rotating a JPEG through PIL means a full decode and a lossy re-encode. Two
+cheaper paths are offered here, both returning False when they don't apply
+so the caller can fall back to PIL:
+
+- jpegtran (if installed) rotates the DCT coefficients directly. With
+  -perfect it refuses images whose dimensions aren't MCU-aligned, which would
+  otherwise lose their partial edge blocks.
+- Rewriting the EXIF orientation tag copies the file untouched except for two
+  bytes, for consumers that honor the tag.
+"""
+import os
+import shutil
+import struct
+import subprocess
+
+
+EXIF_ORIENTATION_TAG = 274
+
+# Geometric operations, named after PIL's Image.Transpose members
+OPERATIONS = ('identity', 'flip_left_right', 'flip_top_bottom', 'rotate_90',
+              'rotate_180', 'rotate_270', 'transpose', 'transverse')
+
+# Operation a viewer applies for each EXIF orientation value
+EXIF_OPERATIONS = {
+    1: 'identity',
+    2: 'flip_left_right',
+    3: 'rotate_180',
+    4: 'flip_top_bottom',
+    5: 'transpose',
+    6: 'rotate_270',
+    7: 'transverse',
+    8: 'rotate_90',
+}
+
+ROTATION_OPERATIONS = {
+    'left': 'rotate_90',  # 90° counter-clockwise
+    'right': 'rotate_270',  # 90° clockwise
+}
+
+# jpegtran arguments (its -rotate is clockwise, PIL's ROTATE_n counter-clockwise)
+JPEGTRAN_ARGS = {
+    'flip_left_right': ['-flip', 'horizontal'],
+    'flip_top_bottom': ['-flip', 'vertical'],
+    'rotate_90': ['-rotate', '270'],
+    'rotate_180': ['-rotate', '180'],
+    'rotate_270': ['-rotate', '90'],
+    'transpose': ['-transpose'],
+    'transverse': ['-transverse'],
+}
+
+
+def _apply(operation, grid):
+    """Apply operation to a grid given as a tuple of row tuples"""
+    if operation == 'identity':
+        return grid
+    if operation == 'flip_left_right':
+        return tuple(row[::-1] for row in grid)
+    if operation == 'flip_top_bottom':
+        return grid[::-1]
+    if operation == 'transpose':
+        return tuple(zip(*grid))
+    if operation == 'rotate_90':
+        return tuple(zip(*grid))[::-1]
+    if operation == 'rotate_270':
+        return tuple(row[::-1] for row in zip(*grid))
+    if operation == 'rotate_180':
+        return tuple(row[::-1] for row in grid[::-1])
+    if operation == 'transverse':
+        return _apply('rotate_180', tuple(zip(*grid)))
+    raise ValueError(operation)
+
+
+def compose(first, second):
+    """Return the single operation equal to applying first and then second"""
+    # A non-square grid with distinct cells tells all eight operations apart
+    grid = ((0, 1, 2), (3, 4, 5))
+    result = _apply(second, _apply(first, grid))
+    for operation in OPERATIONS:
+        if _apply(operation, grid) == result:
+            return operation
+    raise ValueError((first, second))
+
+
+def combined_operation(exif_orientation, rotation_direction):
+    """Operation turning the stored pixels into the wanted wallpaper"""
+    return compose(EXIF_OPERATIONS.get(exif_orientation, 'identity'),
+                   ROTATION_OPERATIONS.get(rotation_direction, 'identity'))
+
+
+def read_mcu_size(path):
+    """Return the (width, height) of a JPEG's MCU from its frame header, or None"""
+    with open(path, 'rb') as f:
+        if f.read(2) != b'\xff\xd8':
+            return None
+        while True:
+            marker = f.read(2)
+            if len(marker) != 2 or marker[0] != 0xFF:
+                return None
+            if marker[1] in (0xD8, 0x01) or 0xD0 <= marker[1] <= 0xD7:
+                continue
+            length = struct.unpack('>H', f.read(2))[0]
+            if marker[1] in (0xC0, 0xC1, 0xC2):
+                header = f.read(length - 2)
+                components = header[5]
+                max_h = max_v = 1
+                for i in range(components):
+                    sampling = header[6 + i * 3 + 1]
+                    max_h = max(max_h, sampling >> 4)
+                    max_v = max(max_v, sampling & 0x0F)
+                return 8 * max_h, 8 * max_v
+            if marker[1] in (0xDA, 0xD9):
+                return None
+            f.seek(length - 2, 1)
+
+
+def find_jpegtran():
+    return shutil.which('jpegtran')
+
+
+def rotate_with_jpegtran(jpegtran, source_path, output_path, operation, size):
+    """Transform the DCT coefficients with jpegtran; False if not possible losslessly"""
+    if operation == 'identity':
+        return False
+    mcu = read_mcu_size(source_path)
+    if mcu is None or size[0] % mcu[0] or size[1] % mcu[1]:
+        return False
+
+    # Metadata is dropped like on the PIL path, so no stale orientation tag remains
+    command = [jpegtran, '-perfect', '-copy', 'none', *JPEGTRAN_ARGS[operation],
+               '-outfile', output_path, source_path]
+    result = subprocess.run(
+        command, capture_output=True,
+        creationflags=getattr(subprocess, 'CREATE_NO_WINDOW', 0))
+    if result.returncode != 0:
+        try:
+            os.remove(output_path)
+        except OSError:
+            pass
+        return False
+    return True
+
+
+def _find_exif_orientation(data):
+    """Locate the orientation value in a JPEG's EXIF block
+
+    Returns (offset of the 2-byte value, endian) or (None, None).
+    """
+    pos = 2
+    while pos + 4 <= len(data) and data[pos] == 0xFF:
+        marker = data[pos + 1]
+        if marker in (0xDA, 0xD9):
+            break
+        length = struct.unpack('>H', data[pos + 2:pos + 4])[0]
+        if marker == 0xE1 and data[pos + 4:pos + 10] == b'Exif\x00\x00':
+            tiff = pos + 10
+            endian = '<' if data[tiff:tiff + 2] == b'II' else '>'
+            ifd = tiff + struct.unpack(endian + 'I', data[tiff + 4:tiff + 8])[0]
+            count = struct.unpack(endian + 'H', data[ifd:ifd + 2])[0]
+            for i in range(count):
+                entry = ifd + 2 + i * 12
+                tag, value_type = struct.unpack(
+                    endian + 'HH', data[entry:entry + 4])
+                if tag == EXIF_ORIENTATION_TAG and value_type == 3:
+                    return entry + 8, endian
+            return None, None
+        pos += 2 + length
+    return None, None
+
+
+def _orientation_segment(orientation):
+    """Minimal APP1 EXIF segment holding only an orientation tag"""
+    tiff = (b'MM\x00*' + struct.pack('>I', 8) + struct.pack('>H', 1) +
+            struct.pack('>HHIHH', EXIF_ORIENTATION_TAG, 3, 1, orientation, 0) +
+            struct.pack('>I', 0))
+    payload = b'Exif\x00\x00' + tiff
+    return b'\xff\xe1' + struct.pack('>H', len(payload) + 2) + payload
+
+
+def rotate_with_exif_tag(source_path, output_path, exif_orientation, rotation_direction):
+    """Copy the JPEG, setting its orientation tag so viewers apply the rotation"""
+    operation = combined_operation(exif_orientation, rotation_direction)
+    orientation = next(value for value, op in EXIF_OPERATIONS.items()
+                       if op == operation)
+
+    with open(source_path, 'rb') as f:
+        data = bytearray(f.read())
+    if data[:2] != b'\xff\xd8':
+        return False
+
+    offset, endian = _find_exif_orientation(data)
+    if offset is not None:
+        data[offset:offset + 2] = struct.pack(endian + 'H', orientation)
+    else:
+        # No tag to patch - put a new EXIF segment first so it takes precedence
+        data[2:2] = _orientation_segment(orientation)
+
+    with open(output_path, 'wb') as f:
+        f.write(data)
+    return True
@@ -0,0 +1,139 @@
+"""Timing metrics for the rotator's hot paths.
+
+Code paths are wrapped in named spans:
+
+    with metrics.span('render'):
+        ...
+
+Each name keeps a rolling window of its most recent durations, from which
+p50/p95/p99 are computed on demand, plus all-time counts. Spans may be
+recorded from any thread.
+
+Snapshots can be written to a JSON file or served as JSON from a local HTTP
+endpoint (MetricsServer, bound to 127.0.0.1 only).
+"""
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+
+WINDOW = 1024  # Most recent samples kept per span name
+PERCENTILES = (50, 95, 99)
+
+
+class RollingHistogram:
+    def __init__(self, window=WINDOW):
+        self.samples = deque(maxlen=window)  # Durations in seconds, oldest first
+        self.count = 0  # All-time number of samples
+        self.total = 0.0  # All-time sum of durations
+
+    def add(self, seconds):
+        self.samples.append(seconds)
+        self.count += 1
+        self.total += seconds
+
+    def summary(self):
+        """{count, last, mean, p50, p95, p99, max} with durations in milliseconds"""
+        values = sorted(self.samples)
+        summary = {
+            'count': self.count,
+            'last': self.samples[-1] * 1000,
+            'mean': sum(values) / len(values) * 1000,
+            'max': values[-1] * 1000,
+        }
+        for p in PERCENTILES:
+            # Nearest-rank percentile over the window
+            rank = max(1, -(-p * len(values) // 100))
+            summary[f"p{p}"] = values[rank - 1] * 1000
+        return summary
+
+
+class Metrics:
+    def __init__(self, window=WINDOW):
+        self.window = window
+        self.lock = threading.Lock()
+        self.histograms = {}  # {span name: RollingHistogram}
+
+    @contextmanager
+    def span(self, name):
+        """Time the enclosed block under name, also when it raises"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, time.perf_counter() - start)
+
+    def record(self, name, seconds):
+        with self.lock:
+            histogram = self.histograms.get(name)
+            if histogram is None:
+                histogram = self.histograms[name] = RollingHistogram(self.window)
+            histogram.add(seconds)
+
+    def snapshot(self):
+        """{span name: summary} for every span recorded so far"""
+        with self.lock:
+            return {name: histogram.summary()
+                    for name, histogram in sorted(self.histograms.items())}
+
+    def format_lines(self):
+        """One line per span for display, e.g. 'render  n=12  p50 80ms ...'"""
+        lines = []
+        for name, summary in self.snapshot().items():
+            lines.append(f"{name:<18} n={summary['count']:<6} "
+                         f"p50 {summary['p50']:8.1f}  p95 {summary['p95']:8.1f}  "
+                         f"p99 {summary['p99']:8.1f}  last {summary['last']:8.1f} ms")
+        return lines
+
+    def write_json(self, path):
+        """Write a snapshot to path, replacing it atomically"""
+        data = {'time': time.time(), 'spans': self.snapshot()}
+        temp_path = f"{path}.tmp"
+        with open(temp_path, 'w') as f:
+            json.dump(data, f, indent=2)
+        os.replace(temp_path, path)
+
+
+class MetricsServer:
+    """Serves Metrics snapshots as JSON on http://127.0.0.1:<port>/metrics"""
+
+    def __init__(self, metrics, port):
+        self.metrics = metrics
+        self.port = port
+        self.server = None
+        self.thread = None
+
+    def start(self):
+        # http.server pulls in the email package; only load it when serving
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        metrics = self.metrics
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?')[0] not in ('/', '/metrics'):
+                    self.send_error(404)
+                    return
+                body = json.dumps({'time': time.time(), 'spans': metrics.snapshot()},
+                                  indent=2).encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass  # Keep requests out of the console
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', self.port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
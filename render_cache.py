@@ -0,0 +1,394 @@
+"""Size-bounded LRU cache of rendered (rotated) wallpaper files.
+
+All renders go into one local cache directory, never into the wallpaper
+library itself. Files are named after a hash of everything that affects
+their pixels - source path, size and mtime, rotation direction and target
+monitor resolution - so a cached file can be reused as-is whenever the same
+image comes up again for the same monitor, and sources with the same name in
+different folders can't collide. Renders are written to a partial file and
+renamed into place (atomic_output), so a file that exists under its final
+name is always complete.
+
+The cache keeps an in-memory manifest of every rendered file with its size
+and last use, and persists it between runs, so steady-state cleanup never has
+to list a directory. Directories are only listed once at startup
+(reconcile), to adopt files the manifest doesn't know about and forget ones
+deleted behind its back. Cleanup itself - deleting over-age files, then least
+recently used ones beyond the size budget - runs on the CacheJanitor thread.
+
+Only files named like renders (see is_cache_file) are ever adopted or
+deleted, so pointing the cache at a folder that holds other files is safe.
+"""
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+
+MANIFEST_VERSION = 1
+PARTIAL_MARKER = '.partial'  # In the names of renders still being written
+STALE_PARTIAL_SECONDS = 3600  # Partial files this old were left by a crash
+LEGACY_TEMP_DIR = '.wallpaper_temp'  # Older versions rendered into these, next to the images
+
+# <variant>_<width>x<height>_<sha1><ext> as built by cache_path, and the
+# <...>.partial<pid>_<thread id><ext> files atomic_output writes first
+CACHE_NAME = re.compile(r'.+_\d+x\d+_[0-9a-f]{40}(\.[^.]+)?')
+PARTIAL_NAME = re.compile(r'.+_\d+x\d+_[0-9a-f]{40}\.partial\d+_\d+(\.[^.]+)?')
+
+
+def is_cache_file(path):
+    """Whether path is named like a finished render; nothing else is ever deleted"""
+    name = os.path.basename(path)
+    if CACHE_NAME.fullmatch(name):
+        return True
+    # rotated_<direction>_... renders of older versions
+    return (os.path.basename(os.path.dirname(path)) == LEGACY_TEMP_DIR
+            and name.startswith('rotated_'))
+
+
+def default_cache_dir():
+    """Per-user local folder for rendered wallpapers"""
+    base = os.environ.get('LOCALAPPDATA') or os.environ.get('XDG_CACHE_HOME')
+    if not base:
+        base = os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'wpchanger', 'render_cache')
+
+
+@contextmanager
+def atomic_output(path):
+    """Yield a partial file path to write to; it is renamed to path on success
+
+    The extension is kept so PIL still picks the right encoder. On failure the
+    partial file is removed and path is left untouched.
+    """
+    root, ext = os.path.splitext(path)
+    # Unique per writer - the prefetch thread may render the same file
+    partial_path = f"{root}{PARTIAL_MARKER}{os.getpid()}_{threading.get_ident()}{ext}"
+    try:
+        yield partial_path
+        os.replace(partial_path, path)
+    except BaseException:
+        try:
+            os.remove(partial_path)
+        except OSError:
+            pass
+        raise
+
+
+class RenderCache:
+    def __init__(self, max_bytes, max_age=None, directory=None):
+        self.max_bytes = max_bytes
+        self.max_age = max_age  # Seconds since last use before a file is deleted, None = forever
+        # Where renders go; files elsewhere (older versions wrote .wallpaper_temp
+        # folders next to the images) are deleted at the next cleanup
+        self.directory = directory
+        self.entries = OrderedDict()  # {path: (size, last_used)} least recently used first
+        self.total_bytes = 0
+        self.directories = set()  # Every directory rendered files were put in
+        self.lock = threading.Lock()
+        self.dirty = False  # Manifest changed since it was last saved
+
+    @staticmethod
+    def cache_path(cache_dir, image_path, source_stat, variant, width, height):
+        """Build the cache file path for one rendering of image_path
+
+        variant names the transformation, e.g. the rotation direction.
+        """
+        key = (f"{os.path.normcase(os.path.abspath(image_path))}\0{source_stat.st_size}"
+               f"\0{source_stat.st_mtime_ns}\0{variant}\0{width}x{height}")
+        digest = hashlib.sha1(key.encode('utf-8', 'surrogatepass')).hexdigest()
+        ext = os.path.splitext(image_path)[1].lower()
+        return os.path.join(cache_dir, f"{variant}_{width}x{height}_{digest}{ext}")
+
+    def _put(self, path, size, last_used):
+        """Insert or replace an entry as most recently used; lock must be held"""
+        old = self.entries.pop(path, None)
+        if old is not None:
+            self.total_bytes -= old[0]
+        self.entries[path] = (size, last_used)
+        self.total_bytes += size
+        self.directories.add(os.path.dirname(path))
+        self.dirty = True
+
+    def _drop(self, path):
+        """Forget an entry; lock must be held"""
+        size, _ = self.entries.pop(path)
+        self.total_bytes -= size
+        self.dirty = True
+
+    def load_manifest(self, manifest_path):
+        """Restore entries recorded by an earlier run, without touching the disk"""
+        try:
+            with open(manifest_path, 'r') as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            return
+        except Exception as e:
+            print(f"Error reading render cache manifest: {e}")
+            return
+        if manifest.get('version') != MANIFEST_VERSION:
+            return
+        with self.lock:
+            for path, size, last_used in reversed(manifest.get('entries', [])):
+                if path not in self.entries and is_cache_file(path):
+                    self._put(path, size, last_used)
+                    # Keep the manifest's LRU order ahead of anything used this run
+                    self.entries.move_to_end(path, last=False)
+            self.directories.update(manifest.get('directories', []))
+            self.dirty = False
+
+    def save_manifest(self, manifest_path):
+        """Write the manifest if it changed, replacing the old one atomically"""
+        with self.lock:
+            if not self.dirty:
+                return
+            manifest = {
+                'version': MANIFEST_VERSION,
+                'entries': [[path, size, last_used]
+                            for path, (size, last_used) in self.entries.items()],
+                'directories': sorted(self.directories),
+            }
+            self.dirty = False
+        temp_path = f"{manifest_path}.tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump(manifest, f)
+            os.replace(temp_path, manifest_path)
+        except Exception as e:
+            print(f"Error writing render cache manifest: {e}")
+            with self.lock:
+                self.dirty = True
+
+    def reconcile(self, extra_dirs=(), known=True):
+        """List every known cache directory once to sync the manifest with the disk
+
+        With known=False only extra_dirs are listed.
+
+        Renders the manifest doesn't know (left by a run that couldn't save
+        it) are adopted with their access time as last use; entries whose
+        file is gone are dropped. Other files are left alone. Returns
+        (adopted, dropped).
+        """
+        with self.lock:
+            directories = set(extra_dirs)
+            if known:
+                directories |= self.directories
+        found = {}
+        stale_before = time.time() - STALE_PARTIAL_SECONDS
+        for directory in directories:
+            try:
+                with os.scandir(directory) as entries:
+                    for entry in entries:
+                        if not entry.is_file():
+                            continue
+                        if PARTIAL_NAME.fullmatch(entry.name):
+                            # Never finished; newer ones may still be being written
+                            if entry.stat().st_mtime < stale_before:
+                                try:
+                                    os.remove(entry.path)
+                                except OSError:
+                                    pass
+                        elif is_cache_file(entry.path):
+                            st = entry.stat()
+                            found[entry.path] = (st.st_size, st.st_atime)
+            except OSError:
+                continue
+
+        adopted = dropped = 0
+        with self.lock:
+            for path in list(self.entries):
+                if os.path.dirname(path) in directories and path not in found:
+                    self._drop(path)
+                    dropped += 1
+            # Orphans go in oldest first, at the least recently used end
+            for path, (size, atime) in sorted(found.items(), key=lambda item: item[1][1],
+                                              reverse=True):
+                if path not in self.entries:
+                    self._put(path, size, atime)
+                    self.entries.move_to_end(path, last=False)
+                    adopted += 1
+            if known:
+                # Forget folders that no longer hold anything, e.g. removed libraries
+                self.directories = {os.path.dirname(path) for path in self.entries}
+                if self.directory:
+                    self.directories.add(self.directory)
+            else:
+                self.directories.update(directories)
+        return adopted, dropped
+
+    def lookup(self, path):
+        """Return True and mark path as recently used if it is cached"""
+        with self.lock:
+            if path in self.entries:
+                if os.path.exists(path):
+                    self._put(path, self.entries[path][0], time.time())
+                    return True
+                self._drop(path)
+                return False
+        # Rendered by an earlier run that couldn't record it
+        if os.path.exists(path):
+            self.add(path)
+            return True
+        return False
+
+    def add(self, path):
+        """Record a newly rendered file as most recently used"""
+        try:
+            size = os.path.getsize(path)
+        except OSError:
+            return
+        with self.lock:
+            self._put(path, size, time.time())
+
+    def over_budget(self):
+        with self.lock:
+            return self.total_bytes > self.max_bytes
+
+    def evict(self, keep=()):
+        """Delete expired files, then least recently used ones beyond the budget
+
+        Files outside the cache directory go first. Files in keep (currently
+        shown wallpapers) are never deleted. Files are removed from the
+        manifest under the lock but deleted outside it, so lookups aren't
+        held up by slow disks.
+        """
+        victims = []
+        with self.lock:
+            if self.directory:
+                for path in list(self.entries):
+                    if os.path.dirname(path) != self.directory and path not in keep:
+                        victims.append(path)
+                        self._drop(path)
+            if self.max_age:
+                expiry = time.time() - self.max_age
+                # Adopted orphans may be out of last-use order, so check every entry
+                for path, (_, last_used) in list(self.entries.items()):
+                    if last_used < expiry and path not in keep:
+                        victims.append(path)
+                        self._drop(path)
+            for path in list(self.entries):
+                if self.total_bytes <= self.max_bytes:
+                    break
+                if path in keep:
+                    continue
+                victims.append(path)
+                self._drop(path)
+
+        deleted_count = 0
+        for path in victims:
+            if not is_cache_file(path):
+                continue
+            try:
+                os.remove(path)
+                deleted_count += 1
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                print(f"Could not delete temp file {path}: {e}")
+        # Remove old per-folder temp directories once they are empty
+        for directory in {os.path.dirname(path) for path in victims}:
+            if directory != self.directory:
+                try:
+                    os.rmdir(directory)
+                except OSError:
+                    pass
+        return deleted_count
+
+
+class CacheJanitor:
+    """Runs render cache maintenance on a worker thread
+
+    Cleanup requests that arrive while a pass is running are coalesced into
+    one more pass with the latest set of files to keep. After every pass the
+    manifest is saved if it changed.
+    """
+
+    def __init__(self, cache, manifest_path=None, metrics=None):
+        self.cache = cache
+        self.manifest_path = manifest_path
+        self.metrics = metrics  # Records 'cleanup' timings of each eviction if given
+        self.lock = threading.Lock()
+        self.thread = None
+        self.pending_keep = None  # Files to keep for the next cleanup pass
+        self.pending_reconcile = None  # Extra directories for a startup reconcile
+        self.pending_adopt = set()  # Directories to list for renders, e.g. found by a scan
+        self.deleted = 0  # Files deleted so far
+
+    def reconcile(self, extra_dirs=()):
+        """Load the saved manifest and sync it with the disk, then clean up"""
+        with self.lock:
+            self.pending_reconcile = list(extra_dirs)
+            if self.pending_keep is None:
+                self.pending_keep = set()
+            self._start()
+
+    def adopt(self, directories):
+        """List just these directories for renders, then clean up
+
+        Used for the .wallpaper_temp folders older versions left in the
+        library, which are found by the scan walk.
+        """
+        with self.lock:
+            self.pending_adopt.update(directories)
+            if self.pending_keep is None:
+                self.pending_keep = set()
+            self._start()
+
+    def request(self, keep=()):
+        """Clean up in the background; files in keep are never deleted"""
+        with self.lock:
+            self.pending_keep = set(keep)
+            self._start()
+
+    def _start(self):
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._run, daemon=True)
+            self.thread.start()
+
+    def _run(self):
+        while True:
+            with self.lock:
+                keep = self.pending_keep
+                extra_dirs = self.pending_reconcile
+                adopt_dirs = self.pending_adopt
+                self.pending_keep = None
+                self.pending_reconcile = None
+                self.pending_adopt = set()
+                if keep is None and extra_dirs is None:
+                    self.thread = None
+                    return
+            try:
+                if extra_dirs is not None:
+                    if self.manifest_path:
+                        self.cache.load_manifest(self.manifest_path)
+                    adopted, dropped = self.cache.reconcile(extra_dirs)
+                    if adopted or dropped:
+                        print(f"Render cache: adopted {adopted} files from earlier runs, "
+                              f"forgot {dropped} missing ones")
+                if adopt_dirs:
+                    adopted, _ = self.cache.reconcile(adopt_dirs, known=False)
+                    if adopted:
+                        print(f"Render cache: found {adopted} files in "
+                              f"{len(adopt_dirs)} old temp folders")
+                start = time.perf_counter()
+                deleted = self.cache.evict(keep=keep or ())
+                if self.metrics is not None:
+                    self.metrics.record('cleanup', time.perf_counter() - start)
+                if deleted:
+                    self.deleted += deleted
+                    print(f"Cleaned up {deleted} old rotated images from temp folder")
+                if self.manifest_path:
+                    self.cache.save_manifest(self.manifest_path)
+            except Exception as e:
+                print(f"Error cleaning up temp images: {e}")
+
+    def wait(self, timeout=None):
+        """Wait for the current cleanup pass, e.g. before the process exits"""
+        with self.lock:
+            thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
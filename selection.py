@@ -0,0 +1,322 @@
+"""No-repeat and weighted wallpaper selection.
+
+By default each image pool gets a shuffle bag: a random permutation of the
+pool consumed with a cursor. Every image is shown once before any image
+repeats, and a draw costs O(1) amortized instead of retrying random picks.
+
+With a weighing selection policy (see selection_policy.py) each pool gets a
+WeightedBag instead: a Fenwick tree over per-image weights, indexed by
+catalog id, so a draw and a single weight update are both O(log n) even for
+a million images. Recently shown images are down-weighted by rejection: an
+image is drawn by its policy weight and accepted with a probability that
+recovers exponentially since it was last shown, so showing an image never
+has to touch other weights.
+
+The engine has no Windows dependencies, so it can be exercised on its own.
+Pools must support len(), O(1) membership tests and snapshot() returning a
+mutable sequence of their items (CatalogPool does), since images removed from
+a pool are skipped lazily when drawn. Weighted pools must hold non-negative
+integer items.
+"""
+import random
+import threading
+import time
+from array import array
+
+
+MAX_REJECTIONS = 32  # Draws rejected as recently shown before the freshest one is taken
+RECOVERED = 0.99  # Acceptance at which a shown image is forgotten
+
+
+class ShuffleBag:
+    def __init__(self, pool, rng):
+        self.pool = pool
+        self.rng = rng
+        self.order = []
+        self.cursor = 0
+
+    def refill(self):
+        # An array of catalog ids rather than a list keeps big libraries compact
+        self.order = self.pool.snapshot()
+        self.rng.shuffle(self.order)
+        self.cursor = 0
+
+    def add(self, item):
+        """Insert a newly pooled item at a random position in the unconsumed part"""
+        self.order.append(item)
+        j = self.rng.randrange(self.cursor, len(self.order))
+        self.order[j], self.order[-1] = self.order[-1], self.order[j]
+
+    def draw(self, exclude=()):
+        """Return the next item not in exclude, reshuffling when the bag runs out
+
+        Returns None if no pooled item outside exclude exists.
+        """
+        refilled = False
+        while True:
+            i = self.cursor
+            while i < len(self.order):
+                item = self.order[i]
+                if item in self.pool and item not in exclude:
+                    # Excluded items passed over stay unconsumed for later draws
+                    self.order[i] = self.order[self.cursor]
+                    self.order[self.cursor] = item
+                    self.cursor += 1
+                    return item
+                if item not in self.pool:
+                    # Removed since the shuffle - consume it so it is never looked at again
+                    self.order[i] = self.order[self.cursor]
+                    self.order[self.cursor] = item
+                    self.cursor += 1
+                i += 1
+            if refilled or not len(self.pool):
+                return None
+            self.refill()
+            refilled = True
+
+
+class FenwickTree:
+    """Binary indexed tree over item weights
+
+    Updating one weight and finding the item at a cumulative weight are both
+    O(log n); building from an array of weights is O(n).
+    """
+
+    def __init__(self, weights):
+        self.weights = weights  # array('d') indexed by item
+        # tree[i] holds the sum of weights[i - (i & -i):i] (1-based)
+        tree = array('d', [0.0]) + weights
+        size = len(weights)
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                tree[parent] += tree[i]
+        self.tree = tree
+
+    def __len__(self):
+        return len(self.weights)
+
+    def append(self, weight):
+        self.weights.append(weight)
+        i = len(self.weights)
+        # The new node covers the items since the previous node at its level
+        total = weight
+        j = i - 1
+        stop = i - (i & -i)
+        while j > stop:
+            total += self.tree[j]
+            j -= j & -j
+        self.tree.append(total)
+
+    def set(self, item, weight):
+        delta = weight - self.weights[item]
+        if not delta:
+            return
+        self.weights[item] = weight
+        tree = self.tree
+        i = item + 1
+        while i < len(tree):
+            tree[i] += delta
+            i += i & -i
+
+    def total(self):
+        tree = self.tree
+        i = len(self.weights)
+        total = 0.0
+        while i > 0:
+            total += tree[i]
+            i -= i & -i
+        return total
+
+    def find(self, target):
+        """Item whose cumulative weight range contains target (0 <= target < total())"""
+        tree = self.tree
+        size = len(self.weights)
+        position = 0
+        step = 1 << (size.bit_length() - 1) if size else 0
+        while step:
+            i = position + step
+            if i <= size and tree[i] <= target:
+                position = i
+                target -= tree[i]
+            step >>= 1
+        return min(position, size - 1)
+
+
+class WeightedBag:
+    """Weighted draws from a pool, with replacement
+
+    weigh(item) gives an item's weight; accept(item), if given, the
+    probability that a drawn item is taken rather than drawn again.
+    """
+
+    def __init__(self, pool, rng, weigh, accept=None):
+        self.pool = pool
+        self.rng = rng
+        self.weigh = weigh
+        self.accept = accept
+        self.tree = FenwickTree(array('d'))
+
+    def refill(self):
+        items = self.pool.snapshot()
+        weights = array('d', [0.0]) * (max(items) + 1 if len(items) else 0)
+        for item in items:
+            weights[item] = self.weigh(item)
+        self.tree = FenwickTree(weights)
+
+    def add(self, item):
+        while len(self.tree) <= item:
+            self.tree.append(0.0)
+        self.tree.set(item, self.weigh(item))
+
+    def draw(self, exclude=()):
+        """Return an item not in exclude, or None if there is none"""
+        tree = self.tree
+        # Excluded items are taken out of the tree for this draw only
+        held = []
+        for item in exclude:
+            if item < len(tree) and tree.weights[item] > 0:
+                held.append((item, tree.weights[item]))
+                tree.set(item, 0.0)
+        try:
+            return self._draw(exclude)
+        finally:
+            for item, weight in held:
+                tree.set(item, weight)
+
+    def _draw(self, exclude):
+        tree = self.tree
+        best, best_chance = None, -1.0
+        rejections = 0
+        while rejections < MAX_REJECTIONS:
+            total = tree.total()
+            if total <= 1e-9:
+                break
+            item = tree.find(self.rng.random() * total)
+            if item not in self.pool:
+                # Removed since it was weighed - never draw it again
+                tree.set(item, 0.0)
+                continue
+            if tree.weights[item] <= 0:
+                # Rounding put the target on a zero-weight item
+                rejections += 1
+                continue
+            chance = self.accept(item) if self.accept else 1.0
+            if chance >= 1.0 or self.rng.random() < chance:
+                return item
+            if chance > best_chance:
+                best, best_chance = item, chance
+            rejections += 1
+        if best is not None:
+            # Everything drawn was shown recently - take the one shown longest ago
+            return best
+        # Nothing in the pool weighs anything (e.g. a schedule rules out every
+        # folder) - an unweighted pick beats showing nothing
+        candidates = [item for item in self.pool.snapshot() if item not in exclude]
+        return self.rng.choice(candidates) if candidates else None
+
+
+class SelectionEngine:
+    """Per-pool bags shared by every monitor drawing from the same pool
+
+    Shuffle bags unless the policy weighs images, weighted bags otherwise.
+    """
+
+    def __init__(self, rng=None, policy=None, clock=time.time):
+        self.rng = rng or random.Random()
+        self.bags = {}  # {pool key: ShuffleBag or WeightedBag}
+        self.lock = threading.Lock()
+        self.policy = policy  # SelectionPolicy, or None for plain shuffle bags
+        self.clock = clock
+        self.period = None  # policy.period() the bags were weighed for
+        self.shown = {}  # {item: time last shown}, while weighing, least recent first
+        self.now = 0.0  # Time of the current selection
+
+    def set_policy(self, policy):
+        with self.lock:
+            self.policy = policy
+            self.bags = {}
+            self.period = None
+
+    def reset(self):
+        with self.lock:
+            self.bags = {}
+            self.shown = {}
+            self.period = None
+
+    def weighted(self):
+        return self.policy is not None and self.policy.weighted
+
+    def _bag(self, key, pool):
+        bag = self.bags.get(key)
+        if bag is None or bag.pool is not pool:
+            # New or replaced pool (e.g. after a rescan)
+            if self.weighted():
+                bag = WeightedBag(pool, self.rng, self.policy.weigher(pool, self.now),
+                                  self.shown_chance)
+            else:
+                bag = ShuffleBag(pool, self.rng)
+            bag.refill()
+            self.bags[key] = bag
+        return bag
+
+    def shown_chance(self, item):
+        """Probability of accepting item, lowered while it was shown recently"""
+        shown_at = self.shown.get(item)
+        if shown_at is None:
+            return 1.0
+        return self.policy.shown_chance(self.now - shown_at)
+
+    def _advance(self, now):
+        self.now = now
+        period = self.policy.period(now)
+        if period != self.period:
+            # E.g. a schedule rule started - every weight may have changed
+            self.bags = {}
+            self.period = period
+        # Forget images shown long enough ago, checking the oldest first
+        recovered = []
+        for item in self.shown:
+            if self.shown_chance(item) < RECOVERED:
+                break
+            recovered.append(item)
+        for item in recovered:
+            del self.shown[item]
+
+    def item_added(self, key, item):
+        """Make an image added to a pool eligible in the current round"""
+        with self.lock:
+            bag = self.bags.get(key)
+            if bag is not None:
+                bag.add(item)
+
+    def select(self, requests):
+        """Pick one image per monitor
+
+        requests is a list of (monitor_id, pool_key, pool). Returns
+        {monitor_id: image}; no two monitors get the same image unless the
+        pools don't hold enough distinct images.
+        """
+        selection = {}
+        used = set()
+        with self.lock:
+            weighted = self.weighted()
+            if weighted:
+                self._advance(self.clock())
+            for monitor_id, key, pool in requests:
+                if not len(pool):
+                    continue
+                bag = self._bag(key, pool)
+                item = bag.draw(exclude=used)
+                if item is None:
+                    # Fewer images than monitors - sharing is unavoidable
+                    item = bag.draw()
+                if item is None:
+                    continue
+                selection[monitor_id] = item
+                used.add(item)
+                if weighted:
+                    # Re-inserted to keep the dict ordered by time shown
+                    self.shown.pop(item, None)
+                    self.shown[item] = self.now
+        return selection
@@ -0,0 +1,119 @@
+"""Rules that weigh images for weighted selection.
+
+A SelectionPolicy turns settings into per-image weights for the selection
+engine's weighted bags:
+
+- folder_weights: {folder: weight}. An image weighs as much as the deepest
+  listed folder containing it, 1 if none does; 0 leaves a folder out.
+  Folders may be relative to the wallpaper directory.
+- schedule: time-of-day rules, e.g. {"start": "22:00", "end": "07:00",
+  "weights": {"Night": 3, ".": 0}}. While a rule is active its weights
+  replace folder_weights (here: only Night is shown); the first matching
+  rule wins.
+- recent_boost: factor for images added in the last recent_days days.
+- shown_half_life_hours: a shown image is accepted again with probability
+  1 - 0.5 ** (hours since shown / half life).
+
+With no folder weights, no schedule and no boost the policy doesn't weigh
+anything and the engine keeps its no-repeat shuffle bags.
+"""
+import os
+import time
+
+
+DAY = 24 * 3600
+
+
+def parse_time_of_day(value):
+    """Minutes since midnight from 'HH:MM'"""
+    hours, minutes = value.split(':')
+    return int(hours) * 60 + int(minutes)
+
+
+class SelectionPolicy:
+    def __init__(self, folder_weights=None, schedule=None, root=None,
+                 recent_boost=1.0, recent_days=7, shown_half_life_hours=24,
+                 localtime=time.localtime):
+        self.root = root
+        self.folder_weights = self._normalize(folder_weights or {})
+        self.schedule = []  # [(start minute, end minute, weights)]
+        for rule in schedule or []:
+            try:
+                self.schedule.append((parse_time_of_day(rule['start']),
+                                      parse_time_of_day(rule['end']),
+                                      self._normalize(rule.get('weights', {}))))
+            except (KeyError, ValueError, AttributeError) as e:
+                print(f"Ignoring invalid schedule rule {rule!r}: {e}")
+        self.recent_boost = recent_boost
+        self.recent_days = recent_days
+        self.shown_half_life = (shown_half_life_hours or 0) * 3600
+        self.localtime = localtime
+        self.folder_cache = {}  # {(rule index, directory): weight}
+
+    @property
+    def weighted(self):
+        """Whether any image can weigh differently from another"""
+        return bool(self.folder_weights or self.schedule or self.recent_boost != 1)
+
+    def _normalize(self, weights):
+        """{normalized absolute folder: weight}"""
+        root = self.root or os.getcwd()
+        return {os.path.normcase(os.path.abspath(os.path.join(root, folder))): float(weight)
+                for folder, weight in weights.items()}
+
+    def active_rule(self, now):
+        """Index of the schedule rule in effect at now, or None"""
+        local = self.localtime(now)
+        minute = local.tm_hour * 60 + local.tm_min
+        for index, (start, end, _) in enumerate(self.schedule):
+            if start <= end:
+                if start <= minute < end:
+                    return index
+            elif minute >= start or minute < end:
+                # Wraps past midnight
+                return index
+        return None
+
+    def period(self, now):
+        """Changes whenever weights have to be recomputed from scratch"""
+        day = int(now // DAY) if self.recent_boost != 1 else None
+        return self.active_rule(now), day
+
+    def folder_weight(self, rule, directory):
+        key = (rule, directory)
+        weight = self.folder_cache.get(key)
+        if weight is None:
+            weights = self.folder_weights if rule is None else self.schedule[rule][2]
+            weight = 1.0
+            path = os.path.normcase(directory)
+            while True:
+                if path in weights:
+                    weight = weights[path]
+                    break
+                parent = os.path.dirname(path)
+                if parent == path:
+                    break
+                path = parent
+            self.folder_cache[key] = weight
+        return weight
+
+    def weigher(self, pool, now):
+        """Return weigh(image_id) for the images of pool at time now"""
+        catalog = pool.catalog
+        rule = self.active_rule(now)
+        recent_since = now - self.recent_days * DAY
+        dirs, dir_id, added = catalog.dirs, catalog.dir_id, catalog.added
+
+        def weigh(image_id):
+            weight = self.folder_weight(rule, dirs[dir_id[image_id]])
+            if weight and added[image_id] >= recent_since:
+                weight *= self.recent_boost
+            return max(0.0, weight)
+
+        return weigh
+
+    def shown_chance(self, seconds_since_shown):
+        """Probability of taking an image again this long after it was shown"""
+        if self.shown_half_life <= 0:
+            return 1.0
+        return 1.0 - 0.5 ** (seconds_since_shown / self.shown_half_life)
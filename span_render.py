@@ -0,0 +1,88 @@
+"""Panorama rendering across several monitors (Span fit mode).
+
+The active monitors' desktop rectangles are laid out on one virtual canvas,
+optionally with a gap for the bezels between neighbouring panels so lines in
+the picture stay straight across them. One panorama is scaled to cover the
+canvas and each monitor gets the tile under its rectangle.
+
+The source is decoded once, at the smallest JPEG draft scale that still
+covers the canvas, and tiles are resampled straight from it one monitor at a
+time - the full canvas-sized composite is never built.
+"""
+import math
+
+from image_render import EXIF_TRANSPOSES, oriented_size, pending_exif_orientation
+
+
+def span_layout(rects, bezel=0):
+    """Place monitor rectangles on a canvas with bezel gaps between panels
+
+    rects is {monitor_id: (left, top, width, height)} in desktop coordinates.
+    Returns ((canvas_width, canvas_height), {monitor_id: (x, y, width, height)}).
+    """
+    if not rects:
+        return (0, 0), {}
+    rights = {left + width for left, top, width, height in rects.values()}
+    bottoms = {top + height for left, top, width, height in rects.values()}
+    min_left = min(left for left, top, width, height in rects.values())
+    min_top = min(top for left, top, width, height in rects.values())
+
+    layout = {}
+    for monitor_id, (left, top, width, height) in rects.items():
+        # One bezel gap for every panel edge between this monitor and the origin
+        x = left - min_left + bezel * sum(1 for right in rights if right <= left)
+        y = top - min_top + bezel * sum(1 for bottom in bottoms if bottom <= top)
+        layout[monitor_id] = (x, y, width, height)
+
+    canvas_width = max(x + width for x, y, width, height in layout.values())
+    canvas_height = max(y + height for x, y, width, height in layout.values())
+    return (canvas_width, canvas_height), layout
+
+
+def render_span(image_path, info, canvas_size, layout):
+    """Yield (monitor_id, PIL image) tiles of image_path covering the canvas
+
+    info is the (width, height, exif_orientation) tuple of the source. The
+    panorama is scaled to fill the canvas and centered, like Fill on a single
+    monitor. Each tile is a new image the caller should close once saved.
+    """
+    from PIL import Image
+
+    width, height, exif_orientation = info
+    canvas_width, canvas_height = canvas_size
+    oriented_width, oriented_height = oriented_size(width, height, exif_orientation, None)
+    scale = max(canvas_width / oriented_width, canvas_height / oriented_height)
+
+    with Image.open(image_path) as source:
+        img = source
+        # TIFFs load already oriented, so their pixels need no further transpose
+        exif_orientation = pending_exif_orientation(source, exif_orientation)
+        # Decode at 1/2, 1/4 or 1/8 scale when that still covers the canvas
+        wanted = (max(1, math.ceil(source.width * scale)),
+                  max(1, math.ceil(source.height * scale)))
+        img.draft('RGB', wanted)
+        if img.mode in ('1', 'P'):
+            img = img.convert('RGBA' if 'transparency' in img.info else 'RGB')
+        factor = min(img.width // wanted[0], img.height // wanted[1])
+        if factor >= 2:
+            img = img.reduce(factor)
+        if exif_orientation in EXIF_TRANSPOSES:
+            img = img.transpose(EXIF_TRANSPOSES[exif_orientation])
+
+        # The panorama scaled to whole pixels covering the canvas, centered on
+        # it; integer offsets can't come out a hair below zero
+        scaled_width = max(canvas_width, round(oriented_width * scale))
+        scaled_height = max(canvas_height, round(oriented_height * scale))
+        offset_x = (scaled_width - canvas_width) // 2
+        offset_y = (scaled_height - canvas_height) // 2
+        # Canvas pixel -> decoded pixel
+        ratio_x = img.width / scaled_width
+        ratio_y = img.height / scaled_height
+
+        for monitor_id, (x, y, tile_width, tile_height) in layout.items():
+            box = (max(0.0, (offset_x + x) * ratio_x),
+                   max(0.0, (offset_y + y) * ratio_y),
+                   min(img.width, (offset_x + x + tile_width) * ratio_x),
+                   min(img.height, (offset_y + y + tile_height) * ratio_y))
+            yield monitor_id, img.resize(
+                (tile_width, tile_height), Image.Resampling.LANCZOS, box=box)
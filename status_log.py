@@ -0,0 +1,81 @@
+"""Bounded status log shared by the window and an optional file on disk.
+
+Messages go into a fixed-size ring buffer instead of straight into the Tk
+Text widget. The window drains the new lines at a fixed frame rate, inserts
+them in one call and trims the widget to the same number of lines, so a
+process that runs for weeks in the tray holds at most max_lines lines no
+matter how much it logs. append() is thread-safe, so worker and tray threads
+may log too.
+
+Every message is also written to a size-rotated file log when a path is
+given (log.txt, log.txt.1, ... log.txt.<backups>).
+"""
+import threading
+import time
+from collections import deque
+
+
+MAX_LINES = 2000  # Lines kept in memory and shown in the window
+FLUSH_INTERVAL_MS = 100  # How often the window drains new lines (10 frames/s)
+LOG_FILE_MAX_BYTES = 1024 * 1024
+LOG_FILE_BACKUPS = 3
+
+
+class StatusLog:
+    def __init__(self, max_lines=MAX_LINES, log_file=None,
+                 max_bytes=LOG_FILE_MAX_BYTES, backups=LOG_FILE_BACKUPS):
+        self.max_lines = max_lines
+        self.lock = threading.Lock()
+        self.lines = deque(maxlen=max_lines)  # Most recent lines, oldest first
+        self.pending = 0  # Lines appended since the last take_pending()
+        self.file_logger = None
+        if log_file:
+            self.file_logger = self._open_file_log(log_file, max_bytes, backups)
+
+    @staticmethod
+    def _open_file_log(path, max_bytes, backups):
+        # logging is only imported when a file log is wanted
+        import logging
+        from logging.handlers import RotatingFileHandler
+        try:
+            handler = RotatingFileHandler(path, maxBytes=max_bytes,
+                                          backupCount=backups, encoding='utf-8')
+        except OSError as e:
+            print(f"Error opening log file {path}: {e}")
+            return None
+        handler.setFormatter(logging.Formatter('%(asctime)s - %(message)s'))
+        logger = logging.getLogger(f"wpchanger.status.{id(handler)}")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        logger.addHandler(handler)
+        return logger
+
+    def append(self, message):
+        line = f"{time.strftime('%H:%M:%S')} - {message}"
+        with self.lock:
+            self.lines.append(line)
+            self.pending += 1
+        if self.file_logger is not None:
+            self.file_logger.info(message)
+
+    def take_pending(self):
+        """Return (lines added since the last call, whether older ones were dropped)
+
+        If more than max_lines arrived in between only the newest max_lines
+        are returned, and the caller should replace what it shows with them.
+        """
+        with self.lock:
+            count = self.pending
+            self.pending = 0
+            if count == 0:
+                return [], False
+            if count >= len(self.lines):
+                return list(self.lines), count > len(self.lines)
+            return [self.lines[i] for i in range(len(self.lines) - count, len(self.lines))], False
+
+    def close(self):
+        if self.file_logger is not None:
+            for handler in list(self.file_logger.handlers):
+                handler.close()
+                self.file_logger.removeHandler(handler)
+            self.file_logger = None
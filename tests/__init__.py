@@ -0,0 +1,5 @@
+"""Tests for the platform-independent modules and the rotator
+
+Run from the repository root with: python -m pytest -q
+Pillow is the only requirement; nothing here needs Windows.
+"""
@@ -0,0 +1,74 @@
+"""Synthetic images and an in-memory rotator for the tests"""
+import os
+
+from PIL import Image
+
+from wallpaper_backend import RecordingBackend, side_by_side
+from wallpaper_rotator import WallpaperRotator
+
+
+FORMATS = {'.jpg': 'JPEG', '.png': 'PNG', '.bmp': 'BMP', '.gif': 'GIF', '.tiff': 'TIFF'}
+LANDSCAPE = (1920, 1080)
+PORTRAIT = (1080, 1920)
+
+
+def picture(size):
+    """An RGB gradient with a red top left corner, so every orientation looks different"""
+    width, height = size
+    img = Image.linear_gradient('L').resize(size).convert('RGB')
+    img.paste((255, 0, 0), (0, 0, max(1, width // 4), max(1, height // 4)))
+    return img
+
+
+def save_picture(path, size, exif_orientation=None):
+    """Write picture(size) to path, in the format its extension names"""
+    img = picture(size)
+    fmt = FORMATS[os.path.splitext(path)[1].lower()]
+    kwargs = {}
+    if exif_orientation:
+        exif = Image.Exif()
+        exif[274] = exif_orientation
+        kwargs['exif'] = exif
+    if fmt == 'GIF':
+        img = img.convert('P')
+    img.save(path, fmt, **kwargs)
+    return path
+
+
+def make_library(directory, count=4):
+    """count landscape JPEGs and count portrait PNGs in directory"""
+    os.makedirs(directory, exist_ok=True)
+    for i in range(count):
+        save_picture(os.path.join(directory, f"wide{i}.jpg"), (160 + i, 90))
+        save_picture(os.path.join(directory, f"tall{i}.png"), (90, 160 + i))
+    return directory
+
+
+def make_rotator(tmp_path, sizes=(LANDSCAPE, PORTRAIT)):
+    """Rotator on an in-memory desktop, with every file it writes under tmp_path
+
+    Returns (rotator, backend). Every monitor is active and rotates
+    mismatched images left.
+    """
+    backend = RecordingBackend(side_by_side(sizes), latency_scale=0)
+    rotator = WallpaperRotator(config_file=str(tmp_path / 'config.json'), backend=backend)
+    rotator.index_file = str(tmp_path / 'index.db')
+    rotator.render_cache_dir = str(tmp_path / 'cache')
+    rotator.render_cache.directory = rotator.cache_dir()
+    rotator.cache_manifest_file = str(tmp_path / 'cache.json')
+    rotator.janitor.manifest_path = rotator.cache_manifest_file
+    rotator.prefetch_seconds = 0
+    # The synthetic pictures only differ in size, so they'd hash as duplicates
+    rotator.detect_duplicates = False
+    for monitor in rotator.monitors:
+        rotator.active_monitors[monitor['id']] = monitor['orientation']
+        rotator.monitor_rotation_direction[monitor['id']] = 'left'
+    return rotator, backend
+
+
+def close_rotator(rotator):
+    """Let background work finish and release the index"""
+    rotator.wait_for_cleanup(10)
+    rotator.wait_for_notifications(10)
+    if rotator.image_index is not None:
+        rotator.image_index.close()
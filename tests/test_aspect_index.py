@@ -0,0 +1,52 @@
+from aspect_index import aspect_key, key_range
+from catalog import ImageCatalog
+from tests.helpers import close_rotator, make_rotator
+
+
+def test_key_range_covers_the_tolerance():
+    low, high = key_range(16 / 9, 0.1)
+    assert low <= aspect_key(1920, 1080) <= high
+    assert low <= aspect_key(1920, 1100) <= high
+    assert not low <= aspect_key(1920, 1200) <= high
+    assert not low <= aspect_key(3840, 1080) <= high
+
+
+def test_range_pools_follow_the_catalog():
+    catalog = ImageCatalog()
+    hd = catalog.add('hd.jpg', 1920, 1080, 'Landscape')
+    ultrawide = catalog.add('ultrawide.jpg', 5120, 1440, 'Landscape')
+    catalog.add('square.jpg', 1000, 1000, 'Landscape')
+    catalog.add('unknown.jpg')
+    pool = catalog.aspects.pool(16 / 9, 0.1)
+    assert list(pool) == [hd] and len(pool) == 1
+    assert ultrawide not in pool
+
+    # Later additions and removals show up in pools already handed out
+    qhd = catalog.add('qhd.jpg', 2560, 1440, 'Landscape')
+    assert sorted(pool) == [hd, qhd] and len(pool) == 2
+    catalog.remove(hd)
+    assert list(pool) == [qhd] and len(pool) == 1 and hd not in pool
+    assert list(catalog.aspects.pool(32 / 9, 0.1)) == [ultrawide]
+
+
+def test_monitors_draw_from_close_aspect_ratios(tmp_path):
+    # A 32:9 ultrawide next to a 16:9 panel
+    rotator, _ = make_rotator(tmp_path, sizes=((5120, 1440), (1920, 1080)))
+    ultrawide_id, hd_id = [monitor['id'] for monitor in rotator.monitors]
+    catalog = rotator.catalog
+    ultrawides = [catalog.add(f"ultrawide{i}.jpg", 5120, 1440, 'Landscape') for i in range(3)]
+    hds = [catalog.add(f"hd{i}.jpg", 1920, 1080, 'Landscape') for i in range(3)]
+    rotator.aspect_min_images = 3
+
+    key, pool = rotator.get_image_pool(ultrawide_id, 'Landscape')
+    assert key.startswith('aspect:') and sorted(pool) == ultrawides
+    key, pool = rotator.get_image_pool(hd_id, 'Landscape')
+    assert key.startswith('aspect:') and sorted(pool) == hds
+
+    # Too few close matches falls back to the orientation pool
+    rotator.aspect_min_images = 4
+    assert rotator.get_image_pool(ultrawide_id, 'Landscape')[0] == 'Landscape'
+    rotator.match_aspect_ratio = False
+    rotator.aspect_min_images = 1
+    assert rotator.get_image_pool(hd_id, 'Landscape')[0] == 'Landscape'
+    close_rotator(rotator)
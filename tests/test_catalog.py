@@ -0,0 +1,54 @@
+import os
+
+from catalog import ImageCatalog
+
+
+def test_add_find_and_path():
+    catalog = ImageCatalog()
+    path = os.path.join('library', 'sub', 'café.jpg')
+    image_id = catalog.add(path, 1920, 1080, 'Landscape', added=1000)
+    assert catalog.find(path) == image_id
+    assert catalog.path(image_id) == path
+    assert catalog.get_orientation(image_id) == 'Landscape'
+    assert catalog.added[image_id] == 1000
+    # Adding the same path again returns the existing row
+    assert catalog.add(path, 1920, 1080, 'Landscape') == image_id
+    assert len(catalog) == 1
+    assert catalog.find(os.path.join('library', 'other.jpg')) is None
+
+
+def test_orientation_pools():
+    catalog = ImageCatalog()
+    wide = catalog.add('wide.jpg', 1920, 1080, 'Landscape')
+    tall = catalog.add('tall.jpg', 1080, 1920, 'Portrait')
+    unknown = catalog.add('unknown.jpg')
+    assert list(catalog.all) == [wide, tall, unknown]
+    assert list(catalog.landscape) == [wide]
+    assert list(catalog.portrait) == [tall]
+    assert tall in catalog.portrait and tall not in catalog.landscape
+
+
+def test_remove_keeps_ids_stable():
+    catalog = ImageCatalog()
+    first = catalog.add('a.jpg', 10, 5, 'Landscape')
+    second = catalog.add('b.jpg', 10, 5, 'Landscape')
+    assert catalog.remove(first)
+    assert not catalog.remove(first)
+    assert catalog.find('a.jpg') is None
+    assert first not in catalog.all and first not in catalog.landscape
+    assert len(catalog.landscape) == 1
+    assert catalog.path(second) == 'b.jpg'
+    # A re-added path gets a new row
+    assert catalog.add('a.jpg', 10, 5, 'Landscape') not in (first, second)
+
+
+def test_lookup_table_grows():
+    catalog = ImageCatalog()
+    ids = [catalog.add(f"dir{i % 7}/image{i}.png", 4, 3, 'Landscape') for i in range(3000)]
+    for i in range(0, 3000, 2):
+        catalog.remove(ids[i])
+    for i, image_id in enumerate(ids):
+        expected = None if i % 2 == 0 else image_id
+        assert catalog.find(f"dir{i % 7}/image{i}.png") == expected
+    assert len(catalog.all) == 1500
+    assert len(catalog.dirs) == 7
@@ -0,0 +1,53 @@
+import os
+
+import cli
+from tests.helpers import close_rotator, make_library, make_rotator
+
+
+def test_stats_without_a_directory_creates_no_index(tmp_path, capsys):
+    rotator, _ = make_rotator(tmp_path)
+    assert cli.command_stats(rotator, None) == 0
+    assert 'Indexed images' not in capsys.readouterr().out
+    assert not os.path.exists(rotator.index_file)
+    close_rotator(rotator)
+
+
+def test_stats_before_the_first_scan_creates_no_index(tmp_path, capsys):
+    rotator, _ = make_rotator(tmp_path)
+    rotator.wallpaper_dir = make_library(str(tmp_path / 'library'))
+    assert cli.command_stats(rotator, None) == 0
+    assert 'Indexed images: none yet' in capsys.readouterr().out
+    assert not os.path.exists(rotator.index_file)
+    close_rotator(rotator)
+
+
+def test_stats_reads_the_index_of_the_last_scan(tmp_path, capsys):
+    rotator, _ = make_rotator(tmp_path)
+    rotator.wallpaper_dir = make_library(str(tmp_path / 'library'), count=3)
+    assert cli.command_scan(rotator, None) == 0
+    close_rotator(rotator)
+
+    rotator, _ = make_rotator(tmp_path)
+    rotator.wallpaper_dir = str(tmp_path / 'library')
+    assert cli.command_stats(rotator, None) == 0
+    out = capsys.readouterr().out
+    assert "Indexed images: 6 (Portrait: 3, Landscape: 3, hashed: 0, unhashable: 0)" in out
+    # Nothing was walked
+    assert len(rotator.image_files) == 0
+    close_rotator(rotator)
+
+
+def test_rotate_once_sets_every_active_monitor(tmp_path):
+    rotator, backend = make_rotator(tmp_path)
+    rotator.wallpaper_dir = make_library(str(tmp_path / 'library'))
+    assert cli.command_rotate_once(rotator, None) == 0
+    assert set(backend.wallpapers) == set(rotator.active_monitors)
+    close_rotator(rotator)
+
+
+def test_rotate_once_fails_without_images(tmp_path):
+    rotator, backend = make_rotator(tmp_path)
+    rotator.wallpaper_dir = str(tmp_path / 'missing')
+    assert cli.command_rotate_once(rotator, None) == 1
+    assert backend.wallpapers == {}
+    close_rotator(rotator)
@@ -0,0 +1,104 @@
+import os
+
+import wallpaper_rotator
+from catalog import ImageCatalog
+from dedup import HASH_BITS, _chunk_spans, hamming
+from tests.helpers import close_rotator, make_library, make_rotator, save_picture
+
+
+def test_hamming():
+    assert hamming(0, 0) == 0
+    assert hamming(0b1010, 0b0101) == 4
+    assert hamming(0, (1 << 64) - 1) == 64
+
+
+def test_chunks_cover_every_bit_once():
+    for chunks in (1, 3, 4, 5, 7):
+        covered = 0
+        for shift, mask in _chunk_spans(chunks):
+            assert covered & (mask << shift) == 0
+            covered |= mask << shift
+        assert covered == (1 << HASH_BITS) - 1
+
+
+def test_matches_across_every_chunk():
+    # Three differing bits spread over the hash still land in one group
+    base = 0x0123456789ABCDEF
+    catalog = ImageCatalog()
+    first = catalog.add('a.jpg', 100, 100, dhash=base)
+    second = catalog.add('b.jpg', 200, 200, dhash=base ^ (1 | 1 << 30 | 1 << 63))
+    far = catalog.add('c.jpg', 300, 300, dhash=base ^ 0b1111)
+    assert catalog.duplicates.group_of[first] == catalog.duplicates.group_of[second]
+    assert far not in catalog.duplicates.group_of
+    assert list(catalog.all) == [second, far]
+
+
+def test_groups_merge_and_split():
+    catalog = ImageCatalog()
+    a = catalog.add('a.jpg', 100, 100, dhash=0b000000)
+    c = catalog.add('c.jpg', 300, 300, dhash=0b111111)
+    assert len(catalog.duplicates.groups) == 0
+    # b is within 3 bits of both, joining them into one group
+    b = catalog.add('b.jpg', 200, 200, dhash=0b000111)
+    assert sorted(catalog.duplicates.groups.values()) == [sorted([a, b, c])]
+    assert list(catalog.all) == [c]
+
+    catalog.remove(c)
+    assert catalog.take_promoted() == [b]
+    assert list(catalog.all) == [b]
+    catalog.remove(b)
+    assert catalog.take_promoted() == [a]
+    assert catalog.duplicates.groups == {}
+
+
+def test_near_duplicates_show_the_largest_copy():
+    catalog = ImageCatalog()
+    small = catalog.add('small.jpg', 800, 600, 'Landscape', dhash=0b1011)
+    large = catalog.add('large.jpg', 4000, 3000, 'Landscape', dhash=0b1001)
+    other = catalog.add('other.jpg', 800, 600, 'Landscape', dhash=0xFFFF0000)
+    assert list(catalog.all) == [large, other]
+    assert catalog.duplicates.hidden_count() == 1
+
+    catalog.remove(large)
+    assert catalog.take_promoted() == [small]
+    assert list(catalog.all) == [small, other]
+    assert catalog.duplicates.hidden_count() == 0
+
+
+def test_scan_hides_resized_copies(tmp_path):
+    library = str(tmp_path / 'library')
+    os.makedirs(library)
+    large = save_picture(os.path.join(library, 'large.jpg'), (640, 360))
+    save_picture(os.path.join(library, 'small.jpg'), (320, 180))
+    rotator, _ = make_rotator(tmp_path)
+    rotator.detect_duplicates = True
+    assert rotator.scan_images(library) == 1
+    assert list(rotator.image_files.paths()) == [large]
+    assert rotator.catalog.duplicates.hidden_count() == 1
+    close_rotator(rotator)
+
+
+def test_unhashable_images_are_not_decoded_again(tmp_path, monkeypatch):
+    library = make_library(str(tmp_path / 'library'), count=2)
+    hashed = []
+
+    def failing_dhash(path, exif_orientation):
+        hashed.append(path)
+        raise OSError('truncated image')
+
+    monkeypatch.setattr(wallpaper_rotator, 'dhash', failing_dhash)
+    rotator, _ = make_rotator(tmp_path)
+    rotator.detect_duplicates = True
+    assert rotator.scan_images(library) == 4
+    assert len(hashed) == 4
+    known = rotator.image_index.snapshot(library)
+    assert all(entry[6] is None and entry[7] for entry in known.values())
+    close_rotator(rotator)
+
+    hashed.clear()
+    rotator, _ = make_rotator(tmp_path)
+    rotator.detect_duplicates = True
+    assert rotator.scan_images(library) == 4
+    assert hashed == []
+    assert len(rotator.image_files) == 4
+    close_rotator(rotator)
@@ -0,0 +1,93 @@
+import os
+
+import pytest
+
+from fs_walk import WalkOptions, has_extension, walk_images
+from tests.helpers import close_rotator, make_rotator, save_picture
+from wallpaper_rotator import IMAGE_EXTENSIONS
+
+
+def make_tree(root):
+    """root/a.jpg, root/notes.txt, root/sub/b.PNG, root/sub/deeper/c.gif,
+    root/.hidden/d.jpg and root/.wallpaper_temp/e.jpg"""
+    for relative in ('a.jpg', os.path.join('sub', 'b.PNG'), os.path.join('sub', 'deeper', 'c.gif'),
+                     os.path.join('.hidden', 'd.jpg'), os.path.join('.wallpaper_temp', 'e.jpg')):
+        path = os.path.join(root, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        save_picture(path, (10, 10))
+    with open(os.path.join(root, 'notes.txt'), 'w') as f:
+        f.write('not an image')
+    return root
+
+
+def walked(root, options=None, **kwargs):
+    return sorted(os.path.relpath(entry.path, root)
+                  for entry in walk_images(root, IMAGE_EXTENSIONS, options, **kwargs))
+
+
+def test_has_extension():
+    assert has_extension('photo.JPG', IMAGE_EXTENSIONS)
+    assert has_extension('archive.tar.png', IMAGE_EXTENSIONS)
+    assert not has_extension('notes.txt', IMAGE_EXTENSIONS)
+    assert not has_extension('.jpg', IMAGE_EXTENSIONS)
+    assert not has_extension('jpg', IMAGE_EXTENSIONS)
+
+
+def test_walk_skips_hidden_and_render_folders(tmp_path):
+    root = make_tree(str(tmp_path))
+    assert walked(root) == sorted(['a.jpg', os.path.join('sub', 'b.PNG'),
+                                   os.path.join('sub', 'deeper', 'c.gif')])
+    # Render output stays out even when hidden folders are scanned
+    assert walked(root, WalkOptions(skip_hidden=False)) == sorted([
+        'a.jpg', os.path.join('sub', 'b.PNG'), os.path.join('sub', 'deeper', 'c.gif'),
+        os.path.join('.hidden', 'd.jpg')])
+
+
+def test_max_depth(tmp_path):
+    root = make_tree(str(tmp_path))
+    assert walked(root, WalkOptions(max_depth=0)) == ['a.jpg']
+    assert walked(root, WalkOptions(max_depth=1)) == sorted(['a.jpg', os.path.join('sub', 'b.PNG')])
+
+
+def test_on_directory_reports_every_listing(tmp_path):
+    root = make_tree(str(tmp_path))
+    listed = {}
+
+    def on_directory(dir_path, subdir_names, image_names, mtime_ns):
+        listed[os.path.relpath(dir_path, root)] = (sorted(subdir_names), sorted(image_names))
+
+    walked(root, on_directory=on_directory)
+    assert listed == {
+        '.': (['sub'], ['a.jpg']),
+        'sub': (['deeper'], ['b.PNG']),
+        os.path.join('sub', 'deeper'): ([], ['c.gif']),
+    }
+
+
+def test_cancelled_stops_between_directories(tmp_path):
+    root = make_tree(str(tmp_path))
+    assert walked(root, cancelled=lambda: True) == []
+
+
+@pytest.mark.skipif(not hasattr(os, 'symlink'), reason='no symlink support')
+def test_symlink_loops_are_walked_once(tmp_path):
+    root = make_tree(str(tmp_path / 'root'))
+    try:
+        os.symlink(root, os.path.join(root, 'sub', 'loop'), target_is_directory=True)
+    except OSError:
+        pytest.skip('symlinks not permitted')
+    expected = sorted(['a.jpg', os.path.join('sub', 'b.PNG'), os.path.join('sub', 'deeper', 'c.gif')])
+    assert walked(root) == expected
+    # Followed, the link leads back to a folder already listed
+    assert walked(root, WalkOptions(follow_symlinks=True)) == expected
+
+
+def test_scan_applies_the_walk_options(tmp_path):
+    root = make_tree(str(tmp_path / 'library'))
+    rotator, _ = make_rotator(tmp_path)
+    rotator.scan_max_depth = 1
+    assert rotator.scan_images(root) == 2
+    rotator.scan_skip_hidden = False
+    rotator.scan_max_depth = None
+    assert rotator.scan_images(root) == 4
+    close_rotator(rotator)
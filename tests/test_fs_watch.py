@@ -0,0 +1,88 @@
+import os
+import queue
+import shutil
+
+from fs_walk import walk_images
+from fs_watch import WatchedTree, pair_moves
+from tests.helpers import close_rotator, make_library, make_rotator, save_picture
+from wallpaper_rotator import IMAGE_EXTENSIONS
+
+
+def scanned_tree(directory):
+    tree = WatchedTree(IMAGE_EXTENSIONS, directory)
+    for _ in walk_images(directory, IMAGE_EXTENSIONS, on_directory=tree.add_directory):
+        pass
+    return tree
+
+
+def test_refresh_reports_changes(tmp_path):
+    library = make_library(str(tmp_path / 'library'), count=2)
+    os.makedirs(os.path.join(library, 'old'))
+    save_picture(os.path.join(library, 'old', 'gone.jpg'), (20, 10))
+    tree = scanned_tree(library)
+
+    os.remove(os.path.join(library, 'wide0.jpg'))
+    save_picture(os.path.join(library, 'new.jpg'), (20, 10))
+    with open(os.path.join(library, 'notes.txt'), 'w') as f:
+        f.write('not an image')
+    os.makedirs(os.path.join(library, 'sub'))
+    save_picture(os.path.join(library, 'sub', 'nested.png'), (10, 20))
+    shutil.rmtree(os.path.join(library, 'old'))
+
+    events = []
+    tree.refresh(library, events)
+    assert sorted(events) == sorted([
+        ('deleted', os.path.join(library, 'wide0.jpg')),
+        ('created', os.path.join(library, 'new.jpg')),
+        ('created', os.path.join(library, 'sub', 'nested.png')),
+        ('deleted', os.path.join(library, 'old', 'gone.jpg')),
+    ])
+    assert os.path.join(library, 'sub') in tree.files
+    assert os.path.join(library, 'old') not in tree.files
+
+
+def test_pair_moves():
+    events = [('deleted', 'a/old.jpg'), ('created', 'b/new.jpg'), ('created', 'c.jpg')]
+    assert pair_moves(events, {'b/new.jpg': 'a/old.jpg'}) == [
+        ('moved', 'a/old.jpg', 'b/new.jpg'), ('created', 'c.jpg')]
+    assert pair_moves(events, {}) == events
+
+
+def test_events_update_the_pools(tmp_path):
+    library = make_library(str(tmp_path / 'library'), count=2)
+    rotator, _ = make_rotator(tmp_path)
+    rotator.scan_images(library)
+
+    added = save_picture(os.path.join(library, 'added.png'), (10, 40))
+    removed = os.path.join(library, 'wide0.jpg')
+    old_path = os.path.join(library, 'wide1.jpg')
+    new_path = os.path.join(library, 'renamed.jpg')
+    events = rotator.resolve_fs_events([('created', added), ('deleted', removed),
+                                        ('moved', old_path, new_path)])
+    assert rotator.apply_fs_events(events) == (1, 1)
+
+    catalog = rotator.catalog
+    assert catalog.get_orientation(catalog.find(added)) == 'Portrait'
+    assert catalog.find(removed) is None and catalog.find(old_path) is None
+    renamed = catalog.find(new_path)
+    assert (catalog.width[renamed], catalog.height[renamed]) == (161, 90)
+    assert len(rotator.portrait_images) == 3 and len(rotator.landscape_images) == 1
+    close_rotator(rotator)
+
+
+def test_watcher_picks_up_new_files(tmp_path):
+    library = make_library(str(tmp_path / 'library'), count=1)
+    rotator, _ = make_rotator(tmp_path)
+    rotator.watch_poll_interval = 0.05
+    rotator.scan_images(library)
+    received = queue.Queue()
+    assert rotator.start_watching(received.put)
+    try:
+        added = save_picture(os.path.join(library, 'added.jpg'), (40, 10))
+        events = received.get(timeout=10)
+        rotator.apply_fs_events(events)
+    finally:
+        rotator.stop_watching()
+    assert events[0][:2] == ('created', added)
+    assert rotator.catalog.get_orientation(rotator.catalog.find(added)) == 'Landscape'
+    close_rotator(rotator)
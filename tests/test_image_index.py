@@ -0,0 +1,82 @@
+import os
+import sqlite3
+
+import wallpaper_rotator
+from image_index import ImageIndex
+from tests.helpers import close_rotator, make_library, make_rotator
+
+
+def test_entries_round_trip(tmp_path):
+    index = ImageIndex(str(tmp_path / 'index.db'))
+    library = os.path.abspath(str(tmp_path / 'library'))
+    photo = os.path.join(library, 'a.jpg')
+    nested = os.path.join(library, 'sub', 'b.png')
+    index.update([
+        (photo, 100, 5, 4000, 3000, 6, 'Portrait', (1 << 64) - 2, False),
+        (nested, 200, 6, 800, 600, None, 'Landscape', None, True),
+        # Shares the prefix but isn't under the library folder
+        (library + '2' + os.sep + 'c.jpg', 300, 7, 10, 10, None, 'Landscape', None, False),
+    ])
+    known = index.snapshot(library)
+    assert known == {
+        photo: (100, 5, 4000, 3000, 6, 'Portrait', (1 << 64) - 2, False),
+        nested: (200, 6, 800, 600, None, 'Landscape', None, True),
+    }
+    index.remove([photo])
+    assert list(index.snapshot(library)) == [nested]
+    index.close()
+
+
+def test_older_indexes_gain_the_hash_columns(tmp_path):
+    path = str(tmp_path / 'index.db')
+    conn = sqlite3.connect(path)
+    conn.execute('CREATE TABLE images (path TEXT PRIMARY KEY, size INTEGER NOT NULL, '
+                 'mtime_ns INTEGER NOT NULL, width INTEGER NOT NULL, height INTEGER NOT NULL, '
+                 'exif_orientation INTEGER, orientation TEXT NOT NULL)')
+    photo = os.path.abspath(os.path.join(str(tmp_path), 'a.jpg'))
+    conn.execute('INSERT INTO images VALUES (?, 1, 2, 30, 20, NULL, ?)', (photo, 'Landscape'))
+    conn.commit()
+    conn.close()
+
+    index = ImageIndex(path)
+    assert index.snapshot(str(tmp_path)) == {photo: (1, 2, 30, 20, None, 'Landscape', None, False)}
+    index.close()
+
+
+def test_rescan_reads_only_changed_files(tmp_path, monkeypatch):
+    library = make_library(str(tmp_path / 'library'))
+    rotator, _ = make_rotator(tmp_path)
+    assert rotator.scan_images(library) == 8
+    close_rotator(rotator)
+
+    changed = os.path.join(library, 'wide0.jpg')
+    st = os.stat(changed)
+    os.utime(changed, ns=(st.st_atime_ns, st.st_mtime_ns + 10 ** 9))
+    read = []
+    real_probe = wallpaper_rotator.probe_image
+
+    def probe(path):
+        read.append(path)
+        return real_probe(path)
+
+    monkeypatch.setattr(wallpaper_rotator, 'probe_image', probe)
+    rotator, _ = make_rotator(tmp_path)
+    assert rotator.scan_images(library) == 8
+    assert read == [changed]
+    assert len(rotator.portrait_images) == 4
+    close_rotator(rotator)
+
+
+def test_rescan_forgets_deleted_files(tmp_path):
+    removed = 'tall1.png'
+    library = make_library(str(tmp_path / 'library'))
+    rotator, _ = make_rotator(tmp_path)
+    rotator.scan_images(library)
+    close_rotator(rotator)
+    os.remove(os.path.join(library, removed))
+
+    rotator, _ = make_rotator(tmp_path)
+    assert rotator.scan_images(library) == 7
+    known = rotator.image_index.snapshot(library)
+    assert os.path.join(library, removed) not in known and len(known) == 7
+    close_rotator(rotator)
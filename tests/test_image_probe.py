@@ -0,0 +1,45 @@
+import os
+
+import pytest
+from PIL import Image
+
+from image_probe import probe_image
+from tests.helpers import FORMATS, save_picture
+
+
+@pytest.mark.parametrize('ext', sorted(FORMATS))
+def test_probe_matches_pil(tmp_path, ext):
+    path = save_picture(str(tmp_path / f"image{ext}"), (123, 45))
+    assert probe_image(path)[:2] == (123, 45)
+    with Image.open(path) as img:
+        assert img.size == (123, 45)
+
+
+@pytest.mark.parametrize('ext', ['.jpg', '.png', '.tiff'])
+def test_probe_reads_exif_orientation(tmp_path, ext):
+    path = save_picture(str(tmp_path / f"image{ext}"), (64, 16), exif_orientation=6)
+    # Stored size, not the displayed one
+    assert probe_image(path) == (64, 16, 6)
+
+
+def test_progressive_jpeg(tmp_path):
+    path = str(tmp_path / 'progressive.jpg')
+    save_picture(path, (300, 200))
+    with Image.open(path) as img:
+        img.save(path, progressive=True)
+    assert probe_image(path)[:2] == (300, 200)
+
+
+def test_unsupported_and_broken_files(tmp_path):
+    text = tmp_path / 'notes.jpg'
+    text.write_text('not an image')
+    assert probe_image(str(text)) is None
+
+    path = save_picture(str(tmp_path / 'cut.jpg'), (300, 200))
+    with open(path, 'rb') as f:
+        head = f.read(20)
+    with open(path, 'wb') as f:
+        f.write(head)
+    assert probe_image(path) is None
+
+    assert probe_image(os.path.join(str(tmp_path), 'missing.png')) is None
@@ -0,0 +1,67 @@
+import pytest
+from PIL import Image
+
+import wallpaper_rotator
+from image_render import (DWPOS_CENTER, DWPOS_FILL, DWPOS_FIT, DWPOS_SPAN, DWPOS_STRETCH,
+                          DWPOS_TILE, oriented_size, render_for_monitor, target_size)
+from tests.helpers import LANDSCAPE, close_rotator, make_rotator, save_picture
+
+
+def test_oriented_size():
+    assert oriented_size(400, 100, None, None) == (400, 100)
+    assert oriented_size(400, 100, 6, None) == (100, 400)
+    assert oriented_size(400, 100, None, 'left') == (100, 400)
+    assert oriented_size(400, 100, 8, 'right') == (400, 100)
+    assert oriented_size(400, 100, 3, 'none') == (400, 100)
+
+
+def test_target_size():
+    monitor = (1920, 1080)
+    assert target_size((4000, 3000), monitor, DWPOS_FILL) == (1920, 1440)
+    assert target_size((4000, 3000), monitor, DWPOS_FIT) == (1440, 1080)
+    assert target_size((4000, 3000), monitor, DWPOS_STRETCH) == monitor
+    for position in (DWPOS_CENTER, DWPOS_TILE, DWPOS_SPAN):
+        assert target_size((4000, 3000), monitor, position) is None
+    # Never scaled up
+    assert target_size((800, 600), monitor, DWPOS_FILL) is None
+    assert target_size((800, 600), monitor, DWPOS_STRETCH) is None
+
+
+@pytest.mark.parametrize('ext', ['.jpg', '.png', '.gif'])
+def test_render_downscales_and_rotates(tmp_path, ext):
+    path = save_picture(str(tmp_path / f"tall{ext}"), (1200, 3000))
+    info = (1200, 3000, None)
+    output_size = target_size(oriented_size(*info, 'left'), LANDSCAPE, DWPOS_FILL)
+    img = render_for_monitor(path, info, 'left', output_size)
+    assert img.size == output_size == (2700, 1080)
+    # The red top left corner ends up bottom left after turning left
+    red, green, _ = img.convert('RGB').getpixel((20, img.height - 20))
+    assert red > 200 and green < 80
+    img.close()
+
+
+@pytest.mark.parametrize('ext', ['.jpg', '.tiff'])
+def test_probe_and_render_agree_on_exif_orientation(tmp_path, monkeypatch, ext):
+    # Stored 400x100, displayed as a 100x400 portrait
+    path = save_picture(str(tmp_path / f"turned{ext}"), (400, 100), exif_orientation=6)
+    rotator, _ = make_rotator(tmp_path, sizes=(LANDSCAPE,))
+    monitor_id = rotator.monitors[0]['id']
+    rotator.downscale_to_monitor = False
+    rotator.lossless_jpeg_rotation = False
+
+    info = rotator.read_image_info(path)
+    assert info == (400, 100, 6)
+    assert rotator.get_image_orientation(path) == 'Portrait'
+    # The PIL fallback reports the same stored size as the header probe
+    monkeypatch.setattr(wallpaper_rotator, 'probe_image', lambda image_path: None)
+    assert rotator.read_image_info(path) == info
+
+    rotated = rotator.prepare_image_for_monitor(monitor_id, path)
+    assert rotated != path
+    with Image.open(rotated) as img:
+        assert img.size == oriented_size(*info, 'left') == (400, 100)
+        # EXIF 6 turns the stored pixels right and 'left' turns them back,
+        # so the red corner is where it was stored
+        red, green, _ = img.convert('RGB').getpixel((5, 5))
+        assert red > 200 and green < 80
+    close_rotator(rotator)
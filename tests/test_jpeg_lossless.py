@@ -0,0 +1,87 @@
+import os
+
+import pytest
+from PIL import Image, ImageOps
+
+from image_render import EXIF_TRANSPOSES, ROTATION_TRANSPOSES
+from jpeg_lossless import (EXIF_OPERATIONS, combined_operation, find_jpegtran, read_mcu_size,
+                           rotate_with_exif_tag, rotate_with_jpegtran)
+from tests.helpers import LANDSCAPE, close_rotator, make_rotator, picture, save_picture
+
+
+def transposed(img, operation):
+    if operation == 'identity':
+        return img
+    return img.transpose(getattr(Image.Transpose, operation.upper()))
+
+
+@pytest.mark.parametrize('exif_orientation', sorted(EXIF_OPERATIONS) + [None])
+@pytest.mark.parametrize('direction', ['left', 'right', 'none'])
+def test_combined_operation_matches_pil(exif_orientation, direction):
+    img = picture((6, 4))
+    expected = img
+    if exif_orientation in EXIF_TRANSPOSES:
+        expected = expected.transpose(EXIF_TRANSPOSES[exif_orientation])
+    if direction in ROTATION_TRANSPOSES:
+        expected = expected.transpose(ROTATION_TRANSPOSES[direction])
+    result = transposed(img, combined_operation(exif_orientation, direction))
+    assert result.tobytes() == expected.tobytes()
+
+
+def test_read_mcu_size(tmp_path):
+    path = str(tmp_path / 'a.jpg')
+    picture((64, 48)).save(path, subsampling=2)  # 4:2:0
+    assert read_mcu_size(path) == (16, 16)
+    picture((64, 48)).save(path, subsampling=0)  # 4:4:4
+    assert read_mcu_size(path) == (8, 8)
+    picture((64, 48)).save(str(tmp_path / 'a.png'))
+    assert read_mcu_size(str(tmp_path / 'a.png')) is None
+
+
+@pytest.mark.parametrize('exif_orientation', [None, 6])
+def test_rotate_with_exif_tag(tmp_path, exif_orientation):
+    source = save_picture(str(tmp_path / 'source.jpg'), (64, 32), exif_orientation)
+    output = str(tmp_path / 'output.jpg')
+    assert rotate_with_exif_tag(source, output, exif_orientation, 'left')
+    with open(source, 'rb') as f:
+        source_size = len(f.read())
+    # Only the tag changes (or a small EXIF segment is added); pixels stay untouched
+    assert source_size <= os.path.getsize(output) <= source_size + 64
+    with Image.open(source) as img, Image.open(output) as rotated:
+        expected = ImageOps.exif_transpose(img).transpose(ROTATION_TRANSPOSES['left'])
+        assert ImageOps.exif_transpose(rotated).tobytes() == expected.tobytes()
+
+
+def test_jpegtran_skips_images_that_arent_mcu_aligned(tmp_path):
+    path = str(tmp_path / 'odd.jpg')
+    picture((65, 48)).save(path, subsampling=2)
+    # Refused before jpegtran would even be started
+    assert not rotate_with_jpegtran('no-such-jpegtran', path, str(tmp_path / 'out.jpg'),
+                                    'rotate_90', (65, 48))
+    assert not os.path.exists(str(tmp_path / 'out.jpg'))
+
+
+@pytest.mark.skipif(find_jpegtran() is None, reason='jpegtran is not installed')
+def test_rotate_with_jpegtran(tmp_path):
+    path = str(tmp_path / 'even.jpg')
+    picture((64, 48)).save(path, subsampling=2)
+    output = str(tmp_path / 'out.jpg')
+    assert rotate_with_jpegtran(find_jpegtran(), path, output, 'rotate_90', (64, 48))
+    with Image.open(path) as img, Image.open(output) as rotated:
+        assert rotated.size == (48, 64)
+        # Coefficients are moved, not re-encoded, so the pixels match exactly
+        assert rotated.tobytes() == img.transpose(Image.Transpose.ROTATE_90).tobytes()
+
+
+def test_rotator_uses_the_exif_tag_path(tmp_path):
+    source = save_picture(str(tmp_path / 'tall.jpg'), (90, 160))
+    rotator, _ = make_rotator(tmp_path, sizes=(LANDSCAPE,))
+    monitor_id = rotator.monitors[0]['id']
+    rotator.monitor_allow_all_orientations[monitor_id] = True
+    rotator.jpeg_rotation_via_exif = True
+    rotated = rotator.prepare_image_for_monitor(monitor_id, source)
+    assert rotated != source
+    with Image.open(rotated) as img:
+        assert img.getexif().get(274) == 8  # Turn left when shown
+    assert 'render' not in rotator.metrics.snapshot()
+    close_rotator(rotator)
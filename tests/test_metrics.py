@@ -0,0 +1,77 @@
+import json
+import urllib.error
+import urllib.request
+
+import pytest
+
+from metrics import Metrics, MetricsServer, RollingHistogram
+from tests.helpers import close_rotator, make_library, make_rotator
+
+
+def test_percentiles_over_the_window():
+    histogram = RollingHistogram(window=100)
+    for ms in range(1, 201):
+        histogram.add(ms / 1000)
+    summary = histogram.summary()
+    # Only the last 100 samples (101..200 ms) are kept; counts are all-time
+    assert summary['count'] == 200
+    assert summary['p50'] == pytest.approx(150)
+    assert summary['p95'] == pytest.approx(195)
+    assert summary['p99'] == pytest.approx(199)
+    assert summary['max'] == pytest.approx(200)
+    assert summary['last'] == pytest.approx(200)
+    assert summary['mean'] == pytest.approx(150.5)
+
+
+def test_spans_are_recorded_when_the_block_raises():
+    metrics = Metrics()
+    with pytest.raises(ValueError):
+        with metrics.span('render'):
+            raise ValueError('broken image')
+    with metrics.span('render'):
+        pass
+    assert metrics.snapshot()['render']['count'] == 2
+    assert metrics.format_lines()[0].startswith('render')
+
+
+def test_write_json(tmp_path):
+    metrics = Metrics()
+    metrics.record('scan', 0.25)
+    path = str(tmp_path / 'metrics.json')
+    metrics.write_json(path)
+    with open(path) as f:
+        data = json.load(f)
+    assert data['spans']['scan']['count'] == 1
+    assert data['spans']['scan']['p50'] == pytest.approx(250)
+    assert not (tmp_path / 'metrics.json.tmp').exists()
+
+
+def test_server_serves_snapshots():
+    metrics = Metrics()
+    metrics.record('apply', 0.01)
+    server = MetricsServer(metrics, 0)
+    server.start()
+    try:
+        port = server.server.server_address[1]
+        with urllib.request.urlopen(f"http://127.0.0.1:{port}/metrics", timeout=10) as response:
+            data = json.loads(response.read())
+        assert data['spans']['apply']['count'] == 1
+        with pytest.raises(urllib.error.HTTPError):
+            urllib.request.urlopen(f"http://127.0.0.1:{port}/other", timeout=10)
+    finally:
+        server.stop()
+
+
+def test_rotation_records_its_phases(tmp_path):
+    library = make_library(str(tmp_path / 'library'))
+    rotator, _ = make_rotator(tmp_path)
+    rotator.metrics_file = str(tmp_path / 'metrics.json')
+    rotator.scan_images(library)
+    rotator.rotate_wallpaper()
+    rotator.wait_for_notifications(10)
+    spans = rotator.metrics.snapshot()
+    for name in ('scan', 'select', 'rotate', 'notify'):
+        assert spans[name]['count'] >= 1, name
+    with open(rotator.metrics_file) as f:
+        assert 'rotate' in json.load(f)['spans']
+    close_rotator(rotator)
@@ -0,0 +1,56 @@
+from catalog import ImageCatalog
+from tests.helpers import close_rotator, make_library, make_rotator
+
+
+def test_rotation_shows_the_prefetched_set(tmp_path):
+    library = make_library(str(tmp_path / 'library'))
+    rotator, backend = make_rotator(tmp_path)
+    rotator.scan_images(library)
+    rotator.start_prefetch()
+    rotator.prefetch_thread.join()
+    _, prepared = rotator.prefetched
+
+    assert rotator.rotate_wallpaper()
+    assert rotator.prefetched is None
+    assert backend.wallpapers == {monitor_id: prepared_path
+                                  for monitor_id, (_, prepared_path) in prepared.items()}
+    close_rotator(rotator)
+
+
+def test_manual_change_leaves_the_prefetched_set(tmp_path):
+    library = make_library(str(tmp_path / 'library'))
+    rotator, backend = make_rotator(tmp_path)
+    rotator.scan_images(library)
+    rotator.start_prefetch()
+    rotator.prefetch_thread.join()
+    item = rotator.prefetched
+    prefetched_paths = {prepared_path for _, prepared_path in item[1].values()}
+
+    assert rotator.rotate_wallpaper(use_prefetched=False)
+    assert rotator.prefetched is item
+    assert not prefetched_paths & set(backend.wallpapers.values())
+    # Its renders stay protected from cleanup until they are shown
+    rendered = {path for path in prefetched_paths if path.startswith(rotator.cache_dir())}
+    assert rendered <= rotator.keep_rendered()
+
+    assert rotator.rotate_wallpaper()
+    assert set(backend.wallpapers.values()) == prefetched_paths
+    close_rotator(rotator)
+
+
+def test_keep_rendered_returns_a_copy(tmp_path):
+    rotator, _ = make_rotator(tmp_path)
+    keep = rotator.keep_rendered(['a.jpg'])
+    rotator.keep_rendered(['b.jpg'])
+    assert keep == {'a.jpg'}
+    assert rotator.current_rotated_images == {'a.jpg', 'b.jpg'}
+    close_rotator(rotator)
+
+
+def test_aspect_pools_are_shared_between_threads():
+    catalog = ImageCatalog()
+    wide = catalog.add('/library/wide.jpg', 1920, 1080, 'Landscape')
+    pool = catalog.aspects.pool(16 / 9, 0.1)
+    assert catalog.aspects.pool(16 / 9, 0.1) is pool
+    assert catalog.aspects.pools_containing(wide) == [pool]
+    assert list(pool) == [wide]
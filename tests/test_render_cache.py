@@ -0,0 +1,153 @@
+import os
+import time
+from types import SimpleNamespace
+
+import pytest
+
+from render_cache import (LEGACY_TEMP_DIR, PARTIAL_NAME, STALE_PARTIAL_SECONDS, CacheJanitor,
+                          RenderCache, atomic_output, is_cache_file)
+
+
+STAT = SimpleNamespace(st_size=1234, st_mtime_ns=5678)
+
+
+def write(path, size=100):
+    with open(path, 'wb') as f:
+        f.write(b'x' * size)
+    return path
+
+
+def render(cache_dir, name, size=100):
+    """Create a file named like a render of name"""
+    return write(RenderCache.cache_path(cache_dir, name, STAT, 'left', 1920, 1080), size)
+
+
+def test_reconcile_adopts_renders_only(tmp_path):
+    cache_dir = str(tmp_path)
+    orphan = render(cache_dir, 'orphan.jpg')
+    other = write(os.path.join(cache_dir, 'thesis.docx'))
+    stale = write(os.path.join(cache_dir, 'left_1x1_' + 'a' * 40 + '.partial1_2.jpg'))
+    old = time.time() - STALE_PARTIAL_SECONDS - 60
+    os.utime(stale, (old, old))
+    fresh = write(os.path.join(cache_dir, 'left_1x1_' + 'b' * 40 + '.partial1_3.jpg'))
+    stale_other = write(os.path.join(cache_dir, 'draft.partial.jpg'))
+    os.utime(stale_other, (old, old))
+
+    cache = RenderCache(10 ** 6, directory=cache_dir)
+    cache.entries[os.path.join(cache_dir, 'left_1x1_' + 'c' * 40 + '.jpg')] = (5, 0)
+    cache.total_bytes = 5
+    assert cache.reconcile([cache_dir]) == (1, 1)
+    assert list(cache.entries) == [orphan]
+    assert cache.total_bytes == 100
+    assert not os.path.exists(stale)
+    assert os.path.exists(fresh) and os.path.exists(other) and os.path.exists(stale_other)
+
+
+def test_evict_keeps_other_files(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    os.makedirs(cache_dir)
+    oldest = render(cache_dir, 'oldest.jpg')
+    shown = render(cache_dir, 'shown.jpg')
+    newest = render(cache_dir, 'newest.jpg')
+    other = write(os.path.join(cache_dir, 'thesis.docx'))
+
+    manifest = str(tmp_path / 'manifest.json')
+    cache = RenderCache(10 ** 6, directory=cache_dir)
+    for last_used, path in enumerate([other, oldest, shown, newest]):
+        cache._put(path, 100, last_used)
+    cache.save_manifest(manifest)
+
+    # The manifest can't smuggle a non-render in to be deleted
+    cache = RenderCache(150, directory=cache_dir)
+    cache.load_manifest(manifest)
+    assert list(cache.entries) == [oldest, shown, newest]
+    assert cache.evict(keep={shown}) == 2
+    assert list(cache.entries) == [shown]
+    assert os.path.exists(shown) and os.path.exists(other)
+    assert not os.path.exists(oldest) and not os.path.exists(newest)
+
+
+def test_evict_expired(tmp_path):
+    cache_dir = str(tmp_path)
+    expired = render(cache_dir, 'expired.jpg')
+    recent = render(cache_dir, 'recent.jpg')
+    cache = RenderCache(10 ** 6, max_age=3600, directory=cache_dir)
+    cache._put(expired, 100, time.time() - 7200)
+    cache._put(recent, 100, time.time())
+    assert cache.evict() == 1
+    assert list(cache.entries) == [recent]
+
+
+def test_janitor_reconciles_and_saves_manifest(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    os.makedirs(cache_dir)
+    orphan = render(cache_dir, 'orphan.jpg')
+    manifest = str(tmp_path / 'manifest.json')
+
+    janitor = CacheJanitor(RenderCache(10 ** 6, directory=cache_dir), manifest)
+    janitor.reconcile([cache_dir])
+    janitor.wait(10)
+    cache = RenderCache(10 ** 6, directory=cache_dir)
+    cache.load_manifest(manifest)
+    assert list(cache.entries) == [orphan]
+    assert cache.lookup(orphan)
+    os.remove(orphan)
+    assert not cache.lookup(orphan)
+    assert not cache.entries
+
+
+def test_cache_path_names():
+    path = RenderCache.cache_path('cache', os.path.join('a', 'photo.JPG'), STAT, 'left', 1920, 1080)
+    assert os.path.dirname(path) == 'cache'
+    assert os.path.basename(path).startswith('left_1920x1080_')
+    assert path.endswith('.jpg')
+    assert is_cache_file(path)
+    # Same name in another folder, or another size, can't collide
+    assert path != RenderCache.cache_path('cache', os.path.join('b', 'photo.JPG'), STAT,
+                                          'left', 1920, 1080)
+    assert path != RenderCache.cache_path('cache', os.path.join('a', 'photo.JPG'), STAT,
+                                          'left', 1280, 720)
+
+
+def test_only_render_names_are_cache_files():
+    assert not is_cache_file(os.path.join('cache', 'thesis.docx'))
+    assert not is_cache_file(os.path.join('cache', 'rotated_left_photo.jpg'))
+    assert is_cache_file(os.path.join('photos', LEGACY_TEMP_DIR, 'rotated_left_photo.jpg'))
+    assert not is_cache_file(os.path.join('photos', LEGACY_TEMP_DIR, 'notes.txt'))
+
+
+def test_atomic_output(tmp_path):
+    path = str(tmp_path / ('left_10x10_' + '0' * 40 + '.jpg'))
+    with atomic_output(path) as partial_path:
+        assert PARTIAL_NAME.fullmatch(os.path.basename(partial_path))
+        assert partial_path.endswith('.jpg')
+        write(partial_path)
+    assert os.listdir(str(tmp_path)) == [os.path.basename(path)]
+
+    os.remove(path)
+    with pytest.raises(RuntimeError):
+        with atomic_output(path) as partial_path:
+            write(partial_path)
+            raise RuntimeError('encoder failed')
+    assert os.listdir(str(tmp_path)) == []
+
+
+def test_legacy_temp_dirs_are_emptied(tmp_path):
+    cache_dir = str(tmp_path / 'cache')
+    os.makedirs(cache_dir)
+    legacy = tmp_path / 'photos' / LEGACY_TEMP_DIR
+    other_legacy = tmp_path / 'more' / LEGACY_TEMP_DIR
+    os.makedirs(str(legacy))
+    os.makedirs(str(other_legacy))
+    old_render = write(str(legacy / 'rotated_left_a.jpg'))
+    write(str(other_legacy / 'rotated_left_b.jpg'))
+    notes = write(str(other_legacy / 'notes.txt'))
+
+    cache = RenderCache(10 ** 6, directory=cache_dir)
+    janitor = CacheJanitor(cache)
+    janitor.adopt([str(legacy), str(other_legacy)])
+    janitor.wait(10)
+    assert janitor.deleted == 2
+    assert not os.path.exists(old_render) and not os.path.exists(str(legacy))
+    # A folder holding anything else stays
+    assert os.listdir(str(other_legacy)) == [os.path.basename(notes)]
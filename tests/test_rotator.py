@@ -0,0 +1,103 @@
+import os
+
+from PIL import Image
+
+from tests.helpers import LANDSCAPE, close_rotator, make_library, make_rotator, save_picture
+from wallpaper_backend import RecordingBackend, side_by_side
+
+
+def test_recording_backend_lays_monitors_side_by_side():
+    backend = RecordingBackend(side_by_side([(1920, 1080), (1080, 1920)]), latency_scale=0)
+    first, second = backend.monitor_ids()
+    assert backend.monitor_rect(first) == (0, 0, 1920, 1080)
+    assert backend.monitor_rect(second) == (1920, 0, 3000, 1920)
+    backend.set_wallpaper(second, 'b.jpg')
+    assert backend.wallpapers == {second: 'b.jpg'}
+    assert backend.call_counts() == {'monitor_ids': 1, 'monitor_rect': 2, 'set_wallpaper': 1}
+
+
+def test_rotation_matches_monitor_orientation(tmp_path):
+    library = make_library(str(tmp_path / 'library'))
+    rotator, backend = make_rotator(tmp_path)
+    assert rotator.scan_images(library) == 8
+    assert len(rotator.landscape_images) == 4 and len(rotator.portrait_images) == 4
+
+    assert rotator.rotate_wallpaper()
+    rotator.wait_for_notifications(10)
+    landscape_id, portrait_id = (monitor['id'] for monitor in rotator.monitors)
+    assert os.path.basename(backend.wallpapers[landscape_id]).startswith('wide')
+    assert os.path.basename(backend.wallpapers[portrait_id]).startswith('tall')
+    counts = backend.call_counts()
+    assert counts['set_wallpaper'] == 2
+    assert counts['set_position'] == 1
+    assert counts['notify_changed'] == 1
+    close_rotator(rotator)
+
+
+def test_unchanged_wallpapers_skip_the_backend(tmp_path):
+    library = make_library(str(tmp_path / 'library'))
+    rotator, backend = make_rotator(tmp_path)
+    rotator.scan_images(library)
+    prepared = rotator.prepare_wallpapers(rotator.select_images())
+    rotator.apply_wallpapers(prepared)
+    rotator.wait_for_notifications(10)
+    before = backend.call_counts()
+    assert rotator.apply_wallpapers(prepared)
+    rotator.wait_for_notifications(10)
+    assert backend.call_counts() == before
+    close_rotator(rotator)
+
+
+def test_cleanup_keeps_shown_renders_and_other_files(tmp_path):
+    library = make_library(str(tmp_path / 'library'))
+    rotator, backend = make_rotator(tmp_path, sizes=(LANDSCAPE,))
+    monitor_id = rotator.monitors[0]['id']
+    rotator.monitor_allow_all_orientations[monitor_id] = True
+    rotator.render_cache_max_mb = 0  # Every render is over budget once off screen
+    os.makedirs(rotator.cache_dir())
+    other = os.path.join(rotator.cache_dir(), 'thesis.docx')
+    with open(other, 'w') as f:
+        f.write('not a render')
+    rotator.scan_images(library)
+    for i in range(4):
+        tall = os.path.join(library, f"tall{i}.png")
+        rotated = rotator.prepare_image_for_monitor(monitor_id, tall)
+        rotator.apply_wallpapers({monitor_id: (tall, rotated)})
+        rotator.cleanup_temp_images()
+        rotator.wait_for_cleanup(10)
+
+    remaining = set(os.listdir(rotator.cache_dir()))
+    shown = os.path.basename(backend.wallpapers[monitor_id])
+    assert remaining == {'thesis.docx', shown}
+    close_rotator(rotator)
+
+
+def test_mismatched_images_are_rendered_once(tmp_path):
+    library = make_library(str(tmp_path / 'library'))
+    rotator, _ = make_rotator(tmp_path, sizes=(LANDSCAPE,))
+    monitor_id = rotator.monitors[0]['id']
+    rotator.monitor_allow_all_orientations[monitor_id] = True
+    rotator.scan_images(library)
+    tall = os.path.join(library, 'tall0.png')
+    rotated = rotator.prepare_image_for_monitor(monitor_id, tall)
+    assert os.path.dirname(rotated) == rotator.cache_dir()
+    with Image.open(rotated) as img:
+        assert img.width > img.height
+    assert rotator.metrics.snapshot()['render']['count'] == 1
+    # The second time comes from the cache
+    assert rotator.prepare_image_for_monitor(monitor_id, tall) == rotated
+    assert rotator.metrics.snapshot()['render']['count'] == 1
+    close_rotator(rotator)
+
+
+def test_scan_retires_old_render_folders(tmp_path):
+    library = make_library(str(tmp_path / 'library'))
+    legacy = os.path.join(library, 'sub', '.wallpaper_temp')
+    os.makedirs(legacy)
+    save_picture(os.path.join(legacy, 'rotated_left_wide0.jpg'), (90, 160))
+    rotator, _ = make_rotator(tmp_path)
+    assert rotator.scan_images(library) == 8
+    rotator.wait_for_cleanup(10)
+    assert not os.path.exists(legacy)
+    assert os.path.isdir(os.path.join(library, 'sub'))
+    close_rotator(rotator)
@@ -0,0 +1,48 @@
+import os
+import threading
+import time
+
+import wallpaper_rotator
+from tests.helpers import close_rotator, make_library, make_rotator
+
+
+def test_parallel_classification_keeps_input_order(tmp_path, monkeypatch):
+    library = make_library(str(tmp_path / 'library'), count=20)
+    rotator, _ = make_rotator(tmp_path)
+    rotator.scan_workers = 8
+    threads = set()
+    real_probe = wallpaper_rotator.probe_image
+
+    def slow_probe(path):
+        threads.add(threading.get_ident())
+        # Uneven delays let later files finish before earlier ones
+        time.sleep(0.002 * (3 - len(path) % 4))
+        return real_probe(path)
+
+    monkeypatch.setattr(wallpaper_rotator, 'probe_image', slow_probe)
+    entries = sorted(os.scandir(library), key=lambda entry: entry.name)
+    results = list(rotator.classify_images(entries, {}))
+    assert [dir_entry.name for dir_entry, _ in results] == [entry.name for entry in entries]
+    assert len(threads) > 1
+
+    rotator.scan_workers = 1
+    serial = list(rotator.classify_images(entries, {}))
+    assert [result[0] for _, result in results] == [result[0] for _, result in serial]
+    for dir_entry, ((width, height, orientation, _, _), index_entry) in results:
+        expected = 'Landscape' if dir_entry.name.startswith('wide') else 'Portrait'
+        assert orientation == expected
+        assert index_entry[0] == dir_entry.path
+    close_rotator(rotator)
+
+
+def test_unreadable_files_dont_stop_the_scan(tmp_path):
+    library = make_library(str(tmp_path / 'library'))
+    with open(os.path.join(library, 'broken.jpg'), 'wb') as f:
+        f.write(b'\xff\xd8 not really a jpeg')
+    rotator, _ = make_rotator(tmp_path)
+    rotator.scan_workers = 4
+    assert rotator.scan_images(library) == 9
+    broken = rotator.catalog.find(os.path.join(library, 'broken.jpg'))
+    assert rotator.catalog.get_orientation(broken) is None
+    assert len(rotator.landscape_images) == 4 and len(rotator.portrait_images) == 4
+    close_rotator(rotator)
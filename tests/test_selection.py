@@ -0,0 +1,171 @@
+import os
+import random
+import time
+from array import array
+from types import SimpleNamespace
+
+from catalog import ImageCatalog, added_time
+from selection import FenwickTree, SelectionEngine
+from selection_policy import SelectionPolicy, parse_time_of_day
+
+
+def build_catalog(folders, per_folder):
+    catalog = ImageCatalog()
+    for folder in folders:
+        for i in range(per_folder):
+            catalog.add(os.path.join(os.path.abspath(folder), f"{i}.jpg"),
+                        1920, 1080, 'Landscape', added=0)
+    return catalog
+
+
+def test_shuffle_shows_every_image_before_repeating():
+    catalog = build_catalog(['photos'], 10)
+    engine = SelectionEngine(random.Random(0))
+    requests = [('a', 'all', catalog.all), ('b', 'all', catalog.all)]
+    seen = []
+    for _ in range(5):
+        picked = engine.select(requests)
+        assert picked['a'] != picked['b']
+        seen.extend(picked.values())
+    assert sorted(seen) == list(catalog.all)
+
+
+def test_removed_images_are_never_drawn():
+    catalog = build_catalog(['photos'], 6)
+    engine = SelectionEngine(random.Random(0))
+    requests = [('a', 'all', catalog.all)]
+    engine.select(requests)  # Builds the bag
+    gone = set(range(0, 6, 2))
+    for image_id in gone:
+        catalog.remove(image_id)
+    for _ in range(12):
+        assert engine.select(requests)['a'] not in gone
+
+
+def test_fewer_images_than_monitors():
+    catalog = build_catalog(['photos'], 1)
+    engine = SelectionEngine(random.Random(0))
+    picked = engine.select([(m, 'all', catalog.all) for m in 'abc'])
+    assert picked == {'a': 0, 'b': 0, 'c': 0}
+
+
+def test_added_image_joins_the_current_round():
+    catalog = build_catalog(['photos'], 4)
+    engine = SelectionEngine(random.Random(0))
+    requests = [('a', 'all', catalog.all)]
+    engine.select(requests)
+    added = catalog.add(os.path.abspath(os.path.join('photos', 'new.jpg')), 1920, 1080, 'Landscape')
+    engine.item_added('all', added)
+    # Three images left in the round plus the new one
+    assert added in [engine.select(requests)['a'] for _ in range(4)]
+
+
+def prefix_find(weights, target):
+    """Reference for FenwickTree.find: linear scan of cumulative weights"""
+    total = 0.0
+    for item, weight in enumerate(weights):
+        total += weight
+        if target < total:
+            return item
+    return len(weights) - 1
+
+
+def test_fenwick_tree_matches_linear_scan():
+    rng = random.Random(1)
+    weights = array('d', [rng.choice([0.0, 0.5, 1.0, 3.0]) for _ in range(257)])
+    tree = FenwickTree(array('d', weights))
+    assert abs(tree.total() - sum(weights)) < 1e-9
+    for _ in range(500):
+        target = rng.random() * tree.total()
+        assert tree.find(target) == prefix_find(weights, target)
+
+    for _ in range(100):
+        item = rng.randrange(len(weights))
+        weights[item] = rng.random()
+        tree.set(item, weights[item])
+    for _ in range(20):
+        weights.append(rng.random())
+        tree.append(weights[-1])
+    assert abs(tree.total() - sum(weights)) < 1e-9
+    rebuilt = FenwickTree(array('d', weights))
+    for a, b in zip(tree.tree, rebuilt.tree):
+        assert abs(a - b) < 1e-9
+    for _ in range(500):
+        target = rng.random() * tree.total()
+        assert tree.find(target) == prefix_find(weights, target)
+
+
+def test_folder_weight_zero_is_never_drawn():
+    catalog = build_catalog(['keep', 'skip'], 5)
+    policy = SelectionPolicy(folder_weights={'skip': 0}, shown_half_life_hours=0)
+    engine = SelectionEngine(random.Random(0), policy)
+    skipped = {catalog.find(os.path.join(os.path.abspath('skip'), f"{i}.jpg")) for i in range(5)}
+    for _ in range(50):
+        assert engine.select([('a', 'all', catalog.all)])['a'] not in skipped
+
+
+def test_schedule_replaces_folder_weights():
+    catalog = build_catalog(['day', 'night'], 5)
+    night = {catalog.find(os.path.join(os.path.abspath('night'), f"{i}.jpg")) for i in range(5)}
+    hour = [23]
+    policy = SelectionPolicy(
+        folder_weights={'night': 0},
+        schedule=[{'start': '22:00', 'end': '07:00', 'weights': {'day': 0}}],
+        shown_half_life_hours=0,
+        localtime=lambda now: time.struct_time((2024, 1, 1, hour[0], 0, 0, 0, 1, 0)))
+    engine = SelectionEngine(random.Random(0), policy)
+    requests = [('a', 'all', catalog.all)]
+    # 23:00 is inside the wrapping rule: only night images
+    for _ in range(20):
+        assert engine.select(requests)['a'] in night
+    hour[0] = 12
+    for _ in range(20):
+        assert engine.select(requests)['a'] not in night
+
+
+def test_recently_shown_images_are_rejected():
+    catalog = build_catalog(['photos'], 2)
+    now = [1000000.0]
+    policy = SelectionPolicy(recent_boost=1.0, folder_weights={'photos': 1},
+                             shown_half_life_hours=24)
+    engine = SelectionEngine(random.Random(0), policy, clock=lambda: now[0])
+    requests = [('a', 'all', catalog.all)]
+    picks = []
+    for _ in range(20):
+        picks.append(engine.select(requests)['a'])
+        now[0] += 60
+    # Only minutes apart, so the other image is almost always the one accepted
+    alternations = sum(a != b for a, b in zip(picks, picks[1:]))
+    assert alternations >= 17
+
+
+def test_shown_chance_recovers_with_half_life():
+    policy = SelectionPolicy(shown_half_life_hours=1)
+    assert policy.shown_chance(0) == 0.0
+    assert abs(policy.shown_chance(3600) - 0.5) < 1e-9
+    assert SelectionPolicy(shown_half_life_hours=0).shown_chance(0) == 1.0
+
+
+def test_policy_weights():
+    catalog = ImageCatalog()
+    root = os.path.abspath('library')
+    old = catalog.add(os.path.join(root, 'a', 'old.jpg'), added=0)
+    new = catalog.add(os.path.join(root, 'a', 'b', 'new.jpg'), added=10 * 24 * 3600)
+    policy = SelectionPolicy(folder_weights={'a': 2, os.path.join('a', 'b'): 5}, root=root,
+                             recent_boost=3, recent_days=7)
+    weigh = policy.weigher(catalog.all, now=11 * 24 * 3600)
+    assert weigh(old) == 2
+    assert weigh(new) == 15  # Deepest folder, boosted as recent
+    assert not SelectionPolicy().weighted
+
+
+def test_parse_time_of_day():
+    assert parse_time_of_day('00:00') == 0
+    assert parse_time_of_day('22:30') == 22 * 60 + 30
+
+
+def test_added_time_prefers_the_later_stamp():
+    copied = SimpleNamespace(st_mtime=100.0, st_ctime=500.0)
+    assert added_time(copied) == 500.0
+    touched = SimpleNamespace(st_mtime=900.0, st_ctime=500.0, st_birthtime=200.0)
+    assert added_time(touched) == 900.0
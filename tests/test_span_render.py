@@ -0,0 +1,66 @@
+import os
+
+from PIL import Image
+
+from image_render import DWPOS_SPAN
+from span_render import render_span, span_layout
+from tests.helpers import LANDSCAPE, PORTRAIT, close_rotator, make_rotator
+
+
+def halves(path, size):
+    """Save a picture that is red on the left half and blue on the right"""
+    img = Image.new('RGB', size, (0, 0, 255))
+    img.paste((255, 0, 0), (0, 0, size[0] // 2, size[1]))
+    img.save(path)
+    return path
+
+
+def test_span_layout_leaves_bezel_gaps():
+    rects = {'a': (0, 0, 1920, 1080), 'b': (1920, 0, 1080, 1920), 'c': (3000, 0, 1920, 1080)}
+    assert span_layout(rects) == ((4920, 1920), {
+        'a': (0, 0, 1920, 1080), 'b': (1920, 0, 1080, 1920), 'c': (3000, 0, 1920, 1080)})
+    canvas, layout = span_layout(rects, bezel=50)
+    assert canvas == (5020, 1920)
+    assert layout['b'][0] == 1970 and layout['c'][0] == 3100
+    # Negative desktop coordinates are moved onto the canvas
+    assert span_layout({'left': (-1920, 0, 1920, 1080), 'main': (0, 0, 1920, 1080)}) == (
+        (3840, 1080), {'left': (0, 0, 1920, 1080), 'main': (1920, 0, 1920, 1080)})
+    assert span_layout({}) == ((0, 0), {})
+
+
+def test_tiles_cut_the_panorama_across_monitors(tmp_path):
+    path = halves(str(tmp_path / 'pano.png'), (800, 225))
+    canvas, layout = span_layout({'a': (0, 0, 320, 180), 'b': (320, 0, 320, 180)})
+    tiles = dict(render_span(path, (800, 225, None), canvas, layout))
+    assert {monitor_id: tile.size for monitor_id, tile in tiles.items()} == {
+        'a': (320, 180), 'b': (320, 180)}
+    assert tiles['a'].getpixel((160, 90))[:3] == (255, 0, 0)
+    assert tiles['b'].getpixel((160, 90))[:3] == (0, 0, 255)
+
+
+def test_non_integral_scale_stays_inside_the_source(tmp_path):
+    # Scaling 4648x1549 to cover 4920x1920 doesn't land on whole pixels
+    path = halves(str(tmp_path / 'pano.jpg'), (4648, 1549))
+    canvas, layout = span_layout(
+        {'a': (0, 0, 1920, 1080), 'b': (1920, 0, 1080, 1920), 'c': (3000, 0, 1920, 1080)})
+    tiles = dict(render_span(path, (4648, 1549, None), canvas, layout))
+    assert {monitor_id: tile.size for monitor_id, tile in tiles.items()} == {
+        'a': (1920, 1080), 'b': (1080, 1920), 'c': (1920, 1080)}
+
+
+def test_rotator_renders_span_tiles(tmp_path):
+    rotator, _ = make_rotator(tmp_path, sizes=(LANDSCAPE, PORTRAIT, LANDSCAPE))
+    rotator.wallpaper_position = DWPOS_SPAN
+    assert rotator.span_active()
+    path = halves(str(tmp_path / 'pano.jpg'), (4648, 1549))
+
+    prepared = rotator.prepare_span(path)
+    assert set(prepared) == set(rotator.active_monitors)
+    for monitor in rotator.monitors:
+        image_path, tile_path = prepared[monitor['id']]
+        assert image_path == path
+        # Rendered tiles, not the panorama itself as the fallback
+        assert os.path.dirname(tile_path) == rotator.cache_dir()
+        with Image.open(tile_path) as tile:
+            assert tile.size == (monitor['width'], monitor['height'])
+    close_rotator(rotator)
@@ -0,0 +1,61 @@
+import os
+import threading
+
+from status_log import StatusLog
+
+
+def messages(lines):
+    return [line.split(' - ', 1)[1] for line in lines]
+
+
+def test_take_pending_returns_only_new_lines():
+    log = StatusLog(max_lines=5)
+    assert log.take_pending() == ([], False)
+    log.append('one')
+    log.append('two')
+    lines, dropped = log.take_pending()
+    assert messages(lines) == ['one', 'two'] and not dropped
+    log.append('three')
+    lines, dropped = log.take_pending()
+    assert messages(lines) == ['three'] and not dropped
+
+
+def test_memory_is_bounded():
+    log = StatusLog(max_lines=5)
+    for i in range(100):
+        log.append(f"message {i}")
+    assert len(log.lines) == 5
+    lines, dropped = log.take_pending()
+    # The window is told to replace what it shows with the newest lines
+    assert messages(lines) == [f"message {i}" for i in range(95, 100)] and dropped
+
+
+def test_append_from_many_threads():
+    log = StatusLog(max_lines=10000)
+    threads = [threading.Thread(target=lambda: [log.append('x') for _ in range(500)])
+               for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    lines, _ = log.take_pending()
+    assert len(lines) == 4000
+
+
+def test_file_log_rotates(tmp_path):
+    path = str(tmp_path / 'log.txt')
+    log = StatusLog(max_lines=10, log_file=path, max_bytes=200, backups=2)
+    for i in range(50):
+        log.append(f"message {i:02d}")
+    log.close()
+    assert sorted(os.listdir(str(tmp_path))) == ['log.txt', 'log.txt.1', 'log.txt.2']
+    with open(path, encoding='utf-8') as f:
+        assert f.read().rstrip().endswith('message 49')
+    assert os.path.getsize(path) <= 200
+
+
+def test_unwritable_log_file_is_skipped(tmp_path):
+    log = StatusLog(log_file=str(tmp_path / 'missing' / 'log.txt'))
+    assert log.file_logger is None
+    log.append('still shown')
+    assert messages(log.take_pending()[0]) == ['still shown']
@@ -0,0 +1,54 @@
+import threading
+
+from metrics import Metrics
+from wallpaper_backend import ChangeNotifier, RecordingBackend, side_by_side
+
+
+class GatedBackend(RecordingBackend):
+    """Notifications block until the test opens the gate"""
+
+    def __init__(self):
+        super().__init__(side_by_side([(1920, 1080)]), latency_scale=0)
+        self.started = threading.Event()
+        self.gate = threading.Event()
+
+    def notify_changed(self):
+        self.started.set()
+        self.gate.wait(10)
+        return super().notify_changed()
+
+
+def test_requests_during_a_notification_are_coalesced():
+    backend = GatedBackend()
+    metrics = Metrics()
+    notifier = ChangeNotifier(backend, metrics)
+    notifier.request()
+    assert backend.started.wait(10)
+    # Arrive while the first one is stuck in the shell
+    for _ in range(5):
+        notifier.request()
+    notifier.request(refresh=True)
+    notifier.request()
+    backend.gate.set()
+    notifier.wait(10)
+
+    # One more after the first, and the refresh covers the plain notifications
+    assert backend.call_counts() == {'notify_changed': 1, 'refresh_desktop': 1}
+    assert notifier.sent == 2
+    snapshot = metrics.snapshot()
+    assert snapshot['notify']['count'] == 1 and snapshot['refresh']['count'] == 1
+
+
+def test_notifier_survives_backend_errors():
+    class FailingBackend(RecordingBackend):
+        def notify_changed(self):
+            raise OSError('shell not running')
+
+    backend = FailingBackend(side_by_side([(1920, 1080)]), latency_scale=0)
+    notifier = ChangeNotifier(backend)
+    notifier.request()
+    notifier.wait(10)
+    notifier.request(refresh=True)
+    notifier.wait(10)
+    assert notifier.sent == 2
+    assert backend.call_counts() == {'refresh_desktop': 1}
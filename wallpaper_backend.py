@@ -0,0 +1,244 @@
+"""Desktop backends the rotator sets wallpapers through.
+
+A backend covers the parts of IDesktopWallpaper and the Win32 API the rotator
+uses: listing monitors with their desktop rectangles, setting a monitor's
+wallpaper and the fit mode, and telling the shell that wallpapers changed.
+
+ChangeNotifier sends the shell's change notification, which can block for
+seconds when a top-level window is hung, on a worker thread and coalesces
+requests that arrive while one is in flight.
+
+WindowsBackend is the real desktop. RecordingBackend keeps the desktop in
+memory and sleeps for simulated call latencies, so whole rotation cycles on
+any number of monitors can be run, profiled and load-tested off Windows.
+"""
+import threading
+import time
+
+
+SPI_SETDESKWALLPAPER = 20
+SPIF_UPDATEINIFILE = 0x01
+SPIF_SENDCHANGE = 0x02
+HWND_BROADCAST = 0xFFFF
+WM_SETTINGCHANGE = 0x001A
+SMTO_ABORTIFHUNG = 0x0002
+
+
+class WallpaperBackend:
+    """Interface between the rotator and the desktop"""
+
+    def monitor_ids(self):
+        """Device paths of the connected monitors, in the shell's order"""
+        raise NotImplementedError
+
+    def monitor_rect(self, monitor_id):
+        """Desktop rectangle of a monitor as (left, top, right, bottom)"""
+        raise NotImplementedError
+
+    def set_wallpaper(self, monitor_id, path):
+        raise NotImplementedError
+
+    def set_position(self, position):
+        """Set the fit mode (one of the DWPOS_* values) for every monitor"""
+        raise NotImplementedError
+
+    def notify_changed(self):
+        """Tell the shell the wallpaper settings changed"""
+        raise NotImplementedError
+
+    def refresh_desktop(self):
+        """Force the desktop to redraw the current wallpapers"""
+        raise NotImplementedError
+
+
+class WindowsBackend(WallpaperBackend):
+    """The Windows desktop, through IDesktopWallpaper and SystemParametersInfo"""
+
+    def __init__(self):
+        # Loads COM on the calling thread
+        from desktop_wallpaper import create_desktop_wallpaper
+        self.desktop_wallpaper = create_desktop_wallpaper()
+
+    def monitor_ids(self):
+        count = self.desktop_wallpaper.GetMonitorDevicePathCount()
+        return [self.desktop_wallpaper.GetMonitorDevicePathAt(i) for i in range(count)]
+
+    def monitor_rect(self, monitor_id):
+        rect = self.desktop_wallpaper.GetMonitorRECT(monitor_id)
+        return rect.left, rect.top, rect.right, rect.bottom
+
+    def set_wallpaper(self, monitor_id, path):
+        self.desktop_wallpaper.SetWallpaper(monitor_id, path)
+
+    def set_position(self, position):
+        self.desktop_wallpaper.SetPosition(position)
+
+    def notify_changed(self):
+        from ctypes import windll
+        # Pass None to refresh current wallpaper settings
+        return windll.user32.SystemParametersInfoW(
+            SPI_SETDESKWALLPAPER,
+            0,
+            None,
+            SPIF_UPDATEINIFILE | SPIF_SENDCHANGE
+        )
+
+    def refresh_desktop(self):
+        # Timed as 'refresh' by the ChangeNotifier that calls this
+        import win32gui
+        # Method 1: Use SystemParametersInfo to force wallpaper update
+        if not self.notify_changed():
+            print("Error refreshing desktop: SystemParametersInfo failed")
+
+        # Method 2: Broadcast setting change
+        win32gui.SendMessageTimeout(
+            HWND_BROADCAST,
+            WM_SETTINGCHANGE,
+            SPI_SETDESKWALLPAPER,
+            "ImmersiveColorSet",
+            SMTO_ABORTIFHUNG,
+            5000
+        )
+
+        # Small delay to let Windows process
+        time.sleep(0.1)
+
+
+class ChangeNotifier:
+    """Sends a backend's change notifications on a worker thread
+
+    However many requests arrive while a notification is running, at most one
+    more is sent after it. A pending refresh_desktop covers a plain
+    notify_changed.
+    """
+
+    def __init__(self, backend, metrics=None):
+        self.backend = backend
+        self.metrics = metrics  # Records 'notify'/'refresh' timings if given
+        self.lock = threading.Lock()
+        self.pending = None  # 'notify' or 'refresh' waiting to be sent
+        self.thread = None
+        self.sent = 0  # Notifications sent so far
+        self.last_seconds = None  # How long the last one took
+
+    def request(self, refresh=False):
+        with self.lock:
+            if refresh or self.pending == 'refresh':
+                self.pending = 'refresh'
+            else:
+                self.pending = 'notify'
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+
+    def _run(self):
+        while True:
+            with self.lock:
+                kind = self.pending
+                self.pending = None
+                if kind is None:
+                    self.thread = None
+                    return
+            start = time.perf_counter()
+            try:
+                if kind == 'refresh':
+                    self.backend.refresh_desktop()
+                else:
+                    self.backend.notify_changed()
+            except Exception as e:
+                print(f"Error notifying desktop of wallpaper change: {e}")
+            self.last_seconds = time.perf_counter() - start
+            self.sent += 1
+            if self.metrics is not None:
+                self.metrics.record(kind, self.last_seconds)
+
+    def wait(self, timeout=None):
+        """Wait for pending notifications, e.g. before the process exits"""
+        with self.lock:
+            thread = self.thread
+        if thread is not None:
+            thread.join(timeout)
+
+
+# Seconds each simulated call takes. Ballpark figures for a desktop where the
+# shell decodes and composites the new file before the call returns.
+SIMULATED_LATENCIES = {
+    'monitor_ids': 0.002,
+    'monitor_rect': 0.0005,
+    'set_wallpaper': 0.060,
+    'set_position': 0.020,
+    'notify_changed': 0.030,
+    'refresh_desktop': 0.150,
+}
+
+
+def side_by_side(sizes):
+    """Desktop rectangles of monitors of the given (width, height) placed left to right"""
+    rects = []
+    left = 0
+    for width, height in sizes:
+        rects.append((left, 0, left + width, height))
+        left += width
+    return rects
+
+
+class RecordingBackend(WallpaperBackend):
+    """In-memory desktop that records every call
+
+    rects are the monitors' (left, top, right, bottom) desktop rectangles.
+    latencies overrides SIMULATED_LATENCIES per call name; every latency is
+    multiplied by latency_scale, so 0 runs without sleeping.
+    """
+
+    def __init__(self, rects, latencies=None, latency_scale=1.0):
+        self.rects = {f"\\\\?\\DISPLAY#SIM{i:04d}#{i}": tuple(rect)
+                      for i, rect in enumerate(rects)}
+        self.latencies = dict(SIMULATED_LATENCIES)
+        if latencies:
+            self.latencies.update(latencies)
+        self.latency_scale = latency_scale
+        self.lock = threading.Lock()
+        self.calls = []  # (time.monotonic(), call name, arguments)
+        self.wallpapers = {}  # {monitor_id: path} as currently shown
+        self.position = None
+
+    def _call(self, name, *args):
+        delay = self.latencies.get(name, 0) * self.latency_scale
+        if delay > 0:
+            time.sleep(delay)
+        with self.lock:
+            self.calls.append((time.monotonic(), name, args))
+
+    def call_counts(self):
+        """{call name: number of calls} so far"""
+        counts = {}
+        with self.lock:
+            for _, name, _ in self.calls:
+                counts[name] = counts.get(name, 0) + 1
+        return counts
+
+    def monitor_ids(self):
+        self._call('monitor_ids')
+        return list(self.rects)
+
+    def monitor_rect(self, monitor_id):
+        self._call('monitor_rect', monitor_id)
+        return self.rects[monitor_id]
+
+    def set_wallpaper(self, monitor_id, path):
+        if monitor_id not in self.rects:
+            raise KeyError(f"Unknown monitor: {monitor_id}")
+        self._call('set_wallpaper', monitor_id, path)
+        with self.lock:
+            self.wallpapers[monitor_id] = path
+
+    def set_position(self, position):
+        self._call('set_position', position)
+        self.position = position
+
+    def notify_changed(self):
+        self._call('notify_changed')
+        return 1
+
+    def refresh_desktop(self):
+        self._call('refresh_desktop')
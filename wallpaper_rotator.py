@@ -0,0 +1,1240 @@
+"""Wallpaper rotation engine, independent of any user interface.
+
+WallpaperRotator owns the monitor configuration, the scanned image catalog,
+selection and rendering, and talks to the desktop through a backend
+(wallpaper_backend.py) - IDesktopWallpaper on Windows. The Tk window
+(wpchanger.py) and the headless command line (cli.py) both drive it, so
+nothing here may import tkinter or pystray.
+"""
+import json
+import threading
+import os
+import time
+import random
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from itertools import islice
+
+from catalog import FLAG_HASHED, ImageCatalog, added_time
+from fs_walk import WalkOptions, walk_images
+from fs_watch import FolderWatcher, WatchedTree
+from image_hash import dhash
+from image_index import ImageIndex
+from image_probe import probe_image
+from image_render import (DWPOS_FILL, DWPOS_SPAN, oriented_size, render_for_monitor,
+                          stored_size, target_size)
+from jpeg_lossless import (combined_operation, find_jpegtran, rotate_with_exif_tag,
+                           rotate_with_jpegtran)
+from metrics import Metrics, MetricsServer
+from render_cache import CacheJanitor, RenderCache, atomic_output, default_cache_dir
+from selection import SelectionEngine
+from selection_policy import SelectionPolicy
+from span_render import render_span, span_layout
+from wallpaper_backend import ChangeNotifier, WindowsBackend
+
+# Ensure random is properly seeded (important for PyInstaller builds)
+random.seed()
+
+# Image file types picked up by scans and the directory watcher
+IMAGE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff'}
+
+
+class WallpaperRotator:
+    def __init__(self, config_file='wallpaper_rotator_config.json', backend=None):
+        # Desktop to set wallpapers on; the Windows one is created on first use
+        self._backend = backend
+        self._notifier = None
+        # What the last apply put on screen, so unchanged calls can be skipped
+        self.shown_wallpapers = {}  # {monitor_id: file set as its wallpaper}
+        self.applied_position = None
+        self.last_apply_timings = {}  # {phase: milliseconds} of the last apply
+        self.metrics = Metrics()  # Rolling timings of the scan/render/apply hot paths
+        self.metrics_server = None
+        self._monitors = None
+        self.active_monitors = {}  # {monitor_id: orientation}
+        # {monitor_id: bool} - Allow all image orientations
+        self.monitor_allow_all_orientations = {}
+        # {monitor_id: 'left'|'right'} - Rotation direction for mismatched orientations
+        self.monitor_rotation_direction = {}
+        self.wallpaper_dir = None
+        # Compact store of every scanned image; the pools below are views of it
+        self.catalog = ImageCatalog()
+        self.image_files = self.catalog.all
+        self.portrait_images = self.catalog.portrait
+        self.landscape_images = self.catalog.landscape
+        self.selector = SelectionEngine()  # No-repeat or weighted image selection per pool
+        self.rotation_interval = 30  # minutes
+        self.running = False
+        self.rotation_thread = None
+        self.config_file = config_file
+        # Persistent cache of image dimensions/orientation keyed by path + size + mtime
+        self.index_file = 'wallpaper_rotator_index.db'
+        self.image_index = None
+        self.use_image_orientation = True  # New option
+        # Prefer images whose aspect ratio is close to the monitor's (e.g. 32:9 ultrawides)
+        self.match_aspect_ratio = True
+        self.aspect_tolerance = 0.2  # Allowed relative aspect ratio difference
+        # Fewer close-enough images than this falls back to orientation matching
+        self.aspect_min_images = 10
+        # Span fit: cut one panorama into per-monitor tiles instead of letting Windows stretch it
+        self.span_panorama = True
+        self.span_bezel_px = 0  # Pixels of picture hidden behind each bezel between panels
+        # Show only the best copy of near-identical images; off by default as
+        # hashing decodes every new image during the scan
+        self.detect_duplicates = False
+        # Weighted selection (see selection_policy.py); all off = no-repeat shuffle
+        self.folder_weights = {}  # {folder: weight}, relative to the wallpaper directory
+        self.folder_schedule = []  # Time-of-day rules overriding folder_weights
+        self.recent_boost = 1.0  # Weight factor for recently added images
+        self.recent_boost_days = 7  # How long an added image counts as recent
+        self.shown_half_life_hours = 24  # Recently shown images recover their weight this fast
+        self.wallpaper_position = DWPOS_FILL  # Default to Fill
+        self.last_wallpaper_path = None  # Track last set wallpaper for refresh
+        self.current_rotated_images = set()  # Track currently used rotated images
+        self.auto_start_rotation = False  # Auto-start rotation on app launch
+        self.scan_workers = 8  # Threads used to classify images while scanning
+        self.scan_batch_size = 100  # Classified images published to the pools at a time
+        self.scan_skip_hidden = True  # Skip hidden/system folders ($RECYCLE.BIN, .git, ...)
+        self.scan_max_depth = None  # Folder levels below the wallpaper directory, None = unlimited
+        self.scan_follow_symlinks = False  # Descend into symlinked folders (loops are detected)
+        # Images needed in each active monitor's pool before rotation may start mid-scan
+        self.min_images_to_start = 10
+        self.watch_directory = False  # Keep pools in sync with the directory without rescans
+        self.watch_poll_interval = 5.0  # Seconds between checks when inotify isn't available
+        self.scanned_tree = None  # Directory listings recorded by the last scan
+        self.folder_watcher = None
+        self.render_cache_dir = None  # Local folder for rendered wallpapers (None = per-user default)
+        self.render_cache_max_mb = 500  # Disk budget for cached rotated images
+        self.render_cache_max_age_days = 30  # Delete renders unused this long (None = never)
+        # Sizes and last use of every cached render, kept across runs
+        self.cache_manifest_file = 'wallpaper_rotator_cache.json'
+        self.downscale_to_monitor = True  # Render rotated images at monitor resolution
+        self.lossless_jpeg_rotation = True  # Use jpegtran for MCU-aligned JPEGs if installed
+        # Write an EXIF orientation tag instead of rotating pixels (only if the desktop honors it)
+        self.jpeg_rotation_via_exif = False
+        self.jpegtran = find_jpegtran()
+        self.prefetch_seconds = 30  # Prepare the next wallpapers this long before they are due
+        self.prefetched = None  # (settings, prepared wallpapers) from the last prefetch
+        self.prefetch_generation = 0
+        self.prefetch_thread = None
+        self.prefetch_lock = threading.Lock()
+        # A rotation waits this long for a prefetch still running instead of
+        # discarding it and rendering again on the caller's thread
+        self.prefetch_wait_seconds = 5.0
+        self.metrics_file = None  # Timing snapshot written here after each scan and rotation
+        self.metrics_http_port = None  # Serve timings on http://127.0.0.1:<port>/metrics
+        self.status_log_lines = 2000  # Lines kept in the window's status pane
+        self.log_file = None  # Also write status messages here (rotated by size)
+        self.log_file_max_kb = 1024  # Size at which the log file is rotated
+        self.load_config()
+        self.update_selection_policy()
+        self.render_cache = RenderCache(self.render_cache_max_mb * 1024 * 1024,
+                                        self.render_cache_max_age(), self.cache_dir())
+        # Cache cleanup runs on this worker thread, never on the caller's
+        self.janitor = CacheJanitor(self.render_cache, self.cache_manifest_file, self.metrics)
+
+    @property
+    def backend(self):
+        """Desktop backend, the Windows one (loading COM) unless one was given"""
+        if self._backend is None:
+            self._backend = WindowsBackend()
+        return self._backend
+
+    @property
+    def notifier(self):
+        """Sends the desktop's change notifications off the calling thread"""
+        if self._notifier is None:
+            self._notifier = ChangeNotifier(self.backend, self.metrics)
+        return self._notifier
+
+    @property
+    def monitors(self):
+        """Monitors as listed by get_monitors() when first asked for"""
+        if self._monitors is None:
+            self._monitors = self.get_monitors()
+        return self._monitors
+
+    def get_monitors(self):
+        """Get all monitors with their IDs and orientations"""
+        monitors = []
+
+        for i, monitor_id in enumerate(self.backend.monitor_ids()):
+            left, top, right, bottom = self.backend.monitor_rect(monitor_id)
+
+            width = right - left
+            height = bottom - top
+            orientation = 'Portrait' if height > width else 'Landscape'
+
+            monitors.append({
+                'id': monitor_id,
+                'index': i,
+                'width': width,
+                'height': height,
+                'orientation': orientation,
+                'left': left,
+                'top': top,
+                'rect': f"{width}x{height}"
+            })
+
+        return monitors
+
+    def set_wallpaper(self, monitor_id, image_path):
+        """Set wallpaper for specific monitor"""
+        try:
+            abs_path = os.path.abspath(image_path)
+
+            # Check if we need to rotate the image
+            rotated_path = self.prepare_image_for_monitor(monitor_id, abs_path)
+        except Exception as e:
+            print(f"ERROR setting wallpaper: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+        return self.set_prepared_wallpaper(monitor_id, image_path, rotated_path)
+
+    def set_prepared_wallpaper(self, monitor_id, image_path, rotated_path):
+        """Set an already prepared (rotated if needed) file as a monitor's wallpaper"""
+        try:
+            # Set the wallpaper for this specific monitor
+            with self.metrics.span('set_wallpaper'):
+                self.backend.set_wallpaper(monitor_id, rotated_path)
+
+            # Store the last wallpaper path for refresh purposes
+            self.last_wallpaper_path = rotated_path
+
+            print(
+                f"Set wallpaper on monitor to: {os.path.basename(image_path)}")
+            return True
+        except Exception as e:
+            print(f"ERROR setting wallpaper: {e}")
+            import traceback
+            traceback.print_exc()
+            return False
+
+    def prepare_image_for_monitor(self, monitor_id, image_path):
+        """Rotate image if needed to match monitor orientation"""
+        with self.metrics.span('prepare_image'):
+            return self._prepare_image_for_monitor(monitor_id, image_path)
+
+    def _prepare_image_for_monitor(self, monitor_id, image_path):
+        try:
+            # Get monitor orientation
+            monitor_orientation = None
+            for monitor in self.monitors:
+                if monitor['id'] == monitor_id:
+                    monitor_orientation = monitor['orientation']
+                    monitor_size = (monitor['width'], monitor['height'])
+                    break
+
+            if not monitor_orientation:
+                return image_path
+
+            # Check image orientation
+            info = self.read_image_info(image_path)
+            if info is None:
+                return image_path
+            image_orientation = self.orientation_from_info(*info)
+
+            # If portrait image on landscape monitor OR landscape image on portrait monitor, rotate it
+            if image_orientation != monitor_orientation:
+                # Get rotation direction for this monitor
+                rotation_direction = self.monitor_rotation_direction.get(
+                    monitor_id, 'none')
+
+                # If rotation is set to 'none', don't rotate - use original orientation
+                if rotation_direction == 'none':
+                    print(
+                        f"  No rotation applied - using image in default orientation")
+                    return image_path
+
+                # Create rotated version
+                cache_dir = self.cache_dir()
+                os.makedirs(cache_dir, exist_ok=True)
+
+                # Scale down to what the monitor can show for the current fit mode
+                render_size = oriented_size(*info, rotation_direction)
+                output_size = None
+                if self.downscale_to_monitor:
+                    output_size = target_size(
+                        render_size, monitor_size, self.wallpaper_position)
+                    render_size = output_size or render_size
+
+                # Reuse an earlier rendering of the same source at the same size
+                rotated_path = RenderCache.cache_path(
+                    cache_dir, image_path, os.stat(image_path),
+                    rotation_direction, *render_size)
+                rotated_filename = os.path.basename(rotated_path)
+                if self.render_cache.lookup(rotated_path):
+                    self.keep_rendered([rotated_path])
+                    print(
+                        f"  Using cached {rotation_direction} rotation for {monitor_orientation} monitor: {rotated_filename}")
+                    return rotated_path
+
+                # Renamed into place once complete, so SetWallpaper never sees half a file
+                with atomic_output(rotated_path) as partial_path:
+                    # JPEGs that need no resampling can be rotated without re-encoding
+                    if output_size is not None or not self.rotate_jpeg_lossless(
+                            image_path, partial_path, info, rotation_direction):
+                        # Load, downscale and rotate image
+                        # Rotation: left = 90° counter-clockwise, right = 90° clockwise
+                        with self.metrics.span('render'):
+                            rotated_img = render_for_monitor(
+                                image_path, info, rotation_direction, output_size)
+                        with self.metrics.span('encode'):
+                            rotated_img.save(partial_path, quality=95)
+                        rotated_img.close()
+
+                # Track this rotated image as currently in use
+                keep = self.keep_rendered([rotated_path])
+                self.render_cache.add(rotated_path)
+                if self.render_cache.over_budget():
+                    self.janitor.request(keep=keep)
+
+                print(
+                    f"  Rotated {image_orientation} image {rotation_direction} for {monitor_orientation} monitor: {rotated_filename}")
+                return rotated_path
+
+            return image_path
+
+        except Exception as e:
+            print(f"Error preparing image: {e}")
+            return image_path
+
+    def span_active(self):
+        """Whether this cycle shows one panorama across all active monitors"""
+        return (self.span_panorama and self.wallpaper_position == DWPOS_SPAN
+                and len(self.active_monitors) > 1)
+
+    def get_span_layout(self):
+        """Canvas size and per-monitor tile rectangles for the active monitors"""
+        rects = {}
+        for monitor in self.monitors:
+            if monitor['id'] in self.active_monitors:
+                rects[monitor['id']] = (monitor['left'], monitor['top'],
+                                        monitor['width'], monitor['height'])
+        return span_layout(rects, self.span_bezel_px)
+
+    def get_span_pool(self, canvas_size):
+        """Return (pool key, pool) a panorama for the given canvas is drawn from"""
+        canvas_width, canvas_height = canvas_size
+        if self.use_image_orientation and canvas_width and canvas_height:
+            if self.match_aspect_ratio:
+                pool = self.catalog.aspects.pool(
+                    canvas_width / canvas_height, self.aspect_tolerance)
+                if len(pool) >= max(1, self.aspect_min_images):
+                    return pool.key, pool
+            if canvas_width >= canvas_height and self.landscape_images:
+                return 'Landscape', self.landscape_images
+            if canvas_width < canvas_height and self.portrait_images:
+                return 'Portrait', self.portrait_images
+        return 'all', self.image_files
+
+    def prepare_span(self, image_path):
+        """Render the per-monitor tiles of a panorama
+
+        The source is decoded once for all tiles. Returns {monitor_id:
+        (image_path, tile_path)}, or each monitor showing image_path as-is if
+        the panorama can't be rendered.
+        """
+        abs_path = os.path.abspath(image_path)
+        canvas_size, layout = self.get_span_layout()
+        fallback = {monitor_id: (image_path, abs_path) for monitor_id in layout}
+        try:
+            info = self.read_image_info(abs_path)
+            if info is None:
+                return fallback
+
+            cache_dir = self.cache_dir()
+            os.makedirs(cache_dir, exist_ok=True)
+            source_stat = os.stat(abs_path)
+            # Tiles are keyed by their place on the canvas as well as their size
+            tile_paths = {
+                monitor_id: RenderCache.cache_path(
+                    cache_dir, abs_path, source_stat,
+                    f"span_{x}_{y}_{canvas_size[0]}x{canvas_size[1]}", width, height)
+                for monitor_id, (x, y, width, height) in layout.items()}
+
+            missing = {monitor_id: layout[monitor_id] for monitor_id, tile_path in tile_paths.items()
+                       if not self.render_cache.lookup(tile_path)}
+            if missing:
+                with self.metrics.span('render_span'):
+                    for monitor_id, tile in render_span(abs_path, info, canvas_size, missing):
+                        with atomic_output(tile_paths[monitor_id]) as partial_path:
+                            tile.save(partial_path, quality=95)
+                        tile.close()
+                        self.render_cache.add(tile_paths[monitor_id])
+
+            keep = self.keep_rendered(tile_paths.values())
+            if self.render_cache.over_budget():
+                self.janitor.request(keep=keep)
+            print(f"  Panorama {os.path.basename(abs_path)} split across "
+                  f"{len(layout)} monitors ({len(missing)} tiles rendered)")
+            return {monitor_id: (image_path, tile_path)
+                    for monitor_id, tile_path in tile_paths.items()}
+        except Exception as e:
+            print(f"Error rendering panorama: {e}")
+            return fallback
+
+    def rotate_jpeg_lossless(self, image_path, rotated_path, info, rotation_direction):
+        """Try the lossless JPEG rotation paths, returning False to fall back to PIL"""
+        if os.path.splitext(image_path)[1].lower() not in ('.jpg', '.jpeg'):
+            return False
+        try:
+            if self.jpeg_rotation_via_exif:
+                return rotate_with_exif_tag(
+                    image_path, rotated_path, info[2], rotation_direction)
+            if self.lossless_jpeg_rotation and self.jpegtran:
+                operation = combined_operation(info[2], rotation_direction)
+                return rotate_with_jpegtran(
+                    self.jpegtran, image_path, rotated_path, operation, info[:2])
+        except Exception as e:
+            print(f"Lossless JPEG rotation failed, re-encoding instead: {e}")
+        return False
+
+    def render_cache_max_age(self):
+        """Configured maximum age of cached renders in seconds, or None"""
+        if not self.render_cache_max_age_days:
+            return None
+        return self.render_cache_max_age_days * 24 * 3600
+
+    def cache_dir(self):
+        """Folder all rendered wallpapers are written to"""
+        return os.path.abspath(self.render_cache_dir or default_cache_dir())
+
+    def reconcile_render_cache(self):
+        """Adopt or forget renders left by earlier runs; call once at startup
+
+        Runs on the janitor thread. The cache folder and every folder in the
+        saved manifest are listed once.
+        """
+        self.janitor.reconcile([self.cache_dir()])
+
+    def retire_legacy_temp_dirs(self, directories):
+        """Empty and remove .wallpaper_temp folders found by a scan
+
+        Older versions rendered into one next to the images of every folder.
+        The janitor deletes the renders in them (files outside the cache
+        folder go first) and removes each folder once it is empty.
+        """
+        if directories:
+            self.janitor.adopt(directories)
+
+    def keep_rendered(self, paths=()):
+        """Protect renders from cleanup, returning a copy of everything in use
+
+        The prefetch thread adds to the set while the Tk thread rotates, so
+        it's only touched under the selector lock and the janitor gets a copy.
+        """
+        with self.selector.lock:
+            self.current_rotated_images.update(paths)
+            return set(self.current_rotated_images)
+
+    def cleanup_temp_images(self):
+        """Evict expired and least recently used renders beyond the cache budget
+
+        Only queues the work: the janitor thread deletes the files, going by
+        its in-memory manifest instead of listing the temp directory.
+        """
+        # Timed as 'cleanup' on the janitor thread, where the files are deleted
+        self.render_cache.max_bytes = self.render_cache_max_mb * 1024 * 1024
+        self.render_cache.max_age = self.render_cache_max_age()
+        self.render_cache.directory = self.cache_dir()
+        self.janitor.request(keep=self.keep_rendered())
+
+    def wait_for_cleanup(self, timeout=None):
+        """Let a running cleanup finish and save the manifest, e.g. before exiting"""
+        self.janitor.wait(timeout)
+
+    def refresh_desktop(self):
+        """Force Windows to refresh the desktop wallpaper display (asynchronously)"""
+        self.notifier.request(refresh=True)
+
+    def wait_for_notifications(self, timeout=None):
+        """Let a pending desktop notification finish, e.g. before exiting"""
+        if self._notifier is not None:
+            self._notifier.wait(timeout)
+
+    def export_metrics(self):
+        """Write the timing snapshot to metrics_file, if one is configured"""
+        if not self.metrics_file:
+            return
+        try:
+            self.metrics.write_json(self.metrics_file)
+        except Exception as e:
+            print(f"Error writing metrics: {e}")
+
+    def start_metrics_server(self):
+        """Serve timings over local HTTP if a port is configured; returns whether it runs"""
+        if not self.metrics_http_port or self.metrics_server is not None:
+            return self.metrics_server is not None
+        try:
+            server = MetricsServer(self.metrics, self.metrics_http_port)
+            server.start()
+        except Exception as e:
+            print(f"Error starting metrics server on port {self.metrics_http_port}: {e}")
+            return False
+        self.metrics_server = server
+        return True
+
+    def stop_metrics_server(self):
+        if self.metrics_server is not None:
+            self.metrics_server.stop()
+            self.metrics_server = None
+
+    def read_image_info(self, image_path):
+        """Read raw image dimensions and EXIF orientation tag"""
+        with self.metrics.span('image_info'):
+            return self._read_image_info(image_path)
+
+    def _read_image_info(self, image_path):
+        # Header-only probe covers the common formats without a full PIL parse
+        info = probe_image(image_path)
+        if info is not None:
+            return info
+
+        try:
+            from PIL import Image
+            with Image.open(image_path) as img:
+                width, height = img.size
+                exif_orientation = None
+                try:
+                    # 274 is the orientation tag
+                    exif = img.getexif()
+                    if exif:
+                        exif_orientation = exif.get(274)
+                except:
+                    pass
+                # Like the probe, report the stored size (Pillow orients TIFFs itself)
+                width, height = stored_size(img, exif_orientation)
+                return width, height, exif_orientation
+        except Exception as e:
+            print(f"Error reading image {image_path}: {e}")
+            return None
+
+    @staticmethod
+    def orientation_from_info(width, height, exif_orientation):
+        """Derive Portrait/Landscape from raw dimensions and EXIF orientation"""
+        # If rotated 90 or 270 degrees, swap dimensions
+        if exif_orientation in [6, 8]:  # 6=90CW, 8=90CCW
+            width, height = height, width
+        return 'Portrait' if height > width else 'Landscape'
+
+    def get_image_orientation(self, image_path):
+        """Determine if image is portrait or landscape based on dimensions"""
+        info = self.read_image_info(image_path)
+        if info is None:
+            return None
+        return self.orientation_from_info(*info)
+
+    def open_image_index(self):
+        """Open the persistent orientation index, or None if unavailable"""
+        if self.image_index is None:
+            try:
+                self.image_index = ImageIndex(self.index_file)
+            except Exception as e:
+                print(f"Error opening image index: {e}")
+                return None
+        return self.image_index
+
+    def classify_image(self, dir_entry, known):
+        """Classify one image, reusing the index entry if the file is unchanged
+
+        Returns ((width, height, orientation, dhash, added), index_entry)
+        where width and height are as displayed (EXIF orientation applied)
+        and index_entry is a new row to store in the index, or None if the
+        cached entry was still valid.
+        """
+        full_path = dir_entry.path
+        try:
+            # Cached by the directory listing on Windows
+            st = dir_entry.stat()
+        except OSError as e:
+            print(f"Error reading image {full_path}: {e}")
+            return (0, 0, None, None, 0), None
+
+        added = added_time(st)
+        cached = known.get(full_path)
+        if cached and cached[0] == st.st_size and cached[1] == st.st_mtime_ns:
+            image_hash, hash_failed = cached[6], cached[7]
+            # A file that couldn't be hashed before isn't decoded again until it changes
+            if image_hash is not None or hash_failed or not self.detect_duplicates:
+                return self.catalog_record(cached[2:5], cached[5], image_hash, added), None
+            # Indexed before hashing was enabled - only the hash is missing
+            info = cached[2:5]
+        else:
+            info = self.read_image_info(full_path)
+            if info is None:
+                return (0, 0, None, None, added), None
+            image_hash = None
+
+        orientation = self.orientation_from_info(*info)
+        hash_failed = False
+        if self.detect_duplicates:
+            image_hash = self.compute_dhash(full_path, info[2])
+            hash_failed = image_hash is None
+        entry = ((full_path, st.st_size, st.st_mtime_ns) + tuple(info) +
+                 (orientation, image_hash, hash_failed))
+        return self.catalog_record(info, orientation, image_hash, added), entry
+
+    def catalog_record(self, info, orientation, image_hash=None, added=0):
+        """(width, height, orientation, dhash, added) for the catalog from a (width, height, exif) tuple"""
+        width, height = oriented_size(*info, None)
+        if not self.detect_duplicates:
+            image_hash = None
+        return width or 0, height or 0, orientation, image_hash, added
+
+    def compute_dhash(self, image_path, exif_orientation):
+        """Perceptual hash of an image, or None if it can't be decoded"""
+        try:
+            with self.metrics.span('dhash'):
+                return dhash(image_path, exif_orientation)
+        except Exception as e:
+            print(f"Error hashing image {image_path}: {e}")
+            return None
+
+    def classify_images(self, dir_entries, known):
+        """Classify a stream of image entries concurrently
+
+        Yields (dir_entry, (record, index_entry)) in input order.
+        Classification is almost entirely I/O bound (network shares), so a
+        thread pool overlaps the file reads while results are still consumed
+        in the original order.
+        """
+        workers = max(1, int(self.scan_workers))
+        if workers == 1:
+            for dir_entry in dir_entries:
+                yield dir_entry, self.classify_image(dir_entry, known)
+            return
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix='classify') as executor:
+            # Keep a bounded window of in-flight reads so huge libraries don't
+            # queue hundreds of thousands of futures up front
+            window = workers * 4
+            entry_iter = iter(dir_entries)
+            pending = deque(
+                (dir_entry, executor.submit(self.classify_image, dir_entry, known))
+                for dir_entry in islice(entry_iter, window))
+            while pending:
+                dir_entry, future = pending.popleft()
+                result = future.result()
+                next_entry = next(entry_iter, None)
+                if next_entry is not None:
+                    pending.append((next_entry, executor.submit(
+                        self.classify_image, next_entry, known)))
+                yield dir_entry, result
+
+    def reset_images(self):
+        """Start a new catalog before a new scan publishes into it"""
+        self.catalog = ImageCatalog()
+        self.image_files = self.catalog.all
+        self.portrait_images = self.catalog.portrait
+        self.landscape_images = self.catalog.landscape
+        self.selector.reset()
+        # Folder weights may be relative to a new wallpaper directory
+        self.update_selection_policy()
+
+    def update_selection_policy(self):
+        """Rebuild the selection policy from the weighted selection settings"""
+        self.selector.set_policy(SelectionPolicy(
+            folder_weights=self.folder_weights,
+            schedule=self.folder_schedule,
+            root=self.wallpaper_dir,
+            recent_boost=self.recent_boost,
+            recent_days=self.recent_boost_days,
+            shown_half_life_hours=self.shown_half_life_hours))
+
+    def add_scanned_images(self, batch):
+        """Publish a batch of (path, width, height, orientation, dhash, added) results to the catalog"""
+        for full_path, width, height, orientation, image_hash, added in batch:
+            if self.catalog.find(full_path) is not None:
+                continue
+            image_id = self.catalog.add(full_path, width, height, orientation, image_hash, added)
+            self.announce_images([image_id] + self.catalog.take_promoted())
+
+    def announce_images(self, image_ids):
+        """Make newly visible catalog images eligible in the current selection round"""
+        catalog = self.catalog
+        for image_id in image_ids:
+            if not catalog.is_visible(image_id):
+                # Hidden behind a better copy of the same picture
+                continue
+            self.selector.item_added('all', image_id)
+            orientation = catalog.get_orientation(image_id)
+            if orientation in ('Portrait', 'Landscape'):
+                self.selector.item_added(orientation, image_id)
+            for pool in catalog.aspects.pools_containing(image_id):
+                self.selector.item_added(pool.key, image_id)
+
+    def iter_scan_batches(self, directory, progress_callback=None, cancel_event=None):
+        """Scan directory and subdirectories, yielding batches of (path, width, height, orientation, dhash, added)
+
+        Batches are yielded as soon as they are classified so callers can
+        start rotating before the whole library has been walked. Setting
+        cancel_event stops the scan early.
+        """
+        # Absolute paths keep index keys stable regardless of how the directory was given
+        directory = os.path.abspath(directory)
+        scan_start = time.perf_counter()
+
+        def cancelled():
+            return cancel_event is not None and cancel_event.is_set()
+
+        # The directory is walked as a stream: entries are classified while
+        # the rest of the tree is still being listed. The directory listings
+        # are kept so watch mode never has to walk the tree again.
+        options = WalkOptions(skip_hidden=self.scan_skip_hidden,
+                              max_depth=self.scan_max_depth,
+                              follow_symlinks=self.scan_follow_symlinks)
+        tree = WatchedTree(IMAGE_EXTENSIONS, directory, options)
+        self.scanned_tree = tree
+        # .wallpaper_temp folders older versions rendered into, next to the images
+        legacy_temp_dirs = []
+        dir_entries = walk_images(directory, IMAGE_EXTENSIONS, options,
+                                  on_directory=tree.add_directory, cancelled=cancelled,
+                                  on_excluded=legacy_temp_dirs.append)
+
+        if not self.use_image_orientation:
+            batch = []
+            for dir_entry in dir_entries:
+                try:
+                    added = added_time(dir_entry.stat())
+                except OSError:
+                    added = 0
+                batch.append((dir_entry.path, 0, 0, None, None, added))
+                if len(batch) >= self.scan_batch_size:
+                    yield batch
+                    batch = []
+            if batch and not cancelled():
+                yield batch
+            self.metrics.record('scan', time.perf_counter() - scan_start)
+            self.retire_legacy_temp_dirs(legacy_temp_dirs)
+            return
+
+        # Categorize by orientation as entries arrive
+        # Files whose size and mtime match the index are not opened again
+        image_index = self.open_image_index()
+        known = {}
+        if image_index:
+            try:
+                known = image_index.snapshot(directory)
+            except Exception as e:
+                print(f"Error reading image index: {e}")
+                image_index = None
+        index_updates = []
+        unseen = set(known)  # Indexed files not found (yet) by this walk
+
+        batch = []
+        results = self.classify_images(dir_entries, known)
+        try:
+            for idx, (dir_entry, (record, entry)) in enumerate(results):
+                if cancelled():
+                    return
+                if progress_callback:
+                    # The total isn't known until the walk has finished
+                    progress_callback(idx, None)
+
+                full_path = dir_entry.path
+                unseen.discard(full_path)
+                if entry:
+                    index_updates.append(entry)
+                batch.append((full_path,) + record)
+                if len(batch) >= self.scan_batch_size:
+                    yield batch
+                    batch = []
+
+            if batch:
+                yield batch
+        finally:
+            results.close()
+            if image_index:
+                try:
+                    # Keep whatever was classified, even if the scan was cancelled
+                    image_index.update(index_updates)
+                    if not cancelled():
+                        # Forget files that disappeared since the last scan
+                        image_index.remove(list(unseen))
+                except Exception as e:
+                    print(f"Error updating image index: {e}")
+            self.metrics.record('scan', time.perf_counter() - scan_start)
+            self.retire_legacy_temp_dirs(legacy_temp_dirs)
+            self.export_metrics()
+
+    def scan_images(self, directory, progress_callback=None):
+        """Scan directory and subdirectories for image files"""
+        self.reset_images()
+        for batch in self.iter_scan_batches(directory, progress_callback):
+            self.add_scanned_images(batch)
+        return self.finish_scan()
+
+    def finish_scan(self):
+        """Return the number of images found by the completed scan"""
+        # No shuffling needed - the selection engine draws from shuffle bags
+        return len(self.image_files)
+
+    def start_watching(self, callback):
+        """Watch the scanned directory tree, passing change events to callback
+
+        callback runs on the watcher thread with events already resolved by
+        resolve_fs_events; hand them to apply_fs_events on the thread that
+        owns the image pools.
+        """
+        self.stop_watching()
+        if self.scanned_tree is None:
+            return False
+        self.folder_watcher = FolderWatcher(
+            self.scanned_tree,
+            lambda events: callback(self.resolve_fs_events(events)),
+            poll_interval=self.watch_poll_interval
+        )
+        self.folder_watcher.start()
+        return True
+
+    def stop_watching(self):
+        if self.folder_watcher is not None:
+            self.folder_watcher.stop()
+            self.folder_watcher = None
+
+    def resolve_fs_events(self, events):
+        """Classify and hash newly created files (slow, so done off the UI thread)"""
+        resolved = []
+        for event in events:
+            if event[0] == 'created':
+                try:
+                    added = added_time(os.stat(event[1]))
+                except OSError:
+                    added = 0
+                record = (0, 0, None, None, added)
+                if self.use_image_orientation:
+                    info = self.read_image_info(event[1])
+                    if info is not None:
+                        image_hash = None
+                        if self.detect_duplicates:
+                            image_hash = self.compute_dhash(event[1], info[2])
+                        record = self.catalog_record(
+                            info, self.orientation_from_info(*info), image_hash, added)
+                resolved.append(('created', event[1]) + record)
+            else:
+                resolved.append(event)
+        return resolved
+
+    def apply_fs_events(self, events):
+        """Apply resolved watcher events to the catalog, returning (added, removed)"""
+        added = 0
+        removed = 0
+        for event in events:
+            kind = event[0]
+            if kind == 'created':
+                self.add_scanned_images([event[1:]])
+                added += 1
+            elif kind == 'deleted':
+                if self.remove_image(event[1]):
+                    removed += 1
+            elif kind == 'moved':
+                old_path, new_path = event[1], event[2]
+                # A rename keeps the image's size, orientation and hash, so the file isn't opened again
+                catalog = self.catalog
+                image_id = catalog.find(old_path)
+                if image_id is not None:
+                    image_hash = None
+                    if catalog.flags[image_id] & FLAG_HASHED:
+                        image_hash = catalog.dhash[image_id]
+                    record = (catalog.width[image_id], catalog.height[image_id],
+                              catalog.get_orientation(image_id), image_hash,
+                              catalog.added[image_id])
+                    catalog.remove(image_id)
+                    self.add_scanned_images([(new_path,) + record])
+        return added, removed
+
+    def remove_image(self, path):
+        """Drop a path from the catalog (and so every pool)"""
+        image_id = self.catalog.find(path)
+        if image_id is None:
+            return False
+        removed = self.catalog.remove(image_id)
+        # A hidden copy of a removed image takes its place
+        self.announce_images(self.catalog.take_promoted())
+        return removed
+
+    def get_monitor_aspect(self, monitor_id, orientation):
+        """Width/height of a monitor as configured, or None if unknown"""
+        for monitor in self.monitors:
+            if monitor['id'] == monitor_id:
+                width, height = monitor['width'], monitor['height']
+                if not width or not height:
+                    return None
+                # The orientation set in the UI wins over the reported geometry
+                if (orientation == 'Portrait') != (height > width):
+                    width, height = height, width
+                return width / height
+        return None
+
+    def get_image_pool(self, monitor_id, orientation):
+        """Return (pool key, pool) a monitor draws from given its settings"""
+        if self.monitor_allow_all_orientations.get(monitor_id, False):
+            # Use all images if "All orientations" is enabled for this monitor
+            return 'all', self.image_files
+        if self.use_image_orientation:
+            if self.match_aspect_ratio:
+                # Images close to the monitor's aspect ratio, as long as there
+                # are enough of them to keep the rotation varied
+                aspect = self.get_monitor_aspect(monitor_id, orientation)
+                if aspect:
+                    pool = self.catalog.aspects.pool(aspect, self.aspect_tolerance)
+                    if len(pool) >= max(1, self.aspect_min_images):
+                        return pool.key, pool
+            # Match image orientation to monitor orientation, falling back to
+            # all images if there are none of the right orientation
+            if orientation == 'Portrait' and self.portrait_images:
+                return 'Portrait', self.portrait_images
+            if orientation != 'Portrait' and self.landscape_images:
+                return 'Landscape', self.landscape_images
+        return 'all', self.image_files
+
+    def ready_for_rotation(self, min_images):
+        """Check whether every active monitor has at least min_images to choose from"""
+        if not self.active_monitors:
+            return False
+        for monitor_id, orientation in self.active_monitors.items():
+            if self.use_image_orientation and not self.monitor_allow_all_orientations.get(monitor_id, False):
+                # Don't fall back to the mixed pool while the matching one is still filling
+                image_list = self.portrait_images if orientation == 'Portrait' else self.landscape_images
+            else:
+                image_list = self.image_files
+            if len(image_list) < min_images:
+                return False
+        return True
+
+    def rotate_wallpaper(self, use_prefetched=True):
+        """Rotate to next wallpaper for all active monitors
+
+        A manual change passes use_prefetched=False so the set prepared for
+        the next scheduled rotation is left for it.
+        """
+        if not self.image_files or not self.active_monitors:
+            return False
+
+        with self.metrics.span('rotate'):
+            prepared = self.take_prefetched() if use_prefetched else None
+            if prepared is None:
+                prepared = self.prepare_wallpapers(self.select_images())
+            result = self.apply_wallpapers(prepared)
+        self.export_metrics()
+        return result
+
+    def _selection_settings(self):
+        """Settings that affect which images are picked and how they are rendered"""
+        return (tuple(sorted(self.active_monitors.items())),
+                tuple(sorted(self.monitor_allow_all_orientations.items())),
+                tuple(sorted(self.monitor_rotation_direction.items())),
+                self.use_image_orientation,
+                self.match_aspect_ratio,
+                self.aspect_tolerance,
+                self.aspect_min_images,
+                self.span_panorama,
+                self.span_bezel_px,
+                self.wallpaper_position,
+                self.downscale_to_monitor)
+
+    def start_prefetch(self):
+        """Select and render the next wallpapers on a worker thread
+
+        The next rotate_wallpaper call then only has to hand the prepared
+        files to Windows.
+        """
+        if not self.image_files or not self.active_monitors:
+            return
+        if self.prefetch_thread is not None and self.prefetch_thread.is_alive():
+            return
+
+        settings = self._selection_settings()
+        generation = self.prefetch_generation
+
+        def worker():
+            try:
+                prepared = self.prepare_wallpapers(self.select_images())
+            except Exception as e:
+                print(f"Error prefetching wallpapers: {e}")
+                return
+            with self.prefetch_lock:
+                # Drop results overtaken by a rotation that didn't wait for them
+                if generation == self.prefetch_generation:
+                    self.prefetched = (settings, prepared)
+
+        self.prefetch_thread = threading.Thread(target=worker, daemon=True)
+        self.prefetch_thread.start()
+
+    def take_prefetched(self):
+        """Return prefetched wallpapers if they are complete and still valid, else None"""
+        thread = self.prefetch_thread
+        if thread is not None and thread.is_alive():
+            thread.join(self.prefetch_wait_seconds)
+        with self.prefetch_lock:
+            item = self.prefetched
+            self.prefetched = None
+            self.prefetch_generation += 1
+        if item is None:
+            return None
+
+        settings, prepared = item
+        if settings != self._selection_settings():
+            return None
+        for image_path, prepared_path in prepared.values():
+            # Source deleted since, or rendered copy already cleaned up
+            if self.catalog.find(image_path) is None or not os.path.exists(prepared_path):
+                return None
+        return prepared
+
+    def select_images(self):
+        """Pick the next image for every active monitor, returning {monitor_id: image_path}
+
+        Images come from per-pool shuffle bags: nothing repeats until its pool
+        has been exhausted, and no two monitors get the same image in a cycle.
+        With folder weights, a schedule or a recency boost configured they are
+        drawn by weight instead.
+        """
+        with self.metrics.span('select'):
+            return self._select_images()
+
+    def _select_images(self):
+        if self.span_active():
+            # One panorama shared by every monitor
+            canvas_size, layout = self.get_span_layout()
+            pool_key, image_list = self.get_span_pool(canvas_size)
+            picked = self.selector.select([('span', pool_key, image_list)])
+            if 'span' not in picked:
+                return {}
+            image_path = image_list.catalog.path(picked['span'])
+            return {monitor_id: image_path for monitor_id in layout}
+
+        requests = []
+        # Sort monitor IDs to ensure consistent ordering
+        for monitor_id, orientation in sorted(self.active_monitors.items()):
+            pool_key, image_list = self.get_image_pool(monitor_id, orientation)
+            requests.append((monitor_id, pool_key, image_list))
+        # The engine works on catalog ids; resolve them through the pool's own
+        # catalog in case a rescan replaced self.catalog meanwhile
+        catalog = requests[0][2].catalog if requests else self.catalog
+        return {monitor_id: catalog.path(image_id)
+                for monitor_id, image_id in self.selector.select(requests).items()}
+
+    def prepare_wallpapers(self, selection):
+        """Render rotated copies needed for a selection
+
+        Returns {monitor_id: (image_path, prepared_path)}. Doesn't touch the
+        backend, so it can run on a worker thread ahead of time.
+        """
+        if self.span_active() and selection:
+            return self.prepare_span(next(iter(selection.values())))
+
+        prepared = {}
+        for monitor_id, image_path in selection.items():
+            abs_path = os.path.abspath(image_path)
+            try:
+                prepared[monitor_id] = (
+                    image_path, self.prepare_image_for_monitor(monitor_id, abs_path))
+            except Exception as e:
+                print(f"Error preparing image: {e}")
+                prepared[monitor_id] = (image_path, abs_path)
+        return prepared
+
+    def apply_wallpapers(self, prepared):
+        """Set prepared wallpapers on their monitors and apply the fit mode
+
+        The backend calls are batched: SetWallpaper only for monitors whose
+        file changed, SetPosition only when the fit mode changed, then a
+        single change notification sent off this thread - none at all if
+        nothing changed. Phase timings end up in last_apply_timings.
+        """
+        # Note: Windows updates monitors sequentially - there's no way to prevent
+        # a brief flash when using per-monitor wallpapers with IDesktopWallpaper
+        success = True
+        wallpapers_set = []
+        timings = {}
+        start = time.perf_counter()
+
+        # Only this cycle's rotated copies (and a prefetched set still waiting
+        # to be shown) are protected from cleanup from now on
+        with self.prefetch_lock:
+            waiting = self.prefetched[1] if self.prefetched is not None else {}
+        in_use = {
+            prepared_path for image_path, prepared_path
+            in list(prepared.values()) + list(waiting.values())
+            if prepared_path != os.path.abspath(image_path)}
+        with self.selector.lock:
+            self.current_rotated_images = in_use
+
+        for monitor_id, (image_path, prepared_path) in prepared.items():
+            if self.shown_wallpapers.get(monitor_id) == prepared_path:
+                continue  # Already on screen
+            if self.set_prepared_wallpaper(monitor_id, image_path, prepared_path):
+                self.shown_wallpapers[monitor_id] = prepared_path
+                wallpapers_set.append(monitor_id)
+            else:
+                success = False
+        timings['set_wallpapers'] = time.perf_counter() - start
+
+        # Apply the wallpaper position/fit mode
+        # Panorama tiles are already monitor-sized; Windows' own Span
+        # would ignore the per-monitor wallpapers
+        position = DWPOS_FILL if self.span_active() else self.wallpaper_position
+        position_changed = False
+        phase_start = time.perf_counter()
+        if prepared and position != self.applied_position:
+            try:
+                with self.metrics.span('set_position'):
+                    self.backend.set_position(position)
+                self.applied_position = position
+                position_changed = True
+                print(f"Wallpaper fit mode set to: {position}")
+            except Exception as e:
+                print(f"Error applying wallpaper settings: {e}")
+        timings['set_position'] = time.perf_counter() - phase_start
+
+        # Notify Windows of the change, once per cycle and never on this thread
+        if wallpapers_set or position_changed:
+            self.notifier.request()
+            print(f"Wallpapers set on {len(wallpapers_set)} monitors")
+
+        # Rotated copies from earlier cycles are no longer on screen
+        phase_start = time.perf_counter()
+        self.cleanup_temp_images()
+        timings['cleanup'] = time.perf_counter() - phase_start
+        timings['total'] = time.perf_counter() - start
+        self.last_apply_timings = {phase: seconds * 1000 for phase, seconds in timings.items()}
+        self.metrics.record('apply', timings['total'])
+
+        return success
+
+    def start_rotation(self):
+        """Start the rotation (no thread needed - the caller's timer drives it)"""
+        if not self.running:
+            self.running = True
+            # The wallpaper may have been changed outside the app since the last run
+            self.shown_wallpapers = {}
+            self.applied_position = None
+            # Change wallpaper immediately on start
+            print(
+                f"[{datetime.now().strftime('%H:%M:%S')}] Starting wallpaper rotation")
+            self.rotate_wallpaper()
+            print(
+                f"[{datetime.now().strftime('%H:%M:%S')}] Next change in {self.rotation_interval} minutes")
+
+    def stop_rotation(self):
+        """Stop the rotation"""
+        self.running = False
+        # Clean up temp images when stopping
+        self.cleanup_temp_images()
+
+    def save_config(self):
+        """Save configuration to file"""
+        config = {
+            'wallpaper_dir': self.wallpaper_dir,
+            'active_monitors': self.active_monitors,
+            'monitor_allow_all_orientations': self.monitor_allow_all_orientations,
+            'monitor_rotation_direction': self.monitor_rotation_direction,
+            'rotation_interval': self.rotation_interval,
+            'use_image_orientation': self.use_image_orientation,
+            'match_aspect_ratio': self.match_aspect_ratio,
+            'aspect_tolerance': self.aspect_tolerance,
+            'aspect_min_images': self.aspect_min_images,
+            'span_panorama': self.span_panorama,
+            'span_bezel_px': self.span_bezel_px,
+            'detect_duplicates': self.detect_duplicates,
+            'folder_weights': self.folder_weights,
+            'folder_schedule': self.folder_schedule,
+            'recent_boost': self.recent_boost,
+            'recent_boost_days': self.recent_boost_days,
+            'shown_half_life_hours': self.shown_half_life_hours,
+            'wallpaper_position': self.wallpaper_position,
+            'auto_start_rotation': self.auto_start_rotation,
+            'scan_workers': self.scan_workers,
+            'scan_skip_hidden': self.scan_skip_hidden,
+            'scan_max_depth': self.scan_max_depth,
+            'scan_follow_symlinks': self.scan_follow_symlinks,
+            'min_images_to_start': self.min_images_to_start,
+            'watch_directory': self.watch_directory,
+            'watch_poll_interval': self.watch_poll_interval,
+            'render_cache_dir': self.render_cache_dir,
+            'render_cache_max_mb': self.render_cache_max_mb,
+            'render_cache_max_age_days': self.render_cache_max_age_days,
+            'downscale_to_monitor': self.downscale_to_monitor,
+            'lossless_jpeg_rotation': self.lossless_jpeg_rotation,
+            'jpeg_rotation_via_exif': self.jpeg_rotation_via_exif,
+            'prefetch_seconds': self.prefetch_seconds,
+            'metrics_file': self.metrics_file,
+            'metrics_http_port': self.metrics_http_port,
+            'status_log_lines': self.status_log_lines,
+            'log_file': self.log_file,
+            'log_file_max_kb': self.log_file_max_kb
+        }
+        with open(self.config_file, 'w') as f:
+            json.dump(config, f)
+
+    def load_config(self):
+        """Load configuration from file"""
+        try:
+            if os.path.exists(self.config_file):
+                with open(self.config_file, 'r') as f:
+                    config = json.load(f)
+                    self.wallpaper_dir = config.get('wallpaper_dir')
+                    self.active_monitors = config.get('active_monitors', {})
+                    self.monitor_allow_all_orientations = config.get(
+                        'monitor_allow_all_orientations', {})
+                    self.monitor_rotation_direction = config.get(
+                        'monitor_rotation_direction', {})
+                    self.rotation_interval = config.get(
+                        'rotation_interval', 30)
+                    self.use_image_orientation = config.get(
+                        'use_image_orientation', True)
+                    self.match_aspect_ratio = config.get(
+                        'match_aspect_ratio', True)
+                    self.aspect_tolerance = config.get(
+                        'aspect_tolerance', 0.2)
+                    self.aspect_min_images = config.get('aspect_min_images', 10)
+                    self.span_panorama = config.get('span_panorama', True)
+                    self.span_bezel_px = config.get('span_bezel_px', 0)
+                    self.detect_duplicates = config.get(
+                        'detect_duplicates', False)
+                    self.folder_weights = config.get('folder_weights', {})
+                    self.folder_schedule = config.get('folder_schedule', [])
+                    self.recent_boost = config.get('recent_boost', 1.0)
+                    self.recent_boost_days = config.get('recent_boost_days', 7)
+                    self.shown_half_life_hours = config.get(
+                        'shown_half_life_hours', 24)
+                    self.wallpaper_position = config.get(
+                        'wallpaper_position', DWPOS_FILL)
+                    self.auto_start_rotation = config.get(
+                        'auto_start_rotation', False)
+                    self.scan_workers = config.get('scan_workers', 8)
+                    self.scan_skip_hidden = config.get(
+                        'scan_skip_hidden', True)
+                    self.scan_max_depth = config.get('scan_max_depth')
+                    self.scan_follow_symlinks = config.get(
+                        'scan_follow_symlinks', False)
+                    self.min_images_to_start = config.get(
+                        'min_images_to_start', 10)
+                    self.watch_directory = config.get(
+                        'watch_directory', False)
+                    self.watch_poll_interval = config.get(
+                        'watch_poll_interval', 5.0)
+                    self.render_cache_dir = config.get('render_cache_dir')
+                    self.render_cache_max_mb = config.get(
+                        'render_cache_max_mb', 500)
+                    self.render_cache_max_age_days = config.get(
+                        'render_cache_max_age_days', 30)
+                    self.downscale_to_monitor = config.get(
+                        'downscale_to_monitor', True)
+                    self.lossless_jpeg_rotation = config.get(
+                        'lossless_jpeg_rotation', True)
+                    self.jpeg_rotation_via_exif = config.get(
+                        'jpeg_rotation_via_exif', False)
+                    self.prefetch_seconds = config.get('prefetch_seconds', 30)
+                    self.metrics_file = config.get('metrics_file')
+                    self.metrics_http_port = config.get('metrics_http_port')
+                    self.status_log_lines = config.get('status_log_lines', 2000)
+                    self.log_file = config.get('log_file')
+                    self.log_file_max_kb = config.get('log_file_max_kb', 1024)
+        except Exception as e:
+            print(f"Error loading config: {e}")
@@ -1,638 +1,28 @@
-from pystray import MenuItem as item
-import pystray
-from PIL import Image
-import json
+import sys
+
+if __name__ == '__main__' and len(sys.argv) > 1:
+    # Headless modes (--daemon, scan, rotate-once, stats) never load Tk or pystray
+    from cli import main as cli_main
+    sys.exit(cli_main(sys.argv[1:]))
+
+# Only what the first paint needs is imported here. PIL and pystray are loaded
+# when the tray icon is first shown, COM when the rotator first lists monitors.
 from tkinter import ttk, filedialog, messagebox
 import tkinter as tk
 import threading
+import queue
 import win32gui
-import win32con
-import win32api
-from comtypes.hresult import S_OK
-from comtypes import GUID, COMMETHOD
-import comtypes.client
-from ctypes.wintypes import UINT, RECT
 import os
-import sys
-import time
-import random
-import subprocess
-from datetime import datetime
-from pathlib import Path
-from ctypes import windll, c_wchar_p, c_uint, Structure, POINTER, byref, c_int
 import ctypes
 
-# Ensure random is properly seeded (important for PyInstaller builds)
-random.seed()
+from image_render import (DWPOS_CENTER, DWPOS_TILE, DWPOS_STRETCH, DWPOS_FIT,
+                          DWPOS_FILL, DWPOS_SPAN)
+from status_log import FLUSH_INTERVAL_MS, StatusLog
+from wallpaper_rotator import WallpaperRotator
 
 # Windows message for taskbar recreation (sent when Explorer restarts)
 WM_TASKBARCREATED = None
 
-# IDesktopWallpaper interface definitions
-CLSID_DesktopWallpaper = GUID('{C2CF3110-460E-4fc1-B9D0-8A1C0C9CC4BD}')
-IID_IDesktopWallpaper = GUID('{B92B56A9-8B55-4E14-9A89-0199BBB6F93B}')
-
-
-class IDesktopWallpaper(comtypes.IUnknown):
-    _iid_ = IID_IDesktopWallpaper
-    _methods_ = [
-        COMMETHOD([], UINT, 'SetWallpaper',
-                  (['in'], c_wchar_p, 'monitorID'),
-                  (['in'], c_wchar_p, 'wallpaper')),
-        COMMETHOD([], UINT, 'GetWallpaper',
-                  (['in'], c_wchar_p, 'monitorID'),
-                  (['out'], POINTER(c_wchar_p), 'wallpaper')),
-        COMMETHOD([], UINT, 'GetMonitorDevicePathAt',
-                  (['in'], UINT, 'monitorIndex'),
-                  (['out'], POINTER(c_wchar_p), 'monitorID')),
-        COMMETHOD([], UINT, 'GetMonitorDevicePathCount',
-                  (['out'], POINTER(UINT), 'count')),
-        COMMETHOD([], UINT, 'GetMonitorRECT',
-                  (['in'], c_wchar_p, 'monitorID'),
-                  (['out'], POINTER(RECT), 'displayRect')),
-        COMMETHOD([], UINT, 'SetPosition',
-                  (['in'], c_int, 'position')),
-        COMMETHOD([], UINT, 'GetPosition',
-                  (['out'], POINTER(c_int), 'position')),
-        COMMETHOD([], UINT, 'SetBackgroundColor',
-                  (['in'], c_uint, 'color')),
-        COMMETHOD([], UINT, 'GetBackgroundColor',
-                  (['out'], POINTER(c_uint), 'color')),
-        COMMETHOD([], UINT, 'SetSlideshow',
-                  (['in'], POINTER(comtypes.IUnknown), 'items')),
-        COMMETHOD([], UINT, 'GetSlideshow',
-                  (['out'], POINTER(POINTER(comtypes.IUnknown)), 'items')),
-        COMMETHOD([], UINT, 'SetSlideshowOptions',
-                  (['in'], c_uint, 'options'),
-                  (['in'], c_uint, 'slideshowTick')),
-        COMMETHOD([], UINT, 'GetSlideshowOptions',
-                  (['out'], POINTER(c_uint), 'options'),
-                  (['out'], POINTER(c_uint), 'slideshowTick')),
-        COMMETHOD([], UINT, 'AdvanceSlideshow',
-                  (['in'], c_wchar_p, 'monitorID'),
-                  (['in'], c_int, 'direction')),
-        COMMETHOD([], UINT, 'GetStatus',
-                  (['out'], POINTER(c_int), 'state')),
-        COMMETHOD([], UINT, 'Enable',
-                  (['in'], c_int, 'enable')),
-    ]
-
-
-# Wallpaper position constants
-DWPOS_CENTER = 0
-DWPOS_TILE = 1
-DWPOS_STRETCH = 2
-DWPOS_FIT = 3
-DWPOS_FILL = 4
-DWPOS_SPAN = 5
-
-
-class WallpaperRotator:
-    def __init__(self):
-        self.desktop_wallpaper = comtypes.client.CreateObject(
-            CLSID_DesktopWallpaper,
-            interface=IDesktopWallpaper
-        )
-        self.monitors = self.get_monitors()
-        self.active_monitors = {}  # {monitor_id: orientation}
-        # {monitor_id: bool} - Allow all image orientations
-        self.monitor_allow_all_orientations = {}
-        # {monitor_id: 'left'|'right'} - Rotation direction for mismatched orientations
-        self.monitor_rotation_direction = {}
-        self.wallpaper_dir = None
-        self.image_files = []
-        self.portrait_images = []
-        self.landscape_images = []
-        self.monitor_indices = {}  # {monitor_id: current_index}
-        self.rotation_interval = 30  # minutes
-        self.running = False
-        self.rotation_thread = None
-        self.config_file = 'wallpaper_rotator_config.json'
-        self.use_image_orientation = True  # New option
-        self.wallpaper_position = DWPOS_FILL  # Default to Fill
-        self.last_wallpaper_path = None  # Track last set wallpaper for refresh
-        self.current_rotated_images = set()  # Track currently used rotated images
-        self.auto_start_rotation = False  # Auto-start rotation on app launch
-        self.load_config()
-
-    def get_monitors(self):
-        """Get all monitors with their IDs and orientations"""
-        monitors = []
-        count = self.desktop_wallpaper.GetMonitorDevicePathCount()
-
-        for i in range(count):
-            monitor_id = self.desktop_wallpaper.GetMonitorDevicePathAt(i)
-
-            rect = self.desktop_wallpaper.GetMonitorRECT(monitor_id)
-
-            width = rect.right - rect.left
-            height = rect.bottom - rect.top
-            orientation = 'Portrait' if height > width else 'Landscape'
-
-            monitors.append({
-                'id': monitor_id,
-                'index': i,
-                'width': width,
-                'height': height,
-                'orientation': orientation,
-                'rect': f"{width}x{height}"
-            })
-
-        return monitors
-
-    def set_wallpaper(self, monitor_id, image_path):
-        """Set wallpaper for specific monitor"""
-        try:
-            abs_path = os.path.abspath(image_path)
-
-            # Check if we need to rotate the image
-            rotated_path = self.prepare_image_for_monitor(monitor_id, abs_path)
-
-            # Set the wallpaper for this specific monitor
-            self.desktop_wallpaper.SetWallpaper(monitor_id, rotated_path)
-
-            # Store the last wallpaper path for refresh purposes
-            self.last_wallpaper_path = rotated_path
-
-            print(
-                f"Set wallpaper on monitor to: {os.path.basename(image_path)}")
-            return True
-        except Exception as e:
-            print(f"ERROR setting wallpaper: {e}")
-            import traceback
-            traceback.print_exc()
-            return False
-
-    def prepare_image_for_monitor(self, monitor_id, image_path):
-        """Rotate image if needed to match monitor orientation"""
-        try:
-            # Get monitor orientation
-            monitor_orientation = None
-            for monitor in self.monitors:
-                if monitor['id'] == monitor_id:
-                    monitor_orientation = monitor['orientation']
-                    break
-
-            if not monitor_orientation:
-                return image_path
-
-            # Check image orientation
-            with Image.open(image_path) as img:
-                # Handle EXIF orientation
-                try:
-                    exif = img.getexif()
-                    if exif:
-                        orientation = exif.get(274)
-                        if orientation in [6, 8]:  # Already rotated in EXIF
-                            width, height = img.height, img.width
-                        else:
-                            width, height = img.size
-                    else:
-                        width, height = img.size
-                except:
-                    width, height = img.size
-
-                image_orientation = 'Portrait' if height > width else 'Landscape'
-
-                # If portrait image on landscape monitor OR landscape image on portrait monitor, rotate it
-                if image_orientation != monitor_orientation:
-                    # Get rotation direction for this monitor
-                    rotation_direction = self.monitor_rotation_direction.get(
-                        monitor_id, 'none')
-
-                    # If rotation is set to 'none', don't rotate - use original orientation
-                    if rotation_direction == 'none':
-                        print(
-                            f"  No rotation applied - using image in default orientation")
-                        return image_path
-
-                    # Create rotated version
-                    temp_dir = os.path.join(os.path.dirname(
-                        image_path), '.wallpaper_temp')
-                    os.makedirs(temp_dir, exist_ok=True)
-
-                    rotated_filename = f"rotated_{rotation_direction}_{os.path.basename(image_path)}"
-                    rotated_path = os.path.join(temp_dir, rotated_filename)
-
-                    # Load and rotate image
-                    img_copy = Image.open(image_path)
-
-                    # Apply EXIF rotation first if needed
-                    try:
-                        exif = img_copy.getexif()
-                        if exif and exif.get(274):
-                            # Auto-orient based on EXIF
-                            from PIL import ImageOps
-                            img_copy = ImageOps.exif_transpose(img_copy)
-                    except:
-                        pass
-
-                    # Rotate based on direction: left = 90° counter-clockwise, right = 270° counter-clockwise (or -90°)
-                    if rotation_direction == 'left':
-                        rotated_img = img_copy.rotate(90, expand=True)
-                    else:  # right
-                        rotated_img = img_copy.rotate(-90, expand=True)
-
-                    rotated_img.save(rotated_path, quality=95)
-                    img_copy.close()
-
-                    # Track this rotated image as currently in use
-                    self.current_rotated_images.add(rotated_path)
-
-                    print(
-                        f"  Rotated {image_orientation} image {rotation_direction} for {monitor_orientation} monitor: {rotated_filename}")
-                    return rotated_path
-
-                return image_path
-
-        except Exception as e:
-            print(f"Error preparing image: {e}")
-            return image_path
-
-    def cleanup_temp_images(self):
-        """Clean up old rotated images that are no longer in use"""
-        try:
-            if not self.wallpaper_dir:
-                return
-
-            temp_dir = os.path.join(self.wallpaper_dir, '.wallpaper_temp')
-            if not os.path.exists(temp_dir):
-                return
-
-            # Get all files in temp directory
-            temp_files = []
-            for file in os.listdir(temp_dir):
-                file_path = os.path.join(temp_dir, file)
-                if os.path.isfile(file_path):
-                    temp_files.append(file_path)
-
-            # Delete files that are not currently in use
-            deleted_count = 0
-            for file_path in temp_files:
-                if file_path not in self.current_rotated_images:
-                    try:
-                        os.remove(file_path)
-                        deleted_count += 1
-                    except Exception as e:
-                        print(f"Could not delete temp file {file_path}: {e}")
-
-            if deleted_count > 0:
-                print(
-                    f"Cleaned up {deleted_count} old rotated images from temp folder")
-
-        except Exception as e:
-            print(f"Error cleaning up temp images: {e}")
-
-    def refresh_desktop(self):
-        """Force Windows to refresh the desktop wallpaper display"""
-        try:
-            # Method 1: Use SystemParametersInfo to force wallpaper update
-            SPI_SETDESKWALLPAPER = 20
-            SPIF_UPDATEINIFILE = 0x01
-            SPIF_SENDCHANGE = 0x02
-
-            # Pass None to refresh current wallpaper settings
-            result = windll.user32.SystemParametersInfoW(
-                SPI_SETDESKWALLPAPER,
-                0,
-                None,
-                SPIF_UPDATEINIFILE | SPIF_SENDCHANGE
-            )
-            print(f"DEBUG: SystemParametersInfo called, result: {result}")
-
-            # Method 2: Broadcast setting change
-            HWND_BROADCAST = 0xFFFF
-            WM_SETTINGCHANGE = 0x001A
-            SMTO_ABORTIFHUNG = 0x0002
-            win32gui.SendMessageTimeout(
-                HWND_BROADCAST,
-                WM_SETTINGCHANGE,
-                SPI_SETDESKWALLPAPER,
-                "ImmersiveColorSet",
-                SMTO_ABORTIFHUNG,
-                5000
-            )
-            print(f"DEBUG: Desktop refresh broadcast sent")
-
-            # Small delay to let Windows process
-            time.sleep(0.1)
-
-        except Exception as e:
-            print(f"DEBUG: Error refreshing desktop: {e}")
-            import traceback
-            traceback.print_exc()
-
-    def get_image_orientation(self, image_path):
-        """Determine if image is portrait or landscape based on dimensions"""
-        try:
-            with Image.open(image_path) as img:
-                # Handle EXIF orientation - but do it quickly
-                try:
-                    # Check EXIF orientation tag
-                    exif = img.getexif()
-                    if exif:
-                        # 274 is the orientation tag
-                        orientation = exif.get(274)
-                        # If rotated 90 or 270 degrees, swap dimensions
-                        if orientation in [6, 8]:  # 6=90CW, 8=90CCW
-                            width, height = img.size
-                            width, height = height, width  # Swap
-                        else:
-                            width, height = img.size
-                    else:
-                        width, height = img.size
-                except:
-                    width, height = img.size
-
-                return 'Portrait' if height > width else 'Landscape'
-        except Exception as e:
-            print(f"Error reading image {image_path}: {e}")
-            return None
-
-    def scan_images(self, directory, progress_callback=None):
-        """Scan directory and subdirectories for image files"""
-        image_extensions = {'.jpg', '.jpeg', '.png', '.bmp', '.gif', '.tiff'}
-        self.image_files = []
-        self.portrait_images = []
-        self.landscape_images = []
-
-        # First pass: collect all image paths (fast)
-        for root, dirs, files in os.walk(directory):
-            for file in files:
-                if Path(file).suffix.lower() in image_extensions:
-                    full_path = os.path.join(root, file)
-                    self.image_files.append(full_path)
-
-        total = len(self.image_files)
-
-        # Second pass: categorize by orientation if enabled (slower)
-        if self.use_image_orientation and total > 0:
-            for idx, full_path in enumerate(self.image_files):
-                if progress_callback:
-                    progress_callback(idx, total)
-
-                orientation = self.get_image_orientation(full_path)
-                if orientation == 'Portrait':
-                    self.portrait_images.append(full_path)
-                elif orientation == 'Landscape':
-                    self.landscape_images.append(full_path)
-
-        # Shuffle both lists - use time-based seed for extra randomness
-        random.shuffle(self.image_files)
-        if self.portrait_images:
-            random.shuffle(self.portrait_images)
-        if self.landscape_images:
-            random.shuffle(self.landscape_images)
-
-        # Reset indices for all monitors with offset to ensure different images
-        # Group monitors by orientation and offset their starting indices
-        portrait_count = 0
-        landscape_count = 0
-        self.monitor_indices = {}
-
-        # Sort monitor IDs to ensure consistent ordering
-        sorted_monitors = sorted(self.active_monitors.items())
-
-        for monitor_id, orientation in sorted_monitors:
-            if orientation == 'Portrait':
-                # Ensure each portrait monitor gets a different starting image
-                image_list_len = len(
-                    self.portrait_images) if self.portrait_images else len(self.image_files)
-                if image_list_len > 0:
-                    self.monitor_indices[monitor_id] = portrait_count % image_list_len
-                else:
-                    self.monitor_indices[monitor_id] = 0
-                portrait_count += 1
-            else:  # Landscape
-                # Ensure each landscape monitor gets a different starting image
-                image_list_len = len(
-                    self.landscape_images) if self.landscape_images else len(self.image_files)
-                if image_list_len > 0:
-                    self.monitor_indices[monitor_id] = landscape_count % image_list_len
-                else:
-                    self.monitor_indices[monitor_id] = 0
-                landscape_count += 1
-
-        return len(self.image_files)
-
-    def rotate_wallpaper(self):
-        """Rotate to next wallpaper for all active monitors"""
-        if not self.image_files or not self.active_monitors:
-            return False
-
-        # Clean up old rotated images before creating new ones
-        # Clear the current set so we can track new rotated images
-        self.cleanup_temp_images()
-        self.current_rotated_images.clear()
-
-        # Set all wallpapers as quickly as possible
-        # Note: Windows updates monitors sequentially - there's no way to prevent
-        # a brief flash when using per-monitor wallpapers with IDesktopWallpaper
-        success = True
-        wallpapers_set = []
-
-        # Initialize indices for any monitors that don't have them yet
-        # Use random indices to ensure each monitor gets a different random image
-        if not self.monitor_indices:
-            used_image_paths = set()
-            sorted_monitors = sorted(self.active_monitors.items())
-
-            for mon_id, mon_orientation in sorted_monitors:
-                allow_all = self.monitor_allow_all_orientations.get(
-                    mon_id, False)
-
-                # Determine which image list to use
-                if allow_all:
-                    temp_list = self.image_files
-                elif self.use_image_orientation:
-                    if mon_orientation == 'Portrait':
-                        temp_list = self.portrait_images if self.portrait_images else self.image_files
-                    else:
-                        temp_list = self.landscape_images if self.landscape_images else self.image_files
-                else:
-                    temp_list = self.image_files
-
-                # Assign a random index, trying to avoid using the same image file
-                if temp_list:
-                    list_len = len(temp_list)
-                    # Try to get a unique image (not already used by another monitor)
-                    attempts = 0
-                    # Try up to 50 times or list length
-                    while attempts < min(50, list_len):
-                        idx = random.randint(0, list_len - 1)
-                        image_path = temp_list[idx]
-                        # Check if this image has already been assigned to another monitor
-                        if image_path not in used_image_paths or attempts >= min(49, list_len - 1):
-                            used_image_paths.add(image_path)
-                            self.monitor_indices[mon_id] = idx
-                            break
-                        attempts += 1
-                else:
-                    self.monitor_indices[mon_id] = 0
-
-        # Track which images are being used in this rotation to avoid duplicates
-        images_being_used = {}  # {monitor_id: image_path}
-
-        for monitor_id, orientation in self.active_monitors.items():
-            # If a specific monitor is missing an index, assign a random one to ensure uniqueness
-            if monitor_id not in self.monitor_indices:
-                allow_all = self.monitor_allow_all_orientations.get(
-                    monitor_id, False)
-
-                # Select appropriate image list
-                if allow_all:
-                    temp_list = self.image_files
-                elif self.use_image_orientation:
-                    if orientation == 'Portrait':
-                        temp_list = self.portrait_images if self.portrait_images else self.image_files
-                    else:
-                        # Landscape monitors use landscape images only (unless allow_all is checked)
-                        temp_list = self.landscape_images if self.landscape_images else self.image_files
-                else:
-                    temp_list = self.image_files
-
-                # Assign a random starting index
-                if temp_list:
-                    self.monitor_indices[monitor_id] = random.randint(
-                        0, len(temp_list) - 1)
-                else:
-                    self.monitor_indices[monitor_id] = 0
-
-            # Select appropriate image list based on mode and per-monitor settings
-            allow_all = self.monitor_allow_all_orientations.get(
-                monitor_id, False)
-
-            if allow_all:
-                # Use all images if "All orientations" is enabled for this monitor
-                image_list = self.image_files
-            elif self.use_image_orientation:
-                # Match image orientation to monitor orientation
-                if orientation == 'Portrait':
-                    image_list = self.portrait_images if self.portrait_images else self.image_files
-                else:
-                    # Landscape monitors only use landscape images unless "All orientations" is checked
-                    image_list = self.landscape_images if self.landscape_images else self.image_files
-            else:
-                # Use all images regardless of orientation
-                image_list = self.image_files
-
-            if not image_list:
-                continue
-
-            # Pick a random image that's not already being used by another monitor
-            attempts = 0
-            max_attempts = min(50, len(image_list))  # Try up to 50 times
-            image_path = None
-
-            while attempts < max_attempts:
-                # Pick a random index
-                index = random.randint(0, len(image_list) - 1)
-                image_path = image_list[index]
-
-                # Check if this image is already being used
-                if image_path not in images_being_used.values():
-                    # Found a unique image
-                    break
-
-                attempts += 1
-
-            # If we couldn't find a unique image after max_attempts, just use the last one tried
-            if image_path is None:
-                index = random.randint(0, len(image_list) - 1)
-                image_path = image_list[index]
-
-            images_being_used[monitor_id] = image_path
-
-            # Store the index for reference (though we'll pick random next time anyway)
-            self.monitor_indices[monitor_id] = index
-
-            # Set wallpaper
-            if self.set_wallpaper(monitor_id, image_path):
-                wallpapers_set.append(monitor_id)
-            else:
-                success = False
-
-        # Apply the wallpaper position/fit mode
-        if wallpapers_set:
-            try:
-                # Set position
-                self.desktop_wallpaper.SetPosition(self.wallpaper_position)
-                print(f"Wallpaper fit mode set to: {self.wallpaper_position}")
-
-                # Notify Windows of the change
-                SPI_SETDESKWALLPAPER = 20
-                SPIF_UPDATEINIFILE = 0x01
-                SPIF_SENDCHANGE = 0x02
-
-                windll.user32.SystemParametersInfoW(
-                    SPI_SETDESKWALLPAPER,
-                    0,
-                    None,
-                    SPIF_UPDATEINIFILE | SPIF_SENDCHANGE
-                )
-                print(
-                    f"Wallpapers set on {len(wallpapers_set)} monitors")
-
-            except Exception as e:
-                print(f"Error applying wallpaper settings: {e}")
-
-        return success
-
-    def start_rotation(self):
-        """Start the rotation (no thread needed - uses tkinter timer)"""
-        if not self.running:
-            self.running = True
-            # Change wallpaper immediately on start
-            print(
-                f"[{datetime.now().strftime('%H:%M:%S')}] Starting wallpaper rotation")
-            self.rotate_wallpaper()
-            print(
-                f"[{datetime.now().strftime('%H:%M:%S')}] Next change in {self.rotation_interval} minutes")
-
-    def stop_rotation(self):
-        """Stop the rotation"""
-        self.running = False
-        # Clean up temp images when stopping
-        self.cleanup_temp_images()
-
-    def save_config(self):
-        """Save configuration to file"""
-        config = {
-            'wallpaper_dir': self.wallpaper_dir,
-            'active_monitors': self.active_monitors,
-            'monitor_allow_all_orientations': self.monitor_allow_all_orientations,
-            'monitor_rotation_direction': self.monitor_rotation_direction,
-            'rotation_interval': self.rotation_interval,
-            'use_image_orientation': self.use_image_orientation,
-            'wallpaper_position': self.wallpaper_position,
-            'auto_start_rotation': self.auto_start_rotation
-        }
-        with open(self.config_file, 'w') as f:
-            json.dump(config, f)
-
-    def load_config(self):
-        """Load configuration from file"""
-        try:
-            if os.path.exists(self.config_file):
-                with open(self.config_file, 'r') as f:
-                    config = json.load(f)
-                    self.wallpaper_dir = config.get('wallpaper_dir')
-                    self.active_monitors = config.get('active_monitors', {})
-                    self.monitor_allow_all_orientations = config.get(
-                        'monitor_allow_all_orientations', {})
-                    self.monitor_rotation_direction = config.get(
-                        'monitor_rotation_direction', {})
-                    self.rotation_interval = config.get(
-                        'rotation_interval', 30)
-                    self.use_image_orientation = config.get(
-                        'use_image_orientation', True)
-                    self.wallpaper_position = config.get(
-                        'wallpaper_position', DWPOS_FILL)
-                    self.auto_start_rotation = config.get(
-                        'auto_start_rotation', False)
-        except Exception as e:
-            print(f"Error loading config: {e}")
-
 
 class WallpaperRotatorGUI:
     def __init__(self, root):
@@ -640,9 +30,17 @@ class WallpaperRotatorGUI:
         self.root.title("Multi-Monitor Wallpaper Rotator")
         self.root.geometry("750x700")
         self.rotator = WallpaperRotator()
+        # Sync the render cache with files left by earlier runs, off the Tk thread
+        self.rotator.reconcile_render_cache()
+        # Bounded log buffer; the status pane is refreshed from it by _flush_status_log
+        self.status_log = StatusLog(
+            max_lines=self.rotator.status_log_lines,
+            log_file=self.rotator.log_file,
+            max_bytes=self.rotator.log_file_max_kb * 1024)
         self.monitor_checkboxes = []
         self.monitor_orientation_vars = []
         self.rotation_timer_id = None  # Track timer for rotation
+        self.prefetch_timer_id = None  # Timer that prepares the next wallpapers early
 
         self.tray_icon = None
         self.icon_image = None
@@ -650,6 +48,17 @@ class WallpaperRotatorGUI:
         self.tray_check_timer_id = None  # Timer for monitoring tray icon
         self.hwnd = None  # Window handle for receiving Windows messages
 
+        # Background scanning - the worker hands results back through scan_queue
+        self.scan_thread = None
+        self.scan_cancel_event = None
+        self.scan_queue = queue.Queue()
+        self.scan_poll_timer_id = None
+        self.scan_announce = False  # Report results in detail (user-initiated scan)
+        self.scan_progress_logged = 0  # Images processed when progress was last logged
+        self.pending_start = False  # Start rotation once enough images are scanned
+        self.watch_queue = queue.Queue()  # Directory changes from the folder watcher
+        self.watch_poll_timer_id = None
+
         # Register the TaskbarCreated message
         global WM_TASKBARCREATED
         if WM_TASKBARCREATED is None:
@@ -696,6 +105,9 @@ class WallpaperRotatorGUI:
 
         self.create_widgets()
         self.update_status()
+        self._flush_status_log()
+        if self.rotator.start_metrics_server():
+            self.log(f"Serving timings on http://127.0.0.1:{self.rotator.metrics_http_port}/metrics")
         self.setup_tray_support()
 
         # Create message window after GUI is fully initialized
@@ -823,6 +235,15 @@ class WallpaperRotatorGUI:
         interval_spinbox.pack(anchor='w', pady=5)
         interval_spinbox.bind('<FocusOut>', self.on_interval_change)
 
+        ttk.Label(interval_frame, text="Scan worker threads:").pack(
+            anchor='w')
+
+        self.scan_workers_var = tk.IntVar(value=self.rotator.scan_workers)
+        scan_workers_spinbox = ttk.Spinbox(
+            interval_frame, from_=1, to=64, textvariable=self.scan_workers_var, width=10)
+        scan_workers_spinbox.pack(anchor='w', pady=5)
+        scan_workers_spinbox.bind('<FocusOut>', self.on_scan_workers_change)
+
         # Image orientation matching option
         self.use_orientation_var = tk.BooleanVar(
             value=self.rotator.use_image_orientation)
@@ -834,6 +255,61 @@ class WallpaperRotatorGUI:
         )
         orientation_check.pack(anchor='w', pady=5)
 
+        # Directory watch option
+        self.watch_directory_var = tk.BooleanVar(
+            value=self.rotator.watch_directory)
+        watch_check = ttk.Checkbutton(
+            interval_frame,
+            text="Watch directory for added and removed images",
+            variable=self.watch_directory_var,
+            command=self.on_watch_directory_change
+        )
+        watch_check.pack(anchor='w', pady=5)
+
+        # Aspect ratio matching option
+        self.match_aspect_var = tk.BooleanVar(
+            value=self.rotator.match_aspect_ratio)
+        match_aspect_check = ttk.Checkbutton(
+            interval_frame,
+            text="Prefer images with the monitor's aspect ratio (e.g. ultrawide panoramas)",
+            variable=self.match_aspect_var,
+            command=self.on_match_aspect_change
+        )
+        match_aspect_check.pack(anchor='w', pady=5)
+
+        # Near-duplicate detection option
+        self.detect_duplicates_var = tk.BooleanVar(
+            value=self.rotator.detect_duplicates)
+        detect_duplicates_check = ttk.Checkbutton(
+            interval_frame,
+            text="Show only one copy of near-identical images (resized/re-encoded copies)",
+            variable=self.detect_duplicates_var,
+            command=self.on_detect_duplicates_change
+        )
+        detect_duplicates_check.pack(anchor='w', pady=5)
+
+        # Downscale rotated images option
+        self.downscale_var = tk.BooleanVar(
+            value=self.rotator.downscale_to_monitor)
+        downscale_check = ttk.Checkbutton(
+            interval_frame,
+            text="Scale rotated images down to monitor resolution (faster, less memory)",
+            variable=self.downscale_var,
+            command=self.on_downscale_change
+        )
+        downscale_check.pack(anchor='w', pady=5)
+
+        # Skip hidden folders option
+        self.skip_hidden_var = tk.BooleanVar(
+            value=self.rotator.scan_skip_hidden)
+        skip_hidden_check = ttk.Checkbutton(
+            interval_frame,
+            text="Skip hidden and system folders when scanning",
+            variable=self.skip_hidden_var,
+            command=self.on_skip_hidden_change
+        )
+        skip_hidden_check.pack(anchor='w', pady=5)
+
         # Wallpaper fit/position option
         ttk.Label(interval_frame, text="Wallpaper Fit:").pack(
             anchor='w', pady=(10, 0))
@@ -912,6 +388,15 @@ class WallpaperRotatorGUI:
         # Status area in separate pane (resizable by dragging divider)
         status_container = ttk.Frame(self.paned_window)
 
+        # Rolling timings of the rotation hot paths, refreshed by update_status
+        timings_frame = ttk.LabelFrame(
+            status_container, text="Timings (ms, last 1024 samples)", padding=5)
+        timings_frame.pack(side='bottom', fill='x', padx=10, pady=(0, 5))
+        self.timings_label = ttk.Label(
+            timings_frame, text="No timings yet", font=('TkFixedFont', 8),
+            justify='left', anchor='w')
+        self.timings_label.pack(fill='x')
+
         status_frame = ttk.LabelFrame(
             status_container, text="Status (Drag divider above to resize)", padding=5)
         status_frame.pack(fill='both', expand=True, padx=10, pady=5)
@@ -935,18 +420,7 @@ class WallpaperRotatorGUI:
         if self.rotator.wallpaper_dir and os.path.exists(self.rotator.wallpaper_dir):
             self.dir_label.config(text=self.rotator.wallpaper_dir)
             self.log("Loading saved directory in background...")
-
-            # Load images in background to not freeze startup
-            def load_saved():
-                count = self.rotator.scan_images(self.rotator.wallpaper_dir)
-                self.image_count_label.config(text=f"Images found: {count}")
-                self.log(f"Loaded {count} images from saved directory")
-                if self.rotator.use_image_orientation:
-                    self.log(
-                        f"  Portrait: {len(self.rotator.portrait_images)}, Landscape: {len(self.rotator.landscape_images)}")
-
-            # Run in separate thread to avoid blocking
-            threading.Thread(target=load_saved, daemon=True).start()
+            self.start_scan(self.rotator.wallpaper_dir)
 
     def on_monitor_toggle(self, monitor, var):
         """Handle monitor checkbox toggle"""
@@ -996,41 +470,137 @@ class WallpaperRotatorGUI:
             self.dir_label.config(text=directory)
 
             self.log("Scanning images...")
-            self.root.update()  # Force UI update
+            self.start_scan(directory, announce=True)
+            self.rotator.save_config()
+
+    def is_scanning(self):
+        return self.scan_thread is not None and self.scan_thread.is_alive()
+
+    def start_scan(self, directory, announce=False):
+        """Scan directory on a worker thread, publishing results as they arrive"""
+        self.cancel_scan()
+        self.stop_watching()
+
+        cancel_event = threading.Event()
+        result_queue = queue.Queue()
+        self.scan_cancel_event = cancel_event
+        self.scan_queue = result_queue
+        self.scan_announce = announce
+        self.scan_progress_logged = 0
+        self.rotator.reset_images()
+        self.image_count_label.config(text="Images found: 0 (scanning...)")
+
+        def progress(current, total):
+            if current % 10 == 0 or (total and current == total - 1):  # Update every 10 images
+                result_queue.put(('progress', current, total))
 
-            # Progress callback
-            def update_progress(current, total):
-                if current % 10 == 0 or current == total - 1:  # Update every 10 images
+        def worker():
+            try:
+                for batch in self.rotator.iter_scan_batches(directory, progress, cancel_event):
+                    result_queue.put(('batch', batch))
+            except Exception as e:
+                result_queue.put(('error', e))
+            result_queue.put(('done', cancel_event.is_set()))
+
+        self.scan_thread = threading.Thread(target=worker, daemon=True)
+        self.scan_thread.start()
+        if self.scan_poll_timer_id is None:
+            self._poll_scan_queue()
+
+    def cancel_scan(self):
+        """Stop a running background scan; results already published are kept"""
+        if self.scan_cancel_event is not None:
+            self.scan_cancel_event.set()
+        self.scan_cancel_event = None
+
+    def _poll_scan_queue(self):
+        """Apply scan results on the Tk thread"""
+        self.scan_poll_timer_id = None
+        result_queue = self.scan_queue
+        last_progress = None
+        finished = False
+
+        while True:
+            try:
+                message = result_queue.get_nowait()
+            except queue.Empty:
+                break
+            kind = message[0]
+            if kind == 'batch':
+                self.rotator.add_scanned_images(message[1])
+            elif kind == 'progress':
+                last_progress = message
+            elif kind == 'error':
+                self.log(f"Error scanning images: {message[1]}")
+            elif kind == 'done':
+                finished = True
+                cancelled = message[1]
+                break
+
+        if last_progress and not finished:
+            _, current, total = last_progress
+            # The count label updates on every poll; the log only every 1000 images
+            if current + 1 - self.scan_progress_logged >= 1000:
+                self.scan_progress_logged = current + 1
+                if total:
                     self.log(f"Processing images: {current + 1}/{total}")
-                    self.root.update()  # Keep UI responsive
+                else:
+                    self.log(f"Processing images: {current + 1}")
+            self.image_count_label.config(
+                text=f"Images found: {len(self.rotator.image_files)} (scanning...)")
 
-            count = self.rotator.scan_images(directory, update_progress)
-            self.image_count_label.config(text=f"Images found: {count}")
+        if finished:
+            if not cancelled:
+                self._on_scan_complete()
+        else:
+            if self.pending_start and self.rotator.ready_for_rotation(self.rotator.min_images_to_start):
+                self.pending_start = False
+                self.log("Enough images scanned - starting rotation")
+                self.start_rotation()
+            self.scan_poll_timer_id = self.root.after(100, self._poll_scan_queue)
+
+    def _on_scan_complete(self):
+        count = self.rotator.finish_scan()
+        self.image_count_label.config(text=f"Images found: {count}")
+        if self.rotator.watch_directory:
+            self.start_watching()
+        duplicates = self.rotator.catalog.duplicates.hidden_count()
+        if duplicates:
+            self.log(f"Hiding {duplicates} near-duplicate copies")
+
+        if not self.scan_announce:
+            self.log(f"Loaded {count} images from saved directory")
+            if self.rotator.use_image_orientation:
+                self.log(
+                    f"  Portrait: {len(self.rotator.portrait_images)}, Landscape: {len(self.rotator.landscape_images)}")
+        elif count > 0:
+            self.log(
+                f"Found {count} images in directory and subdirectories")
 
-            if count > 0:
+            if self.rotator.use_image_orientation:
                 self.log(
-                    f"Found {count} images in directory and subdirectories")
-
-                if self.rotator.use_image_orientation:
-                    self.log(
-                        f"  Portrait images: {len(self.rotator.portrait_images)}")
-                    self.log(
-                        f"  Landscape images: {len(self.rotator.landscape_images)}")
-
-                # Show first few images as examples
-                examples = self.rotator.image_files[:5]
-                self.log("Example images:")
-                for img in examples:
-                    self.log(f"  - {os.path.basename(img)}")
-                if count > 5:
-                    self.log(f"  ... and {count - 5} more")
-            else:
+                    f"  Portrait images: {len(self.rotator.portrait_images)}")
+                self.log(
+                    f"  Landscape images: {len(self.rotator.landscape_images)}")
+
+            # Show first few images as examples
+            examples = self.rotator.image_files.paths(5)
+            self.log("Example images:")
+            for img in examples:
+                self.log(f"  - {os.path.basename(img)}")
+            if count > 5:
+                self.log(f"  ... and {count - 5} more")
+
+        if count == 0:
+            self.pending_start = False
+            if self.scan_announce:
                 self.log("No images found! Please check the directory.")
                 messagebox.showwarning("No Images",
                                        "No image files found in the selected directory.\n\n"
                                        "Supported formats: JPG, JPEG, PNG, BMP, GIF, TIFF")
-
-            self.rotator.save_config()
+        elif self.pending_start:
+            self.pending_start = False
+            self.start_rotation()
 
     def on_interval_change(self, event):
         try:
@@ -1048,6 +618,89 @@ class WallpaperRotatorGUI:
             self.interval_var.set(self.rotator.rotation_interval)
             self.log("Invalid interval value - keeping current setting")
 
+    def on_scan_workers_change(self, event):
+        try:
+            workers = max(1, self.scan_workers_var.get())
+            self.scan_workers_var.set(workers)
+            self.rotator.scan_workers = workers
+            self.rotator.save_config()
+            self.log(f"Scan worker threads set to {workers}")
+        except (ValueError, tk.TclError):
+            self.scan_workers_var.set(self.rotator.scan_workers)
+            self.log("Invalid worker count - keeping current setting")
+
+    def on_match_aspect_change(self):
+        self.rotator.match_aspect_ratio = self.match_aspect_var.get()
+        self.rotator.save_config()
+        status = "enabled" if self.rotator.match_aspect_ratio else "disabled"
+        self.log(f"Aspect ratio matching {status}")
+
+    def on_detect_duplicates_change(self):
+        self.rotator.detect_duplicates = self.detect_duplicates_var.get()
+        self.rotator.save_config()
+        status = "enabled" if self.rotator.detect_duplicates else "disabled"
+        self.log(f"Near-duplicate detection {status} - applies from the next scan")
+
+    def on_downscale_change(self):
+        self.rotator.downscale_to_monitor = self.downscale_var.get()
+        self.rotator.save_config()
+        status = "enabled" if self.rotator.downscale_to_monitor else "disabled"
+        self.log(f"Downscaling rotated images to monitor resolution {status}")
+
+    def on_skip_hidden_change(self):
+        self.rotator.scan_skip_hidden = self.skip_hidden_var.get()
+        self.rotator.save_config()
+        status = "Skipping" if self.rotator.scan_skip_hidden else "Including"
+        self.log(f"{status} hidden folders from the next scan")
+
+    def on_watch_directory_change(self):
+        self.rotator.watch_directory = self.watch_directory_var.get()
+        self.rotator.save_config()
+
+        if self.rotator.watch_directory:
+            self.log("Enabled: Watching directory for added and removed images")
+            # A running scan starts the watcher itself once it completes
+            if not self.is_scanning():
+                self.start_watching()
+        else:
+            self.stop_watching()
+            self.log("Disabled: Directory watching")
+
+    def start_watching(self):
+        """Keep the image pools in sync with the wallpaper directory"""
+        if self.rotator.start_watching(self.watch_queue.put):
+            if self.watch_poll_timer_id is None:
+                self._poll_watch_queue()
+
+    def stop_watching(self):
+        self.rotator.stop_watching()
+        if self.watch_poll_timer_id is not None:
+            self.root.after_cancel(self.watch_poll_timer_id)
+            self.watch_poll_timer_id = None
+        # Drop changes for the old tree that were never applied
+        self.watch_queue = queue.Queue()
+
+    def _poll_watch_queue(self):
+        """Apply directory changes on the Tk thread"""
+        added = 0
+        removed = 0
+        while True:
+            try:
+                events = self.watch_queue.get_nowait()
+            except queue.Empty:
+                break
+            batch_added, batch_removed = self.rotator.apply_fs_events(events)
+            added += batch_added
+            removed += batch_removed
+
+        if added or removed:
+            self.log(
+                f"Directory changed: {added} images added, {removed} removed")
+            self.image_count_label.config(
+                text=f"Images found: {len(self.rotator.image_files)}")
+
+        self.watch_poll_timer_id = self.root.after(500, self._poll_watch_queue)
+
     def on_orientation_mode_change(self):
         self.rotator.use_image_orientation = self.use_orientation_var.get()
         self.rotator.save_config()
@@ -1060,12 +713,7 @@ class WallpaperRotatorGUI:
         # Re-scan images if directory is already set
         if self.rotator.wallpaper_dir and os.path.exists(self.rotator.wallpaper_dir):
             self.log("Re-scanning images...")
-            count = self.rotator.scan_images(self.rotator.wallpaper_dir)
-            if self.rotator.use_image_orientation:
-                self.log(
-                    f"  Portrait images: {len(self.rotator.portrait_images)}")
-                self.log(
-                    f"  Landscape images: {len(self.rotator.landscape_images)}")
+            self.start_scan(self.rotator.wallpaper_dir)
 
     def on_position_change(self, event):
         position_name = self.position_var.get()
@@ -1091,6 +739,13 @@ class WallpaperRotatorGUI:
             messagebox.showerror("Error", "Please select at least one monitor")
             return
 
+        if self.is_scanning() and not self.rotator.ready_for_rotation(self.rotator.min_images_to_start):
+            # Start as soon as the background scan has found enough images
+            if not self.pending_start:
+                self.pending_start = True
+                self.log("Rotation will start once enough images have been scanned...")
+            return
+
         if not self.rotator.image_files:
             messagebox.showerror(
                 "Error", "Please select a directory with images")
@@ -1120,6 +775,13 @@ class WallpaperRotatorGUI:
             self.rotation_timer_id = self.root.after(
                 interval_ms, self._do_rotation)
 
+            # Select and render the next wallpapers ahead of time so the
+            # rotation itself only has to hand them to Windows
+            lead_ms = min(self.rotator.prefetch_seconds * 1000, interval_ms // 2)
+            if lead_ms > 0:
+                self.prefetch_timer_id = self.root.after(
+                    interval_ms - lead_ms, self.rotator.start_prefetch)
+
     def _do_rotation(self):
         """Perform rotation and schedule the next one"""
         if self.rotator.running:
@@ -1131,12 +793,16 @@ class WallpaperRotatorGUI:
             self._schedule_next_rotation()
 
     def stop_rotation(self):
+        self.pending_start = False
         self.rotator.stop_rotation()
 
         # Cancel the scheduled timer
         if self.rotation_timer_id is not None:
             self.root.after_cancel(self.rotation_timer_id)
             self.rotation_timer_id = None
+        if self.prefetch_timer_id is not None:
+            self.root.after_cancel(self.prefetch_timer_id)
+            self.prefetch_timer_id = None
 
         self.start_button.config(state='normal')
         self.stop_button.config(state='disabled')
@@ -1156,18 +822,38 @@ class WallpaperRotatorGUI:
                 "Error", "Please select a directory with images")
             return
 
-        self.rotator.rotate_wallpaper()
+        # Leave a prefetched set for the scheduled rotation it was made for
+        self.rotator.rotate_wallpaper(use_prefetched=False)
         self.log("Wallpaper changed manually on all active monitors")
 
     def log(self, message):
-        self.status_text.config(state='normal')
-        self.status_text.insert(
-            'end', f"{time.strftime('%H:%M:%S')} - {message}\n")
-        self.status_text.see('end')
-        self.status_text.config(state='disabled')
+        """Queue a status message; safe to call from any thread"""
+        self.status_log.append(message)
+
+    def _flush_status_log(self):
+        """Move new log lines into the status pane, trimmed to the log's size"""
+        lines, dropped = self.status_log.take_pending()
+        if lines:
+            # Only follow new lines if the user hasn't scrolled up to read older ones
+            at_end = self.status_text.yview()[1] >= 1.0
+            self.status_text.config(state='normal')
+            if dropped:
+                self.status_text.delete('1.0', 'end')
+            self.status_text.insert('end', "\n".join(lines) + "\n")
+            # The widget always ends with an empty line after the last newline
+            excess = int(self.status_text.index('end-1c').split('.')[0]) - 1 - self.status_log.max_lines
+            if excess > 0:
+                self.status_text.delete('1.0', f"{excess + 1}.0")
+            if at_end:
+                self.status_text.see('end')
+            self.status_text.config(state='disabled')
+        self.root.after(FLUSH_INTERVAL_MS, self._flush_status_log)
 
     def update_status(self):
         # Update status periodically
+        lines = self.rotator.metrics.format_lines()
+        if lines:
+            self.timings_label.config(text="\n".join(lines))
         self.root.after(1000, self.update_status)
 
     def _create_message_window(self):
@@ -1275,6 +961,10 @@ class WallpaperRotatorGUI:
 
     def show_tray_icon(self):
         """Create and show the system tray icon"""
+        from PIL import Image
+        import pystray
+        from pystray import MenuItem as item
+
         # Load tray icon image from file if available
         if not self.icon_image:
             # Handle PyInstaller bundled resources
@@ -1372,8 +1062,15 @@ class WallpaperRotatorGUI:
             except:
                 pass
 
+        self.cancel_scan()
+        self.stop_watching()
+
         # Clean up temp images on exit
         self.rotator.cleanup_temp_images()
+        self.rotator.wait_for_notifications(timeout=2)
+        self.rotator.wait_for_cleanup(timeout=5)
+        self.rotator.stop_metrics_server()
+        self.status_log.close()
         if self.tray_icon:
             self.tray_icon.stop()
         self.root.destroy()